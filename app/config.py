@@ -26,6 +26,38 @@ class Settings(BaseSettings):
     redis_port: int = int(os.getenv('REDIS_PORT', '6380'))
     redis_db: int = int(os.getenv('REDIS_DB', '0'))
     redis_password: str = os.getenv('REDIS_PASSWORD', 'change-redis-password-in-production')
+    # 多个 Redis 实例分片（逗号分隔的 URL 列表，设置后代替 REDIS_URL），键按一致性哈希分布
+    redis_shard_urls: str = os.getenv('REDIS_SHARD_URLS', '')
+    redis_shard_vnodes: int = int(os.getenv('REDIS_SHARD_VNODES', '160'))  # 每个实例在哈希环上的虚拟节点数
+
+    # Redis 后端：redis（默认）或 memory（进程内实现，数据不跨 worker 共享，适合单进程部署和测试）
+    redis_backend: str = os.getenv('REDIS_BACKEND', 'redis').lower()
+    redis_memory_max_bytes: int = int(os.getenv('REDIS_MEMORY_MAX_BYTES', str(256 * 1024 * 1024)))  # memory 后端的估算内存上限
+    redis_memory_policy: str = os.getenv('REDIS_MEMORY_POLICY', 'allkeys-lru')  # 超出上限时：allkeys-lru 淘汰最久未用的键，noeviction 拒绝写入
+    redis_memory_expire_interval: float = float(os.getenv('REDIS_MEMORY_EXPIRE_INTERVAL', '0.1'))  # 定期清理过期键的间隔（秒）
+
+    # Redis 连接池配置
+    redis_max_connections: int = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))  # 每个进程的连接上限
+    redis_pool_blocking: bool = os.getenv('REDIS_POOL_BLOCKING', 'true').lower() == 'true'  # 连接用尽时等待而不是直接报错
+    redis_pool_timeout: float = float(os.getenv('REDIS_POOL_TIMEOUT', '2'))  # 阻塞池等待连接的最长时间（秒）
+    redis_health_check_interval: int = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', '30'))  # 空闲超过该秒数的连接使用前先 PING
+    redis_socket_timeout: float = float(os.getenv('REDIS_SOCKET_TIMEOUT', '5'))
+    redis_socket_connect_timeout: float = float(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', '5'))
+
+    # Redis 值编码配置
+    redis_codec: str = os.getenv('REDIS_CODEC', 'json')  # json（orjson）或 msgpack
+    redis_compression: str = os.getenv('REDIS_COMPRESSION', 'none')  # none / zstd / lz4
+    redis_compression_threshold: int = int(os.getenv('REDIS_COMPRESSION_THRESHOLD', '1024'))  # 超过该字节数才压缩
+
+    # Redis 熔断与重连配置
+    redis_breaker_failure_threshold: int = int(os.getenv('REDIS_BREAKER_FAILURE_THRESHOLD', '3'))  # 窗口内连接错误达到该次数即熔断
+    redis_breaker_failure_window: float = float(os.getenv('REDIS_BREAKER_FAILURE_WINDOW', '30'))  # 统计连接错误的时间窗口（秒）
+    redis_reconnect_backoff_base: float = float(os.getenv('REDIS_RECONNECT_BACKOFF_BASE', '1'))  # 首次重连等待（秒），之后每次翻倍
+    redis_reconnect_backoff_max: float = float(os.getenv('REDIS_RECONNECT_BACKOFF_MAX', '60'))  # 重连等待上限（秒）
+
+    # Redis 后台键空间任务（SCAN 批量删除等）
+    redis_job_batch_pause: float = float(os.getenv('REDIS_JOB_BATCH_PAUSE', '0.01'))  # 每批之间暂停的秒数，避免持续占用 Redis
+    redis_job_ttl: int = int(os.getenv('REDIS_JOB_TTL', '86400'))  # 任务状态在 Redis 中的保留时间（秒），所有 worker 都可查询
 
     # API 文档配置
     docs_url: str = "/docs"
@@ -108,6 +140,20 @@ class Settings(BaseSettings):
 
     # 缓存配置
     cache_expire_seconds: int = 3600  # 1小时
+    item_cache_expire: int = int(os.getenv('ITEM_CACHE_EXPIRE', '300'))  # 商品详情/首页在 Redis 中的缓存时间（秒）
+    local_cache_ttl: float = float(os.getenv('LOCAL_CACHE_TTL', '5'))  # 进程内 L1 缓存时间（秒），兜底漏掉的失效消息
+    local_cache_max_entries: int = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', '2048'))
+    local_cache_max_bytes: int = int(os.getenv('LOCAL_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+    # 商品搜索后端：auto 按数据库选择（MySQL FULLTEXT ngram / SQLite FTS5），fulltext / fts5 / like 指定
+    search_backend: str = os.getenv('SEARCH_BACKEND', 'auto')
+    # 进程内 trigram 倒排索引：启动时加载全部商品，/items/search 不访问数据库（适合中等规模目录）
+    item_search_index: bool = os.getenv('ITEM_SEARCH_INDEX', 'false').lower() == 'true'
+    # 进程内索引定时从数据库全量重建的间隔（秒，0 表示只在重新订阅失效消息后重建），兜底漏掉的失效消息
+    item_index_resync_interval: float = float(os.getenv('ITEM_INDEX_RESYNC_INTERVAL', '300'))
+    # /items/suggest 的进程内有序名称数组（只加载 id 和 name，按键补全为微秒级）；
+    # 关闭后每次按键都查询数据库 name LIKE 'prefix%'（SQLite 和不区分大小写的排序规则下无法走索引）
+    item_suggest_index: bool = os.getenv('ITEM_SUGGEST_INDEX', 'true').lower() == 'true'
 
     # 日志 API 保护配置
     doc_log_api_key: str = os.getenv('DOC_LOG_API_KEY', '')
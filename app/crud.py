@@ -1,7 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, select
 from . import models, schemas
-from typing import List, Optional
+from .item_index import item_index
+from .item_search import item_search
+from .item_suggest import item_suggester
+from .pagination import ITEM_ORDER, Cursor, build_page, keyset_statement
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 def get_item(db: Session, item_id: int) -> Optional[models.Item]:
     """根据ID获取单个商品"""
@@ -9,40 +14,62 @@ def get_item(db: Session, item_id: int) -> Optional[models.Item]:
 
 def get_items(db: Session, skip: int = 0, limit: int = 10) -> List[models.Item]:
     """获取商品列表，支持分页"""
-    return db.query(models.Item).order_by(desc(models.Item.created_at)).offset(skip).limit(limit).all()
+    return db.query(models.Item).order_by(*ITEM_ORDER).offset(skip).limit(limit).all()
 
-def create_item(db: Session, item: schemas.ItemCreate) -> models.Item:
-    """创建新商品"""
+def get_items_page(db: Session, cursor: Optional[Cursor] = None,
+                   limit: int = 10) -> Tuple[List[models.Item], Optional[str]]:
+    """游标分页获取商品列表，返回 (商品列表, 下一页游标)"""
+    return build_page(db.execute(keyset_statement(cursor, limit)).all(), limit)
+
+def new_item(item: schemas.ItemCreate) -> models.Item:
+    """根据请求数据构造商品对象（同步和异步 crud 共用）"""
     # 转换布尔值为整数（MySQL兼容）
     is_offer_int = 1 if item.is_offer else 0 if item.is_offer is not None else 0
     
-    db_item = models.Item(
+    return models.Item(
         name=item.name, 
         price=item.price, 
         is_offer=is_offer_int,
         description=item.description
     )
+
+def apply_item_update(db_item: models.Item, item: schemas.ItemUpdate):
+    """只更新提供的字段（同步和异步 crud 共用）"""
+    update_data = item.model_dump(exclude_unset=True)
+    
+    # 处理布尔值转换
+    if 'is_offer' in update_data:
+        update_data['is_offer'] = 1 if update_data['is_offer'] else 0
+    
+    for field, value in update_data.items():
+        setattr(db_item, field, value)
+
+def item_saved(db_item: models.Item):
+    """商品写入后更新进程内的搜索索引和名称补全（同步和异步 crud 共用）"""
+    item_index.add(db_item)
+    item_suggester.add(db_item)
+
+def item_deleted(item_id: int):
+    item_index.remove(item_id)
+    item_suggester.remove(item_id)
+
+def create_item(db: Session, item: schemas.ItemCreate) -> models.Item:
+    """创建新商品"""
+    db_item = new_item(item)
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
+    item_saved(db_item)
     return db_item
 
 def update_item(db: Session, item_id: int, item: schemas.ItemUpdate) -> Optional[models.Item]:
     """更新商品信息"""
     db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
     if db_item:
-        # 只更新提供的字段
-        update_data = item.model_dump(exclude_unset=True)
-        
-        # 处理布尔值转换
-        if 'is_offer' in update_data:
-            update_data['is_offer'] = 1 if update_data['is_offer'] else 0
-        
-        for field, value in update_data.items():
-            setattr(db_item, field, value)
-        
+        apply_item_update(db_item, item)
         db.commit()
         db.refresh(db_item)
+        item_saved(db_item)
     return db_item
 
 def delete_item(db: Session, item_id: int) -> bool:
@@ -51,11 +78,47 @@ def delete_item(db: Session, item_id: int) -> bool:
     if db_item:
         db.delete(db_item)
         db.commit()
+        item_deleted(item_id)
         return True
     return False
 
 def search_items(db: Session, keyword: str, skip: int = 0, limit: int = 10) -> List[models.Item]:
-    """搜索商品"""
-    return db.query(models.Item).filter(
-        models.Item.name.contains(keyword)
-    ).order_by(desc(models.Item.created_at)).offset(skip).limit(limit).all()
+    """搜索商品（全文索引可用时按相关度排序）"""
+    return db.scalars(item_search.statement(keyword, skip, limit)).all()
+
+def search_items_page(db: Session, keyword: str, cursor: Optional[Cursor] = None,
+                      limit: int = 10) -> Tuple[List[models.Item], Optional[str]]:
+    """游标分页搜索商品，返回 (商品列表, 下一页游标)"""
+    stmt = keyset_statement(cursor, limit, item_search.criteria(keyword))
+    return build_page(db.execute(stmt).all(), limit)
+
+def suggest_statement(prefix: str, limit: int = 10):
+    """名称前缀查询（同步和异步 crud 共用）"""
+    return select(models.Item.name).filter(
+        models.Item.name.startswith(prefix, autoescape=True)
+    ).distinct().order_by(models.Item.name).limit(limit)
+
+def suggest_item_names(db: Session, prefix: str, limit: int = 10) -> List[str]:
+    """名称以 prefix 开头的商品名称（可以使用 name 索引，进程内补全未启用时使用）"""
+    return db.scalars(suggest_statement(prefix, limit)).all()
+
+def create_doc_log(db: Session, **fields) -> models.DocLog:
+    """记录文档操作日志"""
+    log_entry = models.DocLog(**fields)
+    db.add(log_entry)
+    db.commit()
+    return log_entry
+
+def get_doc_logs(db: Session, limit: int = 100, doc_slug: Optional[str] = None,
+                 action: Optional[str] = None) -> List[models.DocLog]:
+    """按时间倒序获取文档操作日志，可按文档和操作类型过滤"""
+    query = db.query(models.DocLog)
+    if doc_slug:
+        query = query.filter(models.DocLog.doc_slug == doc_slug)
+    if action:
+        query = query.filter(models.DocLog.action == action)
+    return query.order_by(desc(models.DocLog.timestamp)).limit(limit).all()
+
+def get_doc_logs_since(db: Session, since: datetime) -> List[models.DocLog]:
+    """获取某个时间之后的文档操作日志"""
+    return db.query(models.DocLog).filter(models.DocLog.timestamp >= since).all()
@@ -0,0 +1,119 @@
+"""crud 的异步版本（DATABASE_URL 使用 aiomysql / asyncmy / aiosqlite 驱动时由路由调用）
+
+函数名和参数与 crud 相同，第一个参数是 AsyncSession。
+"""
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models, schemas
+from .database import DATABASE_ASYNC
+from .item_search import item_search
+from .pagination import ITEM_ORDER, Cursor, build_page, keyset_statement
+
+async def get_item(db: AsyncSession, item_id: int) -> Optional[models.Item]:
+    """根据ID获取单个商品"""
+    return await db.get(models.Item, item_id)
+
+async def get_items(db: AsyncSession, skip: int = 0, limit: int = 10) -> List[models.Item]:
+    """获取商品列表，支持分页"""
+    result = await db.scalars(
+        select(models.Item).order_by(*ITEM_ORDER).offset(skip).limit(limit)
+    )
+    return list(result)
+
+async def get_items_page(db: AsyncSession, cursor: Optional[Cursor] = None,
+                         limit: int = 10) -> Tuple[List[models.Item], Optional[str]]:
+    """游标分页获取商品列表，返回 (商品列表, 下一页游标)"""
+    result = await db.execute(keyset_statement(cursor, limit))
+    return build_page(result.all(), limit)
+
+async def create_item(db: AsyncSession, item: schemas.ItemCreate) -> models.Item:
+    """创建新商品"""
+    db_item = crud.new_item(item)
+    db.add(db_item)
+    await db.commit()
+    await db.refresh(db_item)
+    crud.item_saved(db_item)
+    return db_item
+
+async def update_item(db: AsyncSession, item_id: int, item: schemas.ItemUpdate) -> Optional[models.Item]:
+    """更新商品信息"""
+    db_item = await db.get(models.Item, item_id)
+    if db_item:
+        crud.apply_item_update(db_item, item)
+        await db.commit()
+        await db.refresh(db_item)
+        crud.item_saved(db_item)
+    return db_item
+
+async def delete_item(db: AsyncSession, item_id: int) -> bool:
+    """删除商品"""
+    db_item = await db.get(models.Item, item_id)
+    if db_item:
+        await db.delete(db_item)
+        await db.commit()
+        crud.item_deleted(item_id)
+        return True
+    return False
+
+async def search_items(db: AsyncSession, keyword: str, skip: int = 0, limit: int = 10) -> List[models.Item]:
+    """搜索商品（全文索引可用时按相关度排序）"""
+    return list(await db.scalars(item_search.statement(keyword, skip, limit)))
+
+async def search_items_page(db: AsyncSession, keyword: str, cursor: Optional[Cursor] = None,
+                            limit: int = 10) -> Tuple[List[models.Item], Optional[str]]:
+    """游标分页搜索商品，返回 (商品列表, 下一页游标)"""
+    result = await db.execute(keyset_statement(cursor, limit, item_search.criteria(keyword)))
+    return build_page(result.all(), limit)
+
+async def suggest_item_names(db: AsyncSession, prefix: str, limit: int = 10) -> List[str]:
+    """名称以 prefix 开头的商品名称（可以使用 name 索引，进程内补全未启用时使用）"""
+    return list(await db.scalars(crud.suggest_statement(prefix, limit)))
+
+async def create_doc_log(db: AsyncSession, **fields) -> models.DocLog:
+    """记录文档操作日志"""
+    log_entry = models.DocLog(**fields)
+    db.add(log_entry)
+    await db.commit()
+    return log_entry
+
+async def get_doc_logs(db: AsyncSession, limit: int = 100, doc_slug: Optional[str] = None,
+                       action: Optional[str] = None) -> List[models.DocLog]:
+    """按时间倒序获取文档操作日志，可按文档和操作类型过滤"""
+    query = select(models.DocLog)
+    if doc_slug:
+        query = query.filter(models.DocLog.doc_slug == doc_slug)
+    if action:
+        query = query.filter(models.DocLog.action == action)
+    return list(await db.scalars(query.order_by(desc(models.DocLog.timestamp)).limit(limit)))
+
+async def get_doc_logs_since(db: AsyncSession, since: datetime) -> List[models.DocLog]:
+    """获取某个时间之后的文档操作日志"""
+    return list(await db.scalars(select(models.DocLog).filter(models.DocLog.timestamp >= since)))
+
+# 同步 crud 函数 -> 异步引擎下的对应实现
+ASYNC_CRUD: Dict[Callable[..., Any], Callable[..., Awaitable[Any]]] = {
+    crud.get_item: get_item,
+    crud.get_items: get_items,
+    crud.get_items_page: get_items_page,
+    crud.create_item: create_item,
+    crud.update_item: update_item,
+    crud.delete_item: delete_item,
+    crud.search_items: search_items,
+    crud.search_items_page: search_items_page,
+    crud.suggest_item_names: suggest_item_names,
+    crud.create_doc_log: create_doc_log,
+    crud.get_doc_logs: get_doc_logs,
+    crud.get_doc_logs_since: get_doc_logs_since,
+}
+
+async def run_crud(func: Callable[..., Any], db: Any, **kwargs: Any) -> Any:
+    """按数据库模式调用 crud 函数：异步引擎调用 ASYNC_CRUD 中的对应实现，
+    同步 Session 放到线程池执行，都不阻塞事件循环"""
+    if DATABASE_ASYNC:
+        return await ASYNC_CRUD[func](db, **kwargs)
+    return await run_in_threadpool(func, db, **kwargs)
@@ -1,29 +1,61 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
+from typing import Union
 import os
 
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# 异步驱动：DATABASE_URL 使用其中之一时，路由通过 AsyncSession 访问数据库，不占用线程池
+# （mysql+aiomysql:// 或 mysql+asyncmy://，SQLite 用 sqlite+aiosqlite://）
+ASYNC_DRIVERS = {
+    "+aiomysql": "+pymysql",
+    "+asyncmy": "+pymysql",
+    "+aiosqlite": "",
+}
+DATABASE_ASYNC = any(driver in DATABASE_URL for driver in ASYNC_DRIVERS)
+
+def sync_database_url(url: str) -> str:
+    """异步驱动的 URL 换成对应的同步驱动（建表和启动时初始化数据仍使用同步引擎）"""
+    for driver, sync_driver in ASYNC_DRIVERS.items():
+        if driver in url:
+            return url.replace(driver, sync_driver, 1)
+    return url
+
+def _engine_options(url: str) -> dict:
+    return dict(
+        # MySQL 特定配置
+        pool_pre_ping=True,  # 连接前检查连接是否有效
+        pool_recycle=3600,   # 1小时后回收连接
+        echo=False,          # 设置为 True 可以看到 SQL 语句
+        connect_args={
+            "charset": "utf8mb4",
+            "autocommit": False
+        } if "mysql" in url else {}
+    )
+
+def create_db_engine(url: str):
+    return create_engine(url, **_engine_options(url))
+
+def create_async_db_engine(url: str):
+    return create_async_engine(url, **_engine_options(url))
+
 # MySQL 连接配置
-engine = create_engine(
-    DATABASE_URL,
-    # MySQL 特定配置
-    pool_pre_ping=True,  # 连接前检查连接是否有效
-    pool_recycle=3600,   # 1小时后回收连接
-    echo=False,          # 设置为 True 可以看到 SQL 语句
-    connect_args={
-        "charset": "utf8mb4",
-        "autocommit": False
-    } if "mysql" in DATABASE_URL else {}
-)
+engine = create_db_engine(sync_database_url(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# 异步引擎（仅 DATABASE_URL 使用异步驱动时创建）；提交后不过期对象，响应序列化时不会再触发查询
+async_engine = create_async_db_engine(DATABASE_URL) if DATABASE_ASYNC else None
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+) if DATABASE_ASYNC else None
+
 def get_db():
     """获取数据库会话"""
     db = SessionLocal()
@@ -32,6 +64,15 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# 路由使用的会话依赖：按 DATABASE_URL 的驱动选择同步 Session 或 AsyncSession
+get_session = get_async_db if DATABASE_ASYNC else get_db
+DbSession = Union[Session, AsyncSession]
+
 def test_connection():
     """测试数据库连接"""
     try:
@@ -3,19 +3,26 @@ from fastapi.responses import HTMLResponse
 from .config import settings
 from .middleware import setup_middleware
 from .exceptions import setup_exception_handlers
-from .security_headers import setup_security_headers
-from .ip_filter import setup_ip_filter
-from .path_protection import setup_path_protection
+from .security_pipeline import setup_security_pipeline
 from .routers import items, system, auth, redis, doc_logs
 from .redis_client import redis_client
+from .tiered_cache import tiered_cache
+from .item_index import item_index
+from .item_search import item_search
+from .item_suggest import item_suggester
 from . import models
-from .database import engine
+from .database import async_engine, engine
 
 def create_app() -> FastAPI:
     """创建 FastAPI 应用实例"""
 
     # 创建数据表
     models.Base.metadata.create_all(bind=engine)
+    # create_all 不会给已存在的表补建索引（如后来加入的 ix_items_created_at_id）
+    for index in models.Item.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    # 商品搜索的全文索引（MySQL FULLTEXT / SQLite FTS5），不可用时使用 LIKE
+    item_search.setup(engine)
 
     # 创建应用实例（禁用默认的 docs，使用自定义的）
     app = FastAPI(
@@ -29,10 +36,8 @@ def create_app() -> FastAPI:
     )
 
     # 设置中间件（顺序很重要）
-    setup_security_headers(app)  # 安全响应头必须最先
-    setup_ip_filter(app)  # IP 黑名单/白名单过滤
-    setup_path_protection(app)  # 敏感路径保护
-    setup_middleware(app)  # CORS 和速率限制
+    setup_security_pipeline(app)  # IP 过滤、路径保护、速率限制、安全响应头（单层纯 ASGI）
+    setup_middleware(app)  # CORS（最外层，拒绝响应也带 CORS 头）
 
     # 设置异常处理器
     setup_exception_handlers(app)
@@ -46,6 +51,8 @@ def create_app() -> FastAPI:
 
         # 连接 Redis
         await redis_client.connect()
+        # 订阅缓存失效消息（进程内 L1 缓存）
+        tiered_cache.start()
 
         # 初始化示例商品数据（从配置文件读取）
         from .database import SessionLocal
@@ -102,6 +109,22 @@ def create_app() -> FastAPI:
         finally:
             db.close()
 
+        # 加载进程内商品搜索索引
+        if settings.item_search_index:
+            with SessionLocal() as db:
+                item_index.build(db)
+            tiered_cache.on_invalidate(item_index.on_invalidate)
+            tiered_cache.on_subscribe(item_index.on_subscribe)
+            item_index.start(settings.item_index_resync_interval)
+            print(f"✓ 商品搜索索引已加载: {len(item_index)} 个商品，{item_index.build_seconds:.2f}s")
+        if settings.item_suggest_index:
+            with SessionLocal() as db:
+                item_suggester.build(db)
+            tiered_cache.on_invalidate(item_suggester.on_invalidate)
+            tiered_cache.on_subscribe(item_suggester.on_subscribe)
+            item_suggester.start(settings.item_index_resync_interval)
+            print(f"✓ 商品名称补全已加载: {len(item_suggester)} 个名称，{item_suggester.build_seconds:.2f}s")
+
         if settings.debug:
             print("✅ 应用启动完成")
 
@@ -112,8 +135,13 @@ def create_app() -> FastAPI:
         if settings.debug:
             print("🛑 FastAPI 应用关闭中...")
 
-        # 断开 Redis 连接
+        # 停止缓存失效订阅和进程内索引的同步任务，断开 Redis 连接
+        await tiered_cache.stop()
+        await item_index.stop()
+        await item_suggester.stop()
         await redis_client.disconnect()
+        if async_engine is not None:
+            await async_engine.dispose()
 
         if settings.debug:
             print("✅ 应用关闭完成")
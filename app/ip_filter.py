@@ -1,12 +1,10 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-from .config import settings
+import asyncio
 import os
 import ipaddress
-from typing import Set, List
-from collections import defaultdict
+from typing import Set, List, Optional, Tuple, Dict
 import time
+from .ip_index import IPNetworkIndex
+from .ip_tracker import SlidingWindowTracker, TemporaryBlacklist
 
 # 从环境变量读取黑名单/白名单
 def _parse_ip_list(ip_string: str) -> Set[str]:
@@ -27,29 +25,111 @@ def _parse_ip_list(ip_string: str) -> Set[str]:
     
     return ips
 
-class IPFilterMiddleware(BaseHTTPMiddleware):
-    """IP 过滤中间件 - 支持黑名单和白名单"""
+def _read_ip_file(path: str) -> Set[str]:
+    """从文件读取 IP 列表（每行一个 IP 或 CIDR，# 之后为注释）"""
+    if not path:
+        return set()
     
-    def __init__(self, app):
-        super().__init__(app)
-        self.blacklist = _parse_ip_list(os.getenv('IP_BLACKLIST', ''))
-        self.whitelist = _parse_ip_list(os.getenv('IP_WHITELIST', ''))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = [line.split('#', 1)[0].strip() for line in f]
+    except OSError as e:
+        print(f"⚠️  无法读取 IP 列表文件 {path}: {e}")
+        return set()
+    
+    return _parse_ip_list(','.join(entry for entry in entries if entry))
+
+# 不做 IP 过滤的路径（健康检查等）
+IP_FILTER_EXEMPT_PATHS = frozenset(['/health', '/ping', '/robots.txt'])
+
+class IPFilter:
+    """IP 过滤器 - 支持黑名单和白名单（由安全管道调用）"""
+    
+    def __init__(self):
+        # 名单文件（每行一个 IP 或 CIDR，修改后自动热加载）
+        self.blacklist_file = os.getenv('IP_BLACKLIST_FILE', '')
+        self.whitelist_file = os.getenv('IP_WHITELIST_FILE', '')
+        self.reload_interval = int(os.getenv('IP_LIST_RELOAD_INTERVAL', '30'))  # 每30秒检查一次文件修改时间
+        self._file_mtimes = self._get_file_mtimes()
+        self._next_reload_check = time.monotonic() + self.reload_interval
+        self._reloading = False
+        
+        # 编译好的 CIDR 索引（环境变量 + 名单文件）
+        self.blacklist, self.whitelist = self._build_indexes()
         
         # 如果有白名单，则所有未在白名单中的 IP 都会被拒绝
         self.use_whitelist = bool(self.whitelist)
         
-        # 访问统计（用于检测异常行为）
-        self.ip_request_counts: defaultdict = defaultdict(int)
-        self.ip_last_seen: dict = {}
-        self.blacklisted_ips: Set[str] = set()
-        
         # 阈值配置
         self.auto_blacklist_threshold = int(os.getenv('AUTO_BLACKLIST_THRESHOLD', '500'))  # 5分钟内超过500次请求
         self.auto_blacklist_window = int(os.getenv('AUTO_BLACKLIST_WINDOW', '300'))  # 300秒 = 5分钟
-        self.ip_cleanup_interval = int(os.getenv('IP_CLEANUP_INTERVAL', '600'))  # 10分钟清理一次
+        self.auto_blacklist_ttl = int(os.getenv('AUTO_BLACKLIST_TTL', '3600'))  # 自动黑名单1小时后过期
+        
+        # 访问统计（用于检测异常行为），内存固定：最多跟踪 IP_TRACKER_MAX_IPS 个 IP
+        max_tracked = int(os.getenv('IP_TRACKER_MAX_IPS', '10000'))
+        self.ip_tracker = SlidingWindowTracker(
+            window=self.auto_blacklist_window,
+            buckets=int(os.getenv('IP_TRACKER_BUCKETS', '10')),
+            max_tracked=max_tracked
+        )
+        self.blacklisted_ips = TemporaryBlacklist(ttl=self.auto_blacklist_ttl, max_size=max_tracked)
         
         print(f"🔒 IP 过滤已配置: 黑名单={len(self.blacklist)}个, 白名单={len(self.whitelist)}个, 使用白名单={self.use_whitelist}")
     
+    def _get_file_mtimes(self) -> Tuple[float, float]:
+        """获取名单文件的修改时间（文件不存在时为 0）"""
+        mtimes = []
+        for path in (self.blacklist_file, self.whitelist_file):
+            try:
+                mtimes.append(os.path.getmtime(path) if path else 0.0)
+            except OSError:
+                mtimes.append(0.0)
+        return mtimes[0], mtimes[1]
+    
+    def _build_indexes(self) -> Tuple[IPNetworkIndex, IPNetworkIndex]:
+        """从环境变量和名单文件构建黑名单/白名单索引"""
+        blacklist = _parse_ip_list(os.getenv('IP_BLACKLIST', '')) | _read_ip_file(self.blacklist_file)
+        whitelist = _parse_ip_list(os.getenv('IP_WHITELIST', '')) | _read_ip_file(self.whitelist_file)
+        return IPNetworkIndex(blacklist), IPNetworkIndex(whitelist)
+    
+    def _maybe_reload(self):
+        """名单文件有修改时，在线程池中重建索引后原子替换"""
+        if self._reloading or not (self.blacklist_file or self.whitelist_file):
+            return
+        
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + self.reload_interval
+        
+        mtimes = self._get_file_mtimes()
+        if mtimes == self._file_mtimes:
+            return
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 不在事件循环中（例如脚本调用），直接同步重建
+            self._apply_reload(self._build_indexes(), mtimes)
+            return
+        
+        self._reloading = True
+        future = loop.run_in_executor(None, self._build_indexes)
+        future.add_done_callback(lambda f: self._on_reload_done(f, mtimes))
+    
+    def _on_reload_done(self, future: "asyncio.Future", mtimes: Tuple[float, float]):
+        self._reloading = False
+        try:
+            self._apply_reload(future.result(), mtimes)
+        except Exception as e:
+            print(f"⚠️  IP 名单热加载失败: {e}")
+    
+    def _apply_reload(self, indexes: Tuple[IPNetworkIndex, IPNetworkIndex], mtimes: Tuple[float, float]):
+        self.blacklist, self.whitelist = indexes
+        self.use_whitelist = bool(self.whitelist)
+        self._file_mtimes = mtimes
+        print(f"🔄 IP 名单已重新加载: 黑名单={len(self.blacklist)}个, 白名单={len(self.whitelist)}个")
+    
     def _is_ip_blocked(self, ip: str) -> bool:
         """检查 IP 是否被阻止"""
         # 检查动态黑名单
@@ -57,99 +137,53 @@ class IPFilterMiddleware(BaseHTTPMiddleware):
             return True
         
         # 检查静态黑名单
-        if self._ip_in_networks(ip, self.blacklist):
+        if ip in self.blacklist:
             return True
         
         return False
     
-    def _ip_in_networks(self, ip: str, networks: Set[str]) -> bool:
-        """检查 IP 是否在指定网络中"""
-        try:
-            ip_obj = ipaddress.ip_address(ip)
-            for network in networks:
-                network_obj = ipaddress.ip_network(network, strict=False)
-                if ip_obj in network_obj:
-                    return True
-        except ValueError:
-            pass
-        return False
-    
-    def _is_ip_allowed(self, ip: str) -> bool:
+    def is_allowed(self, ip: str) -> bool:
         """检查 IP 是否被允许"""
+        self._maybe_reload()
+        
         if self._is_ip_blocked(ip):
             return False
         
         # 如果使用白名单，检查 IP 是否在白名单中
         if self.use_whitelist:
-            return self._ip_in_networks(ip, self.whitelist)
+            return ip in self.whitelist
         
         return True
     
-    def _track_ip(self, ip: str):
+    def stats(self) -> Dict[str, int]:
+        """IP 名单和访问跟踪统计"""
+        return {
+            "blacklist": len(self.blacklist),
+            "whitelist": len(self.whitelist),
+            "auto_blacklisted": len(self.blacklisted_ips),
+            "auto_blacklist_memory_bytes": self.blacklisted_ips.memory_bytes(),
+            **self.ip_tracker.stats(),
+        }
+    
+    def track(self, ip: str):
         """跟踪 IP 访问，检测异常行为"""
-        now = time.time()
-        
-        # 增加计数
-        self.ip_request_counts[ip] += 1
-        self.ip_last_seen[ip] = now
+        # 最近一个窗口内的请求数
+        count = self.ip_tracker.hit(ip, time.monotonic())
         
-        # 定期清理旧数据
-        if now % self.ip_cleanup_interval < 1:
-            cutoff = now - self.auto_blacklist_window
-            for tracked_ip in list(self.ip_request_counts.keys()):
-                if self.ip_last_seen.get(tracked_ip, 0) < cutoff:
-                    del self.ip_request_counts[tracked_ip]
-                    del self.ip_last_seen[tracked_ip]
-        
-        # 自动加入黑名单（可选功能）
-        if self.ip_request_counts[ip] > self.auto_blacklist_threshold:
-            print(f"⚠️  IP {ip} 在 {self.auto_blacklist_window} 秒内请求超过 {self.auto_blacklist_threshold} 次，自动加入黑名单")
+        # 自动加入黑名单（到期自动解除）
+        if count > self.auto_blacklist_threshold:
+            print(f"⚠️  IP {ip} 在 {self.auto_blacklist_window} 秒内请求超过 {self.auto_blacklist_threshold} 次，自动加入黑名单 {self.auto_blacklist_ttl} 秒")
             self.blacklisted_ips.add(ip)
-    
-    async def dispatch(self, request: Request, call_next):
-        """处理请求"""
-        path = request.url.path
-        
-        # 排除健康检查和文档
-        if path in ['/health', '/ping', '/robots.txt']:
-            return await call_next(request)
-        
-        # 获取客户端真实 IP
-        client_ip = (
-            request.headers.get("x-forwarded-for", "").split(",")[0].strip() or
-            request.headers.get("x-real-ip") or
-            (request.client.host if request.client else "unknown")
-        )
-        
-        # 检查 IP 是否被阻止
-        if not self._is_ip_allowed(client_ip):
-            print(f"🚫 拒绝访问: IP={client_ip}, Path={path}")
-            return JSONResponse(
-                status_code=403,
-                content={
-                    "error": True,
-                    "message": "访问被拒绝",
-                    "code": "IP_BLOCKED"
-                }
-            )
-        
-        # 跟踪 IP（用于异常检测）
-        self._track_ip(client_ip)
-        
-        # 添加安全头
-        response = await call_next(request)
-        response.headers["X-Client-IP"] = client_ip
-        
-        return response
 
 
-def setup_ip_filter(app):
-    """设置 IP 过滤中间件"""
-    ip_blacklist = os.getenv('IP_BLACKLIST', '')
-    ip_whitelist = os.getenv('IP_WHITELIST', '')
+def create_ip_filter() -> Optional[IPFilter]:
+    """创建 IP 过滤器，黑名单和白名单都为空时返回 None"""
+    ip_blacklist = os.getenv('IP_BLACKLIST', '') or os.getenv('IP_BLACKLIST_FILE', '')
+    ip_whitelist = os.getenv('IP_WHITELIST', '') or os.getenv('IP_WHITELIST_FILE', '')
     
     if ip_blacklist or ip_whitelist:
-        print("🔒 启用 IP 过滤中间件")
-        app.add_middleware(IPFilterMiddleware)
-    else:
-        print("ℹ️  IP 过滤未配置（黑名单和白名单都为空）")
+        print("🔒 启用 IP 过滤")
+        return IPFilter()
+    
+    print("ℹ️  IP 过滤未配置（黑名单和白名单都为空）")
+    return None
@@ -0,0 +1,70 @@
+"""CIDR 前缀索引
+
+把黑名单/白名单中的 IP 和 CIDR 一次性编译成按前缀长度分层的哈希表：
+每一层保存该前缀长度下所有网络号，查找时对每个出现过的前缀长度做一次
+移位 + 集合查找，等价于沿前缀树逐层匹配。查找开销只取决于不同前缀长度的
+个数（IPv4 最多 33 层，IPv6 最多 129 层），与条目数量无关。
+"""
+import ipaddress
+from typing import Dict, Iterable, List, Set, Tuple
+
+# IP 版本 -> 地址位数
+_ADDRESS_BITS = {4: 32, 6: 128}
+
+
+class IPNetworkIndex:
+    """IPv4/IPv6 CIDR 成员索引（构建一次，只读查找）"""
+
+    def __init__(self, networks: Iterable[str] = ()):
+        # {版本: {前缀长度: {网络号}}}
+        self._levels: Dict[int, Dict[int, Set[int]]] = {4: {}, 6: {}}
+        # {版本: [(移位位数, 网络号集合)]}，按前缀长度从短到长排列
+        self._lookup: Dict[int, List[Tuple[int, Set[int]]]] = {4: [], 6: []}
+        self._size = 0
+
+        for network in networks:
+            self._add(network)
+
+        for version, levels in self._levels.items():
+            bits = _ADDRESS_BITS[version]
+            self._lookup[version] = [
+                (bits - prefixlen, prefixes) for prefixlen, prefixes in sorted(levels.items())
+            ]
+
+    def _add(self, network: str):
+        """添加单个 IP 或 CIDR，格式无效时抛出 ValueError"""
+        net = ipaddress.ip_network(network, strict=False)
+        bits = _ADDRESS_BITS[net.version]
+        shift = bits - net.prefixlen
+        level = self._levels[net.version].setdefault(net.prefixlen, set())
+        prefix = int(net.network_address) >> shift
+        if prefix not in level:
+            level.add(prefix)
+            self._size += 1
+
+    def __contains__(self, ip: str) -> bool:
+        """检查 IP 是否落在任一网络中，无效 IP 视为不匹配"""
+        try:
+            ip_obj = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+
+        value = int(ip_obj)
+        for shift, prefixes in self._lookup[ip_obj.version]:
+            if (value >> shift) in prefixes:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def stats(self) -> Dict[str, int]:
+        """索引统计：条目数和各版本的前缀层数"""
+        return {
+            "entries": self._size,
+            "ipv4_levels": len(self._lookup[4]),
+            "ipv6_levels": len(self._lookup[6]),
+        }
@@ -0,0 +1,123 @@
+"""IP 访问跟踪（固定内存）
+
+SlidingWindowTracker 为每个 IP 保存一个环形分桶计数器，统计最近一个时间窗口内的
+请求数；跟踪的 IP 数量有上限，超出时按 LRU 淘汰最久未访问的 IP。
+TemporaryBlacklist 保存自动拉黑的 IP，条目到期自动失效，数量同样有上限。
+"""
+from array import array
+from collections import OrderedDict
+from typing import Dict
+import sys
+import time
+
+
+class _WindowCounter:
+    """单个 IP 的环形分桶计数器"""
+
+    __slots__ = ("counts", "epoch", "total")
+
+    def __init__(self, buckets: int, epoch: int):
+        self.counts = array("I", bytes(4 * buckets))
+        self.epoch = epoch  # 当前桶的序号（时间 / 桶宽度）
+        self.total = 0  # 窗口内所有桶的计数之和
+
+    def add(self, epoch: int) -> int:
+        """在 epoch 对应的桶里加一，返回窗口内的总数"""
+        counts = self.counts
+        size = len(counts)
+        gap = epoch - self.epoch
+        if gap > 0:
+            if gap >= size:
+                # 整个窗口都已过期
+                for i in range(size):
+                    counts[i] = 0
+                self.total = 0
+            else:
+                # 清空滑出窗口的桶
+                for e in range(self.epoch + 1, epoch + 1):
+                    i = e % size
+                    self.total -= counts[i]
+                    counts[i] = 0
+            self.epoch = epoch
+
+        counts[epoch % size] += 1
+        self.total += 1
+        return self.total
+
+
+class SlidingWindowTracker:
+    """固定内存的 IP 滑动窗口计数器（LRU 淘汰）"""
+
+    def __init__(self, window: int, buckets: int = 10, max_tracked: int = 10000):
+        self.window = window
+        self.buckets = buckets
+        self.bucket_width = window / buckets
+        self.max_tracked = max_tracked
+        self.evictions = 0
+        self._entries: "OrderedDict[str, _WindowCounter]" = OrderedDict()
+
+    def hit(self, ip: str, now: float) -> int:
+        """记录一次访问，返回该 IP 在最近一个窗口内的请求数"""
+        epoch = int(now / self.bucket_width)
+        entry = self._entries.get(ip)
+        if entry is None:
+            if len(self._entries) >= self.max_tracked:
+                # 淘汰最久未访问的 IP
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            entry = _WindowCounter(self.buckets, epoch)
+            self._entries[ip] = entry
+        else:
+            self._entries.move_to_end(ip)
+        return entry.add(epoch)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def memory_bytes(self) -> int:
+        """估算占用内存（字典本身 + 键 + 计数器）"""
+        total = sys.getsizeof(self._entries)
+        for ip, entry in self._entries.items():
+            total += sys.getsizeof(ip) + sys.getsizeof(entry) + sys.getsizeof(entry.counts)
+        return total
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked_ips": len(self._entries),
+            "max_tracked_ips": self.max_tracked,
+            "evictions": self.evictions,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+class TemporaryBlacklist:
+    """带过期时间的黑名单（数量有上限，满了淘汰最早加入的条目）"""
+
+    def __init__(self, ttl: int, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._expires: "OrderedDict[str, float]" = OrderedDict()
+
+    def add(self, ip: str):
+        self._expires.pop(ip, None)
+        if len(self._expires) >= self.max_size:
+            self._expires.popitem(last=False)
+        self._expires[ip] = time.monotonic() + self.ttl
+
+    def __contains__(self, ip: str) -> bool:
+        expires_at = self._expires.get(ip)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            # 惰性删除过期条目
+            del self._expires[ip]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._expires) + sum(
+            sys.getsizeof(ip) + sys.getsizeof(expires_at) for ip, expires_at in self._expires.items()
+        )
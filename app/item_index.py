@@ -0,0 +1,414 @@
+"""商品子串搜索的进程内 trigram 倒排索引（ITEM_SEARCH_INDEX=true 时启用）
+
+适合中等规模的商品目录：启动时从数据库加载全部商品，把 name 和 description（转小写）
+切成三字符片段（trigram），每个片段对应一个按商品 ID 升序排列的 array('I') 倒排表。
+搜索时从 ID 最大的一端遍历关键词 trigram 中最短的倒排表，在其他倒排表上二分查找求交集，
+候选再做一次子串校验（trigram 都出现不代表连续出现），整个过程不访问数据库。
+不足三个字符的关键词没有 trigram，/items/search 交给数据库（全文索引 / LIKE）处理。
+
+搜索在事件循环中执行时会阻塞其他请求，所以按候选数量（最短倒排表的长度）决定执行方式：
+不超过 INLINE_CANDIDATES 直接执行；更多时放到线程池；超过 MAX_CANDIDATES 时同样交给数据库。
+
+结果按 (created_at, id) 倒序，与 LIKE 查询和游标分页的 ITEM_ORDER 相同。商品的 created_at
+通常随 ID 递增，此时 ID 倒序就是结果顺序，凑够一页即可停止；索引记录了 created_at 与 ID
+顺序不一致的相邻商品数，存在时改为收集全部匹配再按 (created_at, id) 取前几条。
+
+数据同步（ItemMirror）：
+- crud 的创建/更新/删除同步更新本进程的索引
+- 其他 worker 的修改通过商品缓存失效消息（tiered_cache 的 pub/sub）按 ID 重新加载
+- pub/sub 是尽力而为的（Redis 故障、熔断、memory 后端都会漏消息），所以重新订阅后
+  以及每隔 ITEM_INDEX_RESYNC_INTERVAL 秒从数据库全量重建一次
+"""
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import logging
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+ITEM_DETAIL_KEY_PREFIX = "items:detail:"  # 商品详情缓存键，失效消息中据此识别被修改的商品
+GRAM = 3
+BUILD_BATCH = 2000
+INLINE_CANDIDATES = 2000  # 候选不超过该数量时直接在事件循环中搜索
+MAX_CANDIDATES = 50000  # 候选超过该数量时不使用索引（遍历时间和持锁时间都有上限）
+
+
+def changed_item_ids(keys: List[str]) -> List[int]:
+    """从缓存失效消息的键中取出被修改的商品 ID"""
+    ids = (key[len(ITEM_DETAIL_KEY_PREFIX):] for key in keys if key.startswith(ITEM_DETAIL_KEY_PREFIX))
+    return [int(item_id) for item_id in ids if item_id.isdigit()]
+
+
+def load_items(item_ids: List[int]) -> Dict[int, models.Item]:
+    """按 ID 从数据库加载商品（同步，在线程池中调用）"""
+    with SessionLocal() as db:
+        return {item.id: item for item in db.scalars(select(models.Item).filter(models.Item.id.in_(item_ids)))}
+
+
+class ItemMirror:
+    """进程内商品数据副本的基类：负责与数据库保持同步，子类实现 build / add / remove
+
+    build() 在不持有锁的情况下加载数据，最后一次性替换；重建期间 crud 写入的商品
+    记录在 _dirty 中，替换后重新加载，避免被旧快照覆盖。
+    """
+
+    name = "item mirror"
+
+    def __init__(self):
+        self.ready = False
+        self.build_seconds = 0.0
+        self.reloads = 0
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._resync_task: Optional[asyncio.Task] = None
+        self._subscribed = False
+        self._rebuilding = False
+        self._dirty: Set[int] = set()
+
+    def build(self, db: Session):
+        raise NotImplementedError
+
+    def add(self, item: Any):
+        raise NotImplementedError
+
+    def remove(self, item_id: int):
+        raise NotImplementedError
+
+    def _touched(self, item_id: int):
+        """add/remove 调用（持有锁）：重建期间记录被修改的商品"""
+        if self._rebuilding:
+            self._dirty.add(item_id)
+
+    def _spawn(self, coro: Any):
+        # 保存任务引用，避免运行中被垃圾回收；异常在回调中记录
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("%s 同步任务失败", self.name, exc_info=task.exception())
+
+    def on_invalidate(self, keys: List[str]):
+        """缓存失效消息回调：商品被修改，从数据库重新加载"""
+        ids = changed_item_ids(keys)
+        if ids and self.ready:
+            self._spawn(self.reload(ids))
+
+    def on_subscribe(self):
+        """失效消息（重新）订阅回调：断开期间的消息已经丢失，全量重建
+
+        第一次订阅发生在启动加载之后，跳过；两者之间的空隙由定时重建兜底。
+        """
+        if self._subscribed and self.ready:
+            self._spawn(self.rebuild())
+        self._subscribed = True
+
+    async def reload(self, item_ids: List[int]):
+        # 在线程池中更新，等待锁时不阻塞事件循环
+        await run_in_threadpool(self._reload, item_ids)
+        self.reloads += 1
+
+    def _reload(self, item_ids: List[int]):
+        items = load_items(item_ids)
+        for item_id in item_ids:
+            item = items.get(item_id)
+            if item is None:
+                self.remove(item_id)
+            else:
+                self.add(item)
+
+    async def rebuild(self):
+        if self._rebuilding:
+            return
+        with self._lock:
+            self._rebuilding = True
+        try:
+            await run_in_threadpool(self._rebuild)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+                dirty, self._dirty = self._dirty, set()
+        self.rebuilds += 1
+        if dirty:
+            await self.reload(list(dirty))
+
+    def _rebuild(self):
+        with SessionLocal() as db:
+            self.build(db)
+
+    def start(self, interval: float):
+        """启动定时全量重建（interval <= 0 时不启动）"""
+        if interval > 0 and (self._resync_task is None or self._resync_task.done()):
+            self._resync_task = asyncio.get_running_loop().create_task(self._resync_loop(interval))
+
+    async def stop(self):
+        tasks = list(self._tasks)
+        if self._resync_task is not None:
+            tasks.append(self._resync_task)
+            self._resync_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _resync_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.rebuild()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("%s 定时重建失败", self.name)
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def _created_key(created_at: Any) -> Tuple[bool, Any]:
+    # NULL 在 SQL 的 DESC 排序中排在最后
+    return (created_at is not None, created_at if created_at is not None else 0)
+
+
+class IndexedItem:
+    """索引中的商品：字段与 schemas.Item 同名，可以直接作为响应返回"""
+
+    __slots__ = ("id", "name", "price", "is_offer", "description", "created_at", "updated_at", "text")
+
+    def __init__(self, item: Any):
+        self.id = item.id
+        self.name = item.name
+        self.price = item.price
+        self.is_offer = item.is_offer
+        self.description = item.description
+        self.created_at = item.created_at
+        self.updated_at = item.updated_at
+        # 用 \0 分隔名称和描述，子串校验时不会跨字段匹配
+        self.text = f"{item.name}\0{item.description or ''}".lower()
+
+    def grams(self) -> Set[str]:
+        grams: Set[str] = set()
+        for part in self.text.split("\0"):
+            grams |= trigrams(part)
+        return grams
+
+    def order_key(self) -> Tuple[Tuple[bool, Any], int]:
+        """与 ITEM_ORDER 一致的排序键（取最大的几条）"""
+        return _created_key(self.created_at), self.id
+
+
+def _insert(postings: array, item_id: int):
+    if not postings or postings[-1] < item_id:
+        postings.append(item_id)  # 新商品 ID 最大，通常只需追加
+    else:
+        postings.insert(bisect_left(postings, item_id), item_id)
+
+
+def _intersect_desc(postings: List[array]) -> Iterator[int]:
+    """按 ID 倒序产出所有倒排表共有的 ID（postings 按长度升序）
+
+    遍历最短的表，在其他表上二分查找；ID 递减，每个表的查找上界随之左移。
+    """
+    shortest, others = postings[0], postings[1:]
+    bounds = [len(other) for other in others]
+    for item_id in reversed(shortest):
+        found = True
+        for i, other in enumerate(others):
+            position = bisect_left(other, item_id, 0, bounds[i])
+            bounds[i] = position
+            if position == len(other) or other[position] != item_id:
+                found = False
+                if position == 0:
+                    return  # 这个表中没有更小的 ID 了
+                break
+        if found:
+            yield item_id
+
+
+class ItemSearchIndex(ItemMirror):
+    """trigram 倒排索引（线程安全：crud 和失效消息在线程池中更新，搜索按候选数量选择执行方式）"""
+
+    name = "商品搜索索引"
+
+    def __init__(self):
+        super().__init__()
+        self.searches = 0
+        self.threaded_searches = 0
+        self.fallbacks = 0  # 交给数据库的搜索数
+        self._items: Dict[int, IndexedItem] = {}
+        self._postings: Dict[str, array] = {}
+        self._ids = array("I")  # 全部商品 ID（升序），用于短关键词的遍历
+        self._unordered = 0  # ID 相邻但 created_at 顺序相反的商品对数
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def build(self, db: Session):
+        """从数据库加载全部商品，完成后替换当前索引（启动和全量重建时调用）"""
+        start = time.perf_counter()
+        items: Dict[int, IndexedItem] = {}
+        postings: Dict[str, array] = {}
+        ids = array("I")
+        unordered = 0
+        previous: Optional[IndexedItem] = None
+        # 按 ID 升序加载（倒排表只需追加），读取列值而不构造 ORM 对象
+        for row in db.execute(
+            select(models.Item.__table__).order_by(models.Item.id).execution_options(yield_per=BUILD_BATCH)
+        ):
+            doc = items[row.id] = IndexedItem(row)
+            ids.append(doc.id)
+            for gram in doc.grams():
+                gram_postings = postings.get(gram)
+                if gram_postings is None:
+                    gram_postings = postings[gram] = array("I")
+                gram_postings.append(doc.id)
+            if previous is not None and _created_key(previous.created_at) > _created_key(doc.created_at):
+                unordered += 1
+            previous = doc
+        with self._lock:
+            self._items, self._postings, self._ids, self._unordered = items, postings, ids, unordered
+            self.ready = True
+        self.build_seconds = time.perf_counter() - start
+
+    def add(self, item: Any):
+        """新增或更新商品"""
+        if not self.ready:
+            return
+        with self._lock:
+            self._touched(item.id)
+            self._remove(item.id)
+            self._add(IndexedItem(item))
+
+    def remove(self, item_id: int):
+        if not self.ready:
+            return
+        with self._lock:
+            self._touched(item_id)
+            self._remove(item_id)
+
+    def _out_of_order(self, left: int, right: int) -> int:
+        """_ids 中相邻位置 left、right 的两个商品 created_at 是否逆序"""
+        if left < 0 or right >= len(self._ids):
+            return 0
+        older, newer = self._items[self._ids[left]], self._items[self._ids[right]]
+        return int(_created_key(older.created_at) > _created_key(newer.created_at))
+
+    def _add(self, doc: IndexedItem):
+        self._items[doc.id] = doc
+        position = bisect_left(self._ids, doc.id)
+        self._unordered -= self._out_of_order(position - 1, position)
+        self._ids.insert(position, doc.id)
+        self._unordered += self._out_of_order(position - 1, position) + self._out_of_order(position, position + 1)
+        for gram in doc.grams():
+            postings = self._postings.get(gram)
+            if postings is None:
+                self._postings[gram] = array("I", (doc.id,))
+            else:
+                _insert(postings, doc.id)
+
+    def _remove(self, item_id: int):
+        doc = self._items.get(item_id)
+        if doc is None:
+            return
+        position = bisect_left(self._ids, item_id)
+        self._unordered -= self._out_of_order(position - 1, position) + self._out_of_order(position, position + 1)
+        del self._ids[position]
+        self._unordered += self._out_of_order(position - 1, position)
+        del self._items[item_id]
+        for gram in doc.grams():
+            postings = self._postings[gram]
+            del postings[bisect_left(postings, item_id)]
+            if not postings:
+                del self._postings[gram]
+
+    def _candidates(self, keyword: str) -> Iterator[int]:
+        """按 ID 倒序产出包含关键词全部 trigram 的商品 ID"""
+        grams = trigrams(keyword)
+        if not grams:
+            return reversed(self._ids)
+        postings = []
+        for gram in grams:
+            if gram not in self._postings:
+                return iter(())
+            postings.append(self._postings[gram])
+        postings.sort(key=len)
+        return _intersect_desc(postings)
+
+    def candidate_count(self, keyword: str) -> Optional[int]:
+        """搜索需要遍历的候选数量上限（最短倒排表的长度），关键词没有 trigram 时返回 None"""
+        grams = trigrams(keyword.lower())
+        if not grams:
+            return None
+        postings = self._postings
+        return min(len(postings.get(gram, ())) for gram in grams)
+
+    async def lookup(self, keyword: str, skip: int = 0, limit: int = 10) -> Optional[List[IndexedItem]]:
+        """/items/search 使用的搜索：短关键词和候选过多时返回 None（由数据库处理）"""
+        candidates = self.candidate_count(keyword)
+        if candidates is None or candidates > MAX_CANDIDATES:
+            self.fallbacks += 1
+            return None
+        if candidates > INLINE_CANDIDATES:
+            self.threaded_searches += 1
+            return await run_in_threadpool(self.search, keyword, skip, limit)
+        return self.search(keyword, skip, limit)
+
+    def search(self, keyword: str, skip: int = 0, limit: int = 10) -> List[IndexedItem]:
+        """返回名称或描述包含关键词（不区分大小写）的一页商品，按 (created_at, id) 倒序
+
+        同步执行、遍历全部候选，不限制候选数量；在事件循环中请使用 lookup()。
+        """
+        keyword = keyword.lower()
+        wanted = skip + limit
+        page: List[IndexedItem] = []
+        with self._lock:
+            self.searches += 1
+            matches = (self._items[item_id] for item_id in self._candidates(keyword))
+            matches = (doc for doc in matches if keyword in doc.text)
+            if self._unordered:
+                page = heapq.nlargest(wanted, matches, key=IndexedItem.order_key)
+            else:
+                # ID 倒序就是 (created_at, id) 倒序，凑够一页即可停止
+                for doc in matches:
+                    page.append(doc)
+                    if len(page) == wanted:
+                        break
+        return page[skip:]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            postings = list(self._postings.values())
+            return {
+                "enabled": settings.item_search_index,
+                "ready": self.ready,
+                "items": len(self),
+                "trigrams": len(postings),
+                "postings": sum(len(gram_postings) for gram_postings in postings),
+                "posting_bytes": sum(gram_postings.itemsize * len(gram_postings) for gram_postings in postings),
+                "unordered": self._unordered,
+                "build_seconds": round(self.build_seconds, 3),
+                "searches": self.searches,
+                "threaded_searches": self.threaded_searches,
+                "fallbacks": self.fallbacks,
+                "reloads": self.reloads,
+                "rebuilds": self.rebuilds,
+            }
+
+
+# 全局索引实例（未启用时 ready 为 False，搜索走数据库）
+item_index = ItemSearchIndex()
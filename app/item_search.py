@@ -0,0 +1,188 @@
+"""商品搜索后端
+
+LIKE '%kw%' 无法使用索引，每次搜索都是全表扫描，并且只匹配 name。
+这里按数据库选择全文索引后端，在 name 和 description 上检索并按相关度排序：
+
+- MySQL：FULLTEXT 索引 + ngram 分词（中文商品名没有空格分词），MATCH ... AGAINST
+- SQLite：FTS5 外部内容表 + trigram 分词（子串匹配，同样适用于中文），bm25 排序
+- 其他数据库、索引创建失败时：回退到原来的 LIKE 查询（只匹配 name）
+- 关键词短于分词长度（全文索引查不到）时：LIKE 匹配 name 和 description，检索范围与全文索引一致
+
+索引与 items 表的同步由数据库完成（MySQL 的 FULLTEXT 随写入更新，SQLite 由触发器维护），
+因此 crud 的创建/更新/删除以及启动时的初始化数据都不需要额外处理。
+偏移分页按相关度排序；游标分页仍按 (created_at, id) 排序，只用全文索引过滤。
+"""
+from typing import Dict, Optional, Type
+import logging
+
+from sqlalchemy import func, inspect, literal_column, or_, select, text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import ColumnElement, Select, column, table
+
+from . import models
+from .config import settings
+from .pagination import ITEM_ORDER
+
+logger = logging.getLogger(__name__)
+
+
+class LikeSearch:
+    """LIKE 子串匹配（只匹配 name，无需索引）"""
+
+    name = "like"
+    min_keyword_length = 1  # 关键词短于该长度时使用 LIKE 查询
+
+    def setup(self, connection: Connection):
+        """创建或检查索引，失败时抛出异常"""
+
+    def criteria(self, keyword: str) -> ColumnElement:
+        return models.Item.name.contains(keyword, autoescape=True)
+
+    def ranked(self, keyword: str) -> Select:
+        return select(models.Item).filter(self.criteria(keyword)).order_by(*ITEM_ORDER)
+
+
+class ShortKeywordSearch(LikeSearch):
+    """全文索引查不到的短关键词：LIKE 匹配 name 和 description"""
+
+    name = "like_all"
+
+    def criteria(self, keyword: str) -> ColumnElement:
+        return or_(
+            models.Item.name.contains(keyword, autoescape=True),
+            models.Item.description.contains(keyword, autoescape=True),
+        )
+
+
+class MySQLFullTextSearch(LikeSearch):
+    """MySQL FULLTEXT (name, description) WITH PARSER ngram"""
+
+    name = "fulltext"
+    index_name = "ft_items_name_description"
+    min_keyword_length = 2  # ngram_token_size 默认值，更短的关键词在索引中查不到
+
+    def setup(self, connection: Connection):
+        indexes = {index["name"] for index in inspect(connection).get_indexes(models.Item.__tablename__)}
+        if self.index_name not in indexes:
+            logger.info("创建商品全文索引（FULLTEXT ngram）")
+            connection.execute(text(
+                f"ALTER TABLE {models.Item.__tablename__} "
+                f"ADD FULLTEXT INDEX {self.index_name} (name, description) WITH PARSER ngram"
+            ))
+
+    def _match(self, against: str) -> mysql.match:
+        return mysql.match(models.Item.name, models.Item.description, against=against)
+
+    def criteria(self, keyword: str) -> ColumnElement:
+        # 布尔模式的短语查询：ngram 词元必须连续出现，效果接近子串匹配
+        return self._match('"' + keyword.replace('"', " ") + '"').in_boolean_mode()
+
+    def ranked(self, keyword: str) -> Select:
+        relevance = self._match(keyword).in_natural_language_mode()
+        return select(models.Item).filter(self.criteria(keyword)).order_by(relevance.desc(), *ITEM_ORDER)
+
+
+class SQLiteFTS5Search(LikeSearch):
+    """SQLite FTS5 外部内容表（tokenize='trigram'），由 items 表上的触发器同步"""
+
+    name = "fts5"
+    min_keyword_length = 3  # trigram 分词至少需要 3 个字符
+    name_weight = 10.0  # bm25 中 name 相对 description 的权重
+
+    fts = table("items_fts", column("rowid"))
+
+    def setup(self, connection: Connection):
+        items = models.Item.__tablename__
+        created = not inspect(connection).has_table("items_fts")
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+            f"name, description, content='{items}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON {items} BEGIN "
+            f"INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+            f"CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON {items} BEGIN "
+            f"INSERT INTO items_fts(items_fts, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description); END",
+            f"CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF name, description ON {items} BEGIN "
+            f"INSERT INTO items_fts(items_fts, rowid, name, description) "
+            f"VALUES ('delete', old.id, old.name, old.description); "
+            f"INSERT INTO items_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        ]
+        for statement in statements:
+            connection.execute(text(statement))
+        if created:
+            logger.info("创建商品全文索引（FTS5 trigram）")
+            connection.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+
+    def _match(self, keyword: str) -> ColumnElement:
+        # 整个关键词作为一个短语，trigram 分词下等价于子串匹配（不区分大小写）
+        return literal_column("items_fts").op("MATCH")('"' + keyword.replace('"', '""') + '"')
+
+    def criteria(self, keyword: str) -> ColumnElement:
+        return models.Item.id.in_(select(self.fts.c.rowid).where(self._match(keyword)))
+
+    def ranked(self, keyword: str) -> Select:
+        hits = select(
+            self.fts.c.rowid.label("id"),
+            func.bm25(literal_column("items_fts"), self.name_weight, 1.0).label("score"),
+        ).where(self._match(keyword)).subquery()
+        return (
+            select(models.Item)
+            .join(hits, hits.c.id == models.Item.id)
+            .order_by(hits.c.score, *ITEM_ORDER)  # bm25 越小越相关
+        )
+
+
+# SEARCH_BACKEND=auto 时按数据库方言选择
+DIALECT_BACKENDS: Dict[str, Type[LikeSearch]] = {
+    "mysql": MySQLFullTextSearch,
+    "sqlite": SQLiteFTS5Search,
+}
+NAMED_BACKENDS: Dict[str, Type[LikeSearch]] = {
+    backend.name: backend for backend in (LikeSearch, MySQLFullTextSearch, SQLiteFTS5Search)
+}
+
+
+class ItemSearch:
+    """当前使用的搜索后端，启动时由 setup() 根据配置和数据库选择"""
+
+    def __init__(self):
+        self.backend: LikeSearch = LikeSearch()
+        self._like = self.backend
+        self._short = ShortKeywordSearch()
+
+    def setup(self, engine: Engine, name: Optional[str] = None) -> LikeSearch:
+        name = name or settings.search_backend
+        if name == "auto":
+            backend_class = DIALECT_BACKENDS.get(engine.dialect.name, LikeSearch)
+        else:
+            backend_class = NAMED_BACKENDS.get(name, LikeSearch)
+            if backend_class is not LikeSearch and backend_class is not DIALECT_BACKENDS.get(engine.dialect.name):
+                logger.warning(f"搜索后端 {name} 不支持 {engine.dialect.name} 数据库，使用 LIKE 查询")
+                backend_class = LikeSearch
+
+        backend = backend_class()
+        try:
+            with engine.begin() as connection:
+                backend.setup(connection)
+        except Exception as e:
+            logger.warning(f"搜索索引初始化失败，使用 LIKE 查询: {e}")
+            backend = self._like
+        self.backend = backend
+        return backend
+
+    def _backend_for(self, keyword: str) -> LikeSearch:
+        if len(keyword.strip()) < self.backend.min_keyword_length:
+            return self._short
+        return self.backend
+
+    def criteria(self, keyword: str) -> ColumnElement:
+        """搜索条件（用于游标分页）"""
+        return self._backend_for(keyword).criteria(keyword)
+
+    def statement(self, keyword: str, skip: int = 0, limit: int = 10) -> Select:
+        """按相关度排序的一页搜索结果"""
+        return self._backend_for(keyword).ranked(keyword).offset(skip).limit(limit)
+
+
+item_search = ItemSearch()
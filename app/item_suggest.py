@@ -0,0 +1,113 @@
+"""商品名称前缀补全（/items/suggest）
+
+搜索框每次按键都请求一次，不能走 LIKE 全表扫描。这里在进程内维护按规范化名称排序的数组，
+前缀查询用二分查找定位第一个不小于前缀的位置，再顺序读取以前缀开头的名称，
+耗时只和返回条数有关（微秒级）。结果按字典序返回，与 Redis ZRANGEBYLEX 的语义相同。
+
+规范化：NFKC（全角字母数字转半角）+ casefold（不区分大小写），按 Unicode 码位比较，
+中文等 CJK 前缀可以直接匹配，不需要像按字节比较的 ZRANGEBYLEX 那样构造上界。
+
+数据同步与 trigram 索引相同（item_index.ItemMirror）：crud 的写入同步更新本进程的数组，
+其他 worker 的修改通过商品缓存失效消息重新加载，重新订阅后以及定时从数据库全量重建。
+"""
+from bisect import bisect_left, insort
+from typing import Any, Dict, List
+import time
+import unicodedata
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .item_index import ItemMirror
+
+SEPARATOR = "\0"  # 排序键 = 规范化名称 + SEPARATOR + 原始名称
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _sort_key(name: str) -> str:
+    return normalize(name) + SEPARATOR + name
+
+
+class NameSuggester(ItemMirror):
+    """有序的商品名称数组（同名商品只保留一条，记录引用次数）"""
+
+    name = "商品名称补全"
+
+    def __init__(self):
+        super().__init__()
+        self._keys: List[str] = []
+        self._counts: Dict[str, int] = {}  # 排序键 -> 使用该名称的商品数
+        self._names: Dict[int, str] = {}  # 商品 ID -> 名称
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def build(self, db: Session):
+        """从数据库加载全部商品名称，完成后替换当前数组（启动和全量重建时调用）"""
+        start = time.perf_counter()
+        names = {item_id: name for item_id, name in db.execute(select(models.Item.id, models.Item.name))}
+        counts: Dict[str, int] = {}
+        for name in names.values():
+            key = _sort_key(name)
+            counts[key] = counts.get(key, 0) + 1
+        keys = sorted(counts)
+        with self._lock:
+            self._names, self._counts, self._keys = names, counts, keys
+            self.ready = True
+        self.build_seconds = time.perf_counter() - start
+
+    def add(self, item: Any):
+        """新增或更新商品"""
+        if not self.ready:
+            return
+        with self._lock:
+            self._touched(item.id)
+            if self._names.get(item.id) == item.name:
+                return
+            self._discard(item.id)
+            self._names[item.id] = item.name
+            key = _sort_key(item.name)
+            if key in self._counts:
+                self._counts[key] += 1
+            else:
+                self._counts[key] = 1
+                insort(self._keys, key)
+
+    def remove(self, item_id: int):
+        if not self.ready:
+            return
+        with self._lock:
+            self._touched(item_id)
+            self._discard(item_id)
+
+    def _discard(self, item_id: int):
+        name = self._names.pop(item_id, None)
+        if name is None:
+            return
+        key = _sort_key(name)
+        self._counts[key] -= 1
+        if self._counts[key] == 0:
+            del self._counts[key]
+            del self._keys[bisect_left(self._keys, key)]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """返回以 prefix 开头的商品名称（字典序，最多 limit 个）"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        names = []
+        with self._lock:
+            keys = self._keys
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and len(names) < limit and keys[i].startswith(prefix):
+                names.append(keys[i].split(SEPARATOR, 1)[1])
+                i += 1
+        return names
+
+
+# 全局实例（未启用时 ready 为 False，/items/suggest 查询数据库）
+item_suggester = NameSuggester()
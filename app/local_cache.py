@@ -0,0 +1,94 @@
+"""进程内 L1 缓存
+
+有界的 TTL + LRU 缓存：条目数和估算字节数都有上限，超出时淘汰最久未使用的条目，
+过期条目在读取时惰性删除。只在单个事件循环中使用，不加锁。
+缓存的是对象本身（不复制），调用方不要修改取到的值。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import time
+
+
+class LocalCache:
+    """TTL/LRU 缓存，key -> (过期时间, 估算字节数, 值)"""
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 16 * 1024 * 1024, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key, size)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl: Optional[float] = None):
+        """写入条目，size 为值的估算字节数（用于内存上限和统计）"""
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= old[1]
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        self._entries[key] = (expires_at, size, value)
+        self.memory_bytes += size
+
+        while len(self._entries) > self.max_entries or self.memory_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.memory_bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, keys: Iterable[str]) -> int:
+        removed = 0
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._remove(key, entry[1])
+                removed += 1
+        self.invalidations += removed
+        return removed
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.memory_bytes = 0
+
+    def _remove(self, key: str, size: int):
+        del self._entries[key]
+        self.memory_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_bytes": self.memory_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
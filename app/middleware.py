@@ -1,13 +1,23 @@
-from fastapi import FastAPI, Request, HTTPException, status
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.requests import HTTPConnection
+from starlette.types import Scope
 from .config import settings
-from .redis_client import redis_client
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-import json
-import hashlib
+from .route_matcher import RouteTemplateMatcher
+from .security import get_token_subject
+from .rate_limit import (
+    RATE_LIMIT_ALGORITHM,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_LOCAL_LEASE,
+    RATE_LIMIT_REDIS_FALLBACK,
+    FallbackRateLimitBackend,
+    LeasedRateLimitBackend,
+    MemoryRateLimitBackend,
+    RateLimitResult,
+    RedisRateLimitBackend,
+)
 import os
-from typing import Dict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 def setup_cors(app: FastAPI):
     """配置 CORS 中间件"""
@@ -39,86 +49,143 @@ def _get_rate_limits() -> Dict[str, Dict[str, int]]:
 
 RATE_LIMITS = _get_rate_limits()
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """改进的速率限制中间件"""
-
-    def __init__(self, app):
-        super().__init__(app)
-
-    def _get_rate_limit_config(self, path: str, method: str) -> Dict[str, int]:
-        """根据路径和请求方法获取速率限制配置"""
-        # 登录相关请求使用严格限制
-        if "/auth/login" in path:
-            return RATE_LIMITS["login"]
-
-        # 文档日志 POST 使用严格限制
-        if path == "/api/docs/log" and method == "POST":
-            return RATE_LIMITS["strict"]
-
-        # 其他请求使用默认限制
-        return RATE_LIMITS["default"]
-
-    async def dispatch(self, request: Request, call_next):
-        # 对所有需要保护的路径进行速率限制
-        path = request.url.path
-
-        # 排除健康检查等公开接口
-        if path in ["/health", "/ping", "/api/docs", "/redoc"]:
-            return await call_next(request)
-
-        client_ip = (
-            request.headers.get("x-forwarded-for", "").split(",")[0].strip() or
-            request.headers.get("x-real-ip") or
-            (request.client.host if request.client else "unknown")
-        )
-
-        # 获取速率限制配置
-        rate_config = self._get_rate_limit_config(path, request.method)
-        rate_key = f"ratelimit:{path}:{client_ip}"
-
-        try:
-            # 获取当前计数
-            current = await redis_client.get(rate_key)
-            current = int(current) if current else 0
-
-            # 检查是否超过限制
-            if current >= rate_config["requests"]:
-                return JSONResponse(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    content={
-                        "error": True,
-                        "message": "请求过于频繁，请稍后再试",
-                        "limit": rate_config["requests"],
-                        "window": rate_config["window"]
-                    },
-                    headers={
-                        "X-RateLimit-Limit": str(rate_config["requests"]),
-                        "X-RateLimit-Remaining": "0",
-                        "X-RateLimit-Reset": str(rate_config["window"]),
-                        "Retry-After": str(rate_config["window"])
-                    }
-                )
-
-            # 增加计数
-            await redis_client.set(rate_key, str(current + 1), rate_config["window"])
-
-            response = await call_next(request)
-
-            # 添加速率限制响应头
-            remaining = max(0, rate_config["requests"] - current - 1)
-            response.headers["X-RateLimit-Limit"] = str(rate_config["requests"])
-            response.headers["X-RateLimit-Remaining"] = str(remaining)
-
-            return response
-
-        except Exception as e:
-            if settings.debug:
-                print(f"Rate limit error: {e}")
-            # Redis 出错时不限制，继续请求（fail-open 策略）
-            return await call_next(request)
+# 不做速率限制的路径（健康检查等公开接口）
+RATE_LIMIT_EXEMPT_PATHS = frozenset(["/health", "/ping", "/api/docs", "/redoc"])
+
+# 速率限制策略表（按路由模板和请求方法匹配，启动时编译）
+#   route:   路由模板（与 @router.get 中的路径一致）
+#   methods: 适用的请求方法，省略表示全部方法
+#   limit:   RATE_LIMITS 中的配置名，默认 "default"
+#   key:     计数维度，"ip"（默认）或 "user"（JWT sub，未登录时退回 IP）
+#   bucket:  计数桶名称，多个接口填同一个名称即共享配额，默认为路由模板本身
+#   cost:    每次请求消耗的配额，默认 1
+# 未列出的路由使用 default 配置、按 IP 计数、每个路由模板一个桶
+RATE_LIMIT_POLICIES: List[Dict[str, Any]] = [
+    # 登录相关请求使用严格限制
+    {"route": "/auth/login", "limit": "login"},
+    # 文档日志 POST 使用严格限制
+    {"route": "/api/docs/log", "methods": ["POST"], "limit": "strict"},
+    # 商品读取接口共享配额，搜索较重按 5 次计
+    {"route": "/items/", "methods": ["GET"], "bucket": "items:read"},
+    {"route": "/items/{item_id}", "methods": ["GET"], "bucket": "items:read"},
+    {"route": "/items/search", "methods": ["GET"], "bucket": "items:read", "cost": 5},
+    # 商品写操作按登录用户计数
+    {"route": "/items/", "methods": ["POST"], "key": "user"},
+    {"route": "/items/{item_id}", "methods": ["PUT", "DELETE"], "key": "user"},
+]
+
+# 没有匹配到任何路由的请求（404、扫描器）共用一个模板，避免按原始路径产生大量计数键
+UNMATCHED_ROUTE = "<unmatched>"
+
+class RateLimitPolicy(NamedTuple):
+    """编译后的速率限制策略"""
+    limit: int
+    window: int
+    cost: int
+    key_by: str
+    key_prefix: str  # ratelimit:{bucket}:
+
+def _compile_policy(bucket: str, limit: str = "default", key: str = "ip", cost: int = 1) -> RateLimitPolicy:
+    if limit not in RATE_LIMITS:
+        raise ValueError(f"速率限制策略引用了不存在的配置: {limit}")
+    if key not in ("ip", "user"):
+        raise ValueError(f"不支持的速率限制计数维度: {key}")
+    return RateLimitPolicy(
+        limit=RATE_LIMITS[limit]["requests"],
+        window=RATE_LIMITS[limit]["window"],
+        cost=cost,
+        key_by=key,
+        key_prefix=f"ratelimit:{bucket}:",
+    )
+
+def _get_request_token(scope: Scope) -> Optional[str]:
+    """从 Authorization 头或 httpOnly cookie 中取出令牌"""
+    connection = HTTPConnection(scope)
+    authorization = connection.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        return authorization[7:].strip() or None
+    return connection.cookies.get("access_token")
+
+class RateLimiter:
+    """改进的速率限制器（由安全管道调用）"""
+
+    def __init__(self, route_templates: Iterable[str] = ()):
+        self.backend = self._create_backend()
+
+        templates = list(dict.fromkeys(route_templates))
+        self.matcher = RouteTemplateMatcher(templates)
+        self.policies = self._compile_policies(templates)
+
+    def _create_backend(self):
+        """根据 RATE_LIMIT_BACKEND 等配置创建限流后端"""
+        if RATE_LIMIT_BACKEND == "shared_memory":
+            # 单机多 worker：共享内存计数，不依赖 Redis
+            from .rate_limit_shm import SharedMemoryRateLimitBackend
+            return SharedMemoryRateLimitBackend()
+        if RATE_LIMIT_BACKEND != "redis":
+            raise ValueError(f"不支持的速率限制后端: {RATE_LIMIT_BACKEND}，可选: redis, shared_memory")
+        if settings.redis_backend == "memory":
+            # 进程内 Redis 后端不能执行 Lua 脚本，直接在进程内计数（效果相同）
+            return MemoryRateLimitBackend()
+
+        if RATE_LIMIT_LOCAL_LEASE:
+            # 两级模式：进程内令牌桶，按块从 Redis 租借配额（租借脚本只有固定窗口语义）
+            if RATE_LIMIT_ALGORITHM != "fixed_window":
+                print(f"⚠️  RATE_LIMIT_LOCAL_LEASE=true 只支持固定窗口，忽略 RATE_LIMIT_ALGORITHM={RATE_LIMIT_ALGORITHM}")
+            backend = LeasedRateLimitBackend()
+        else:
+            # 计数和判定在 Redis 端原子完成（算法由 RATE_LIMIT_ALGORITHM 选择）
+            backend = RedisRateLimitBackend()
+
+        if RATE_LIMIT_REDIS_FALLBACK == "memory":
+            # Redis 不可用时降级为进程内限流，恢复后自动切回
+            backend = FallbackRateLimitBackend(backend)
+        return backend
+
+    def _compile_policies(self, templates: List[str]) -> Dict[Tuple[str, str], RateLimitPolicy]:
+        """把策略表编译成 (路由模板, 方法) -> 策略 的字典，"*" 表示任意方法"""
+        policies: Dict[Tuple[str, str], RateLimitPolicy] = {}
+        for template in templates + [UNMATCHED_ROUTE]:
+            policies[(template, "*")] = _compile_policy(template)
+
+        for entry in RATE_LIMIT_POLICIES:
+            template = entry["route"]
+            policy = _compile_policy(
+                entry.get("bucket", template),
+                limit=entry.get("limit", "default"),
+                key=entry.get("key", "ip"),
+                cost=entry.get("cost", 1),
+            )
+            for method in entry.get("methods", ["*"]):
+                policies[(template, method.upper())] = policy
+        return policies
+
+    def get_policy(self, path: str, method: str) -> RateLimitPolicy:
+        """根据路由模板和请求方法获取速率限制策略"""
+        template = self.matcher.match(path) or UNMATCHED_ROUTE
+        policy = self.policies.get((template, method))
+        if policy is None:
+            policy = self.policies.get((template, "*")) or self.policies[(UNMATCHED_ROUTE, "*")]
+        return policy
+
+    async def hit(self, scope: Scope, client_ip: str) -> Optional[RateLimitResult]:
+        """记录一次请求并返回检查结果，Redis 不可用时返回 None（fail-open 策略）"""
+        policy = self.get_policy(scope["path"], scope["method"])
+
+        identity = client_ip
+        if policy.key_by == "user":
+            token = _get_request_token(scope)
+            subject = get_token_subject(token) if token else None
+            if subject:
+                identity = f"user:{subject}"
+
+        return await self.backend.hit(policy.key_prefix + identity, policy.limit, policy.window, policy.cost)
+
+    def stats(self) -> Dict[str, Any]:
+        """速率限制后端统计"""
+        return self.backend.stats()
 
 def setup_middleware(app: FastAPI):
     """设置所有中间件"""
+    # 速率限制已并入安全管道（见 security_pipeline.py），这里只剩 CORS
     setup_cors(app)
-    # 添加速率限制中间件
-    app.add_middleware(RateLimitMiddleware)
\ No newline at end of file
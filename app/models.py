@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -13,6 +13,10 @@ class Item(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        Index("ix_items_created_at_id", "created_at", "id"),  # 列表排序和游标分页
+    )
+
 class DocLog(Base):
     """文档操作日志模型"""
     __tablename__ = "doc_logs"
@@ -0,0 +1,72 @@
+"""商品列表的游标（keyset）分页
+
+按 (created_at DESC, id DESC) 排序，下一页从上一页最后一行的 (created_at, id) 之后继续：
+    WHERE created_at <= :c AND (created_at < :c OR id < :i)
+配合 ix_items_created_at_id 复合索引直接定位到上一页结束的位置，任何一页都只读取约 limit + 1 行，
+不像 OFFSET 那样要先扫描并丢弃前面 skip 行。
+（单独的 created_at <= :c 是为了让 SQLite 也能走索引范围查找，只写 OR 条件时会退化成全索引扫描）
+
+游标是 urlsafe base64 编码的 JSON，客户端只需原样传回。created_at 保存数据库返回的原始文本
+（SQLite 的 CURRENT_TIMESTAMP 没有微秒，按 datetime 绑定参数时会带上 .000000，比较结果不对）。
+"""
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, cast, desc, literal, or_, select
+from sqlalchemy.sql import Select
+
+from . import models
+
+Cursor = Tuple[str, int]
+
+# 排序键的文本形式，和商品一起查询出来用于生成下一页游标
+CREATED_AT_TEXT = cast(models.Item.created_at, String).label("created_at_text")
+
+# 偏移分页和游标分页共用的排序（id 保证 created_at 相同时顺序稳定）
+ITEM_ORDER = (desc(models.Item.created_at), desc(models.Item.id))
+
+
+class InvalidCursor(ValueError):
+    """游标格式不正确（被篡改或来自其他版本）"""
+
+
+def encode_cursor(created_at: str, item_id: int) -> str:
+    raw = json.dumps([created_at, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Optional[Cursor]:
+    """空字符串表示第一页，返回 None"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, item_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"无效的分页游标: {cursor}") from e
+    if not isinstance(created_at, str) or not isinstance(item_id, int):
+        raise InvalidCursor(f"无效的分页游标: {cursor}")
+    return created_at, item_id
+
+
+def keyset_statement(cursor: Optional[Cursor], limit: int, *criteria: Any) -> Select:
+    """查询一页商品（多取一行判断是否还有下一页），结果行为 (Item, created_at 文本)"""
+    stmt = select(models.Item, CREATED_AT_TEXT).filter(*criteria)
+    if cursor is not None:
+        created_at, item_id = cursor
+        created_at = literal(created_at, String)
+        stmt = stmt.filter(
+            models.Item.created_at <= created_at,
+            or_(models.Item.created_at < created_at, models.Item.id < item_id),
+        )
+    return stmt.order_by(*ITEM_ORDER).limit(limit + 1)
+
+
+def build_page(rows: Sequence[Any], limit: int) -> Tuple[List[models.Item], Optional[str]]:
+    """返回 (本页商品, 下一页游标)，没有下一页时游标为 None"""
+    items = [row[0] for row in rows[:limit]]
+    if len(rows) <= limit:
+        return items, None
+    last_item, last_created_at = rows[limit - 1]
+    return items, encode_cursor(last_created_at, last_item.id)
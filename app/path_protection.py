@@ -1,7 +1,5 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-from typing import Set, List, Pattern
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 import re
 import os
 
@@ -75,94 +73,125 @@ CRAWLER_SUSPICIOUS_PATTERNS: List[str] = [
     r'/favicon.ico',  # 图标请求（爬虫）
 ]
 
-class PathProtectionMiddleware(BaseHTTPMiddleware):
-    """敏感路径保护中间件"""
+# 路径检查结果
+PATH_SENSITIVE = "sensitive"
+PATH_SUSPICIOUS = "suspicious"
+
+# 额外模式文件：每行 "sensitive: <正则>" 或 "suspicious: <正则>"，# 开头为注释
+PATH_PROTECTION_PATTERNS_FILE = os.getenv('PATH_PROTECTION_PATTERNS_FILE', '')
+# 判定结果缓存条数（按原始路径），0 表示不缓存
+PATH_PROTECTION_CACHE_SIZE = int(os.getenv('PATH_PROTECTION_CACHE_SIZE', '4096'))
+
+def _read_pattern_file(path: str) -> Tuple[List[str], List[str]]:
+    """从文件读取额外的敏感/可疑模式，无效行打印警告后跳过"""
+    sensitive: List[str] = []
+    suspicious: List[str] = []
+    if not path:
+        return sensitive, suspicious
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+    except OSError as e:
+        print(f"⚠️  无法读取路径模式文件 {path}: {e}")
+        return sensitive, suspicious
+    
+    for line in lines:
+        if not line or line.startswith('#'):
+            continue
+        kind, _, pattern = line.partition(':')
+        kind, pattern = kind.strip().lower(), pattern.strip()
+        if kind not in (PATH_SENSITIVE, PATH_SUSPICIOUS) or not pattern:
+            print(f"⚠️  无效的路径模式行: {line}")
+            continue
+        # 在合并后的正则中校验：单独能编译的模式放进交替分组后仍可能出错
+        # （例如不在开头的全局标志 (?i)、与分组重名的 (?P<sensitive>...)）
+        if kind == PATH_SENSITIVE:
+            candidate = (SENSITIVE_PATTERNS + sensitive + [pattern], CRAWLER_SUSPICIOUS_PATTERNS + suspicious)
+        else:
+            candidate = (SENSITIVE_PATTERNS + sensitive, CRAWLER_SUSPICIOUS_PATTERNS + suspicious + [pattern])
+        try:
+            re.compile(_combined(*candidate), re.IGNORECASE)
+        except re.error as e:
+            print(f"⚠️  无效的路径模式 {pattern}: {e}")
+            continue
+        (sensitive if kind == PATH_SENSITIVE else suspicious).append(pattern)
+    return sensitive, suspicious
+
+def _alternation(patterns: List[str]) -> str:
+    return '|'.join(f'(?:{pattern})' for pattern in patterns) or '(?!)'
+
+def _combined(sensitive: List[str], suspicious: List[str]) -> str:
+    """敏感模式消耗字符，可疑模式放在零宽前瞻中，分组名表示命中的类别"""
+    return (
+        f'(?P<{PATH_SENSITIVE}>{_alternation(sensitive)})'
+        f'|(?=(?P<{PATH_SUSPICIOUS}>{_alternation(suspicious)}))'
+    )
+
+class PathProtection:
+    """敏感路径保护（由安全管道调用）
     
-    def __init__(self, app):
-        super().__init__(app)
-        # 编译正则表达式
-        self.sensitive_regex = [re.compile(pattern, re.IGNORECASE) for pattern in SENSITIVE_PATTERNS]
-        self.crawler_regex = [re.compile(pattern, re.IGNORECASE) for pattern in CRAWLER_SUSPICIOUS_PATTERNS]
+    所有模式合并成一个交替正则，一次扫描即可判断路径属于哪一类：
+    每个位置先尝试敏感模式（消耗字符），再用零宽前瞻尝试可疑模式，
+    这样可疑模式命中后不会跳过其后可能出现的敏感片段。
+    """
+    
+    def __init__(self, patterns_file: str = PATH_PROTECTION_PATTERNS_FILE, cache_size: int = PATH_PROTECTION_CACHE_SIZE):
+        extra_sensitive, extra_suspicious = _read_pattern_file(patterns_file)
+        self.sensitive_patterns = SENSITIVE_PATTERNS + extra_sensitive
+        self.suspicious_patterns = CRAWLER_SUSPICIOUS_PATTERNS + extra_suspicious
+        
+        # 编译正则表达式（sensitive_regex 用于可疑片段之后的敏感片段检查）
+        self.sensitive_regex = re.compile(_alternation(self.sensitive_patterns), re.IGNORECASE)
+        self.combined_regex = re.compile(_combined(self.sensitive_patterns, self.suspicious_patterns), re.IGNORECASE)
+        
+        # 重复路径（扫描器反复探测、正常接口）直接查缓存
+        self.cache_size = cache_size
+        self._cached_check = lru_cache(maxsize=cache_size)(self._scan) if cache_size > 0 else None
         
         # 启用严格模式（从环境变量读取）
         self.strict_mode = os.getenv('PATH_PROTECTION_STRICT', 'false').lower() == 'true'
         
-        print(f"🛡️  路径保护已启用: 敏感模式={len(self.sensitive_regex)}个, 可疑模式={len(self.crawler_regex)}个, 严格模式={self.strict_mode}")
+        print(f"🛡️  路径保护已启用: 敏感模式={len(self.sensitive_patterns)}个, 可疑模式={len(self.suspicious_patterns)}个, 严格模式={self.strict_mode}")
+    
+    def _scan(self, path: str) -> Optional[str]:
+        match = self.combined_regex.search(path)
+        if match is None:
+            return None
+        if match.group(PATH_SENSITIVE) is not None:
+            return PATH_SENSITIVE
+        # 最左边是可疑片段，敏感片段只可能出现在它之后
+        if self.sensitive_regex.search(path, match.start() + 1):
+            return PATH_SENSITIVE
+        return PATH_SUSPICIOUS
     
-    def _is_sensitive_path(self, path: str) -> bool:
-        """检查是否为敏感路径"""
-        return any(pattern.search(path) for pattern in self.sensitive_regex)
+    def check(self, path: str) -> Optional[str]:
+        """检查路径，返回 PATH_SENSITIVE / PATH_SUSPICIOUS，正常路径返回 None"""
+        if self._cached_check is not None:
+            return self._cached_check(path)
+        return self._scan(path)
     
-    def _is_suspicious_path(self, path: str) -> bool:
-        """检查是否为可疑路径（爬虫探测）"""
-        return any(pattern.search(path) for pattern in self.crawler_regex)
+    def stats(self) -> Dict[str, Any]:
+        """模式数量和判定缓存命中情况"""
+        stats: Dict[str, Any] = {
+            "sensitive_patterns": len(self.sensitive_patterns),
+            "suspicious_patterns": len(self.suspicious_patterns),
+            "strict_mode": self.strict_mode,
+            "cache_size": self.cache_size,
+        }
+        if self._cached_check is not None:
+            info = self._cached_check.cache_info()
+            stats.update(cache_entries=info.currsize, cache_hits=info.hits, cache_misses=info.misses)
+        return stats
     
-    def _log_suspicious_access(self, path: str, client_ip: str, user_agent: str):
+    def log_suspicious_access(self, path: str, client_ip: str, user_agent: str):
         """记录可疑访问"""
         print(f"⚠️  可疑访问检测: IP={client_ip}, Path={path}, UA={user_agent[:100]}")
         
         # 可以在这里添加更多告警逻辑，比如发送到日志系统、Slack等
-    
-    async def dispatch(self, request: Request, call_next):
-        """处理请求"""
-        path = request.url.path
-        
-        # 检查是否为敏感路径（直接拦截）
-        if self._is_sensitive_path(path):
-            client_ip = (
-                request.headers.get("x-forwarded-for", "").split(",")[0].strip() or
-                request.headers.get("x-real-ip") or
-                (request.client.host if request.client else "unknown")
-            )
-            user_agent = request.headers.get("user-agent", "unknown")
-            
-            print(f"🚫 阻止敏感路径访问: IP={client_ip}, Path={path}, UA={user_agent[:100]}")
-            
-            return JSONResponse(
-                status_code=404,
-                content={
-                    "error": True,
-                    "message": "Not Found",
-                    "code": "PATH_BLOCKED"
-                }
-            )
-        
-        # 检查是否为可疑路径（记录但允许）
-        if self._is_suspicious_path(path):
-            client_ip = (
-                request.headers.get("x-forwarded-for", "").split(",")[0].strip() or
-                request.headers.get("x-real-ip") or
-                (request.client.host if request.client else "unknown")
-            )
-            user_agent = request.headers.get("user-agent", "unknown")
-            
-            self._log_suspicious_access(path, client_ip, user_agent)
-            
-            # 严格模式下，可疑路径也会被阻止
-            if self.strict_mode:
-                print(f"🚫 严格模式阻止可疑路径: IP={client_ip}, Path={path}")
-                return JSONResponse(
-                    status_code=404,
-                    content={
-                        "error": True,
-                        "message": "Not Found",
-                        "code": "SUSPICIOUS_PATH"
-                    }
-                )
-        
-        # 添加安全头
-        response = await call_next(request)
-        
-        # 移除可能泄露服务器信息的头
-        try:
-            del response.headers["X-Powered-By"]
-        except KeyError:
-            pass
-        
-        return response
 
 
-def setup_path_protection(app):
-    """设置路径保护中间件"""
-    print("🛡️  启用路径保护中间件")
-    app.add_middleware(PathProtectionMiddleware)
+def create_path_protection() -> PathProtection:
+    """创建路径保护"""
+    print("🛡️  启用路径保护")
+    return PathProtection()
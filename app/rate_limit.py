@@ -0,0 +1,372 @@
+"""速率限制引擎
+
+计数、过期和判定都在 Redis 服务器端的 Lua 脚本里完成（EVALSHA），
+每个请求只需一次往返，多个 worker 之间也不存在先读后写的竞争。
+
+支持三种算法（RATE_LIMIT_ALGORITHM）：
+- fixed_window：固定窗口计数，窗口从第一次请求开始，期间不会被刷新
+- sliding_log：滑动窗口日志（有序集合），精确统计最近 window 秒内的请求
+- gcra：通用信元速率算法（令牌桶的等价形式），允许突发 limit 个请求后匀速放行
+
+可选的两级模式（RATE_LIMIT_LOCAL_LEASE=true）：每个 worker 按块从 Redis 租借配额，
+放在进程内的令牌桶里，大部分请求不需要访问 Redis。租借只有固定窗口语义，
+此时 RATE_LIMIT_ALGORITHM 的 sliding_log / gcra 不生效。
+
+Redis 不可用时自动切换到进程内的固定窗口计数（RATE_LIMIT_REDIS_FALLBACK=memory），
+定期探测 Redis，恢复后自动切回。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Set
+import asyncio
+import math
+import os
+import time
+
+from .redis_client import redis_client
+
+# 所有脚本返回 {是否允许, 剩余次数, 距离重置的毫秒数, 需要等待的毫秒数}
+# 时间统一取 Redis 服务器时间，避免各 worker 时钟不一致
+_SERVER_TIME_MS = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+"""
+
+FIXED_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local pttl = redis.call('PTTL', KEYS[1])
+local ttl = pttl
+if ttl < 0 then ttl = window end
+if current + cost > limit then
+    return {0, math.max(0, limit - current), ttl, ttl}
+end
+current = redis.call('INCRBY', KEYS[1], cost)
+if pttl < 0 then
+    -- 只在窗口开始时设置过期时间，后续请求不会刷新 TTL
+    redis.call('PEXPIRE', KEYS[1], window)
+end
+return {1, math.max(0, limit - current), ttl, 0}
+"""
+
+SLIDING_LOG_SCRIPT = _SERVER_TIME_MS + """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local nonce = ARGV[4]
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count + cost > limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    local wait = window
+    if oldest[2] then wait = tonumber(oldest[2]) + window - now end
+    return {0, math.max(0, limit - count), wait, wait}
+end
+for i = 1, cost do
+    redis.call('ZADD', KEYS[1], now, nonce .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window)
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {1, limit - count - cost, tonumber(oldest[2]) + window - now, 0}
+"""
+
+GCRA_SCRIPT = _SERVER_TIME_MS + """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local emission = window / limit
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local new_tat = tat + emission * cost
+local allow_at = new_tat - window
+if allow_at > now then
+    local remaining = math.floor((now - (tat - window)) / emission)
+    return {0, math.max(0, remaining), math.ceil(tat - now), math.ceil(allow_at - now)}
+end
+redis.call('SET', KEYS[1], string.format('%.3f', new_tat), 'PX', math.max(1, math.ceil(new_tat - now)))
+local remaining = math.floor((now - allow_at) / emission)
+return {1, remaining, math.ceil(new_tat - now), 0}
+"""
+
+# 从固定窗口计数器中一次租借最多 chunk 个配额，返回 {租到的数量, 全局剩余, 窗口剩余毫秒}
+LEASE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local chunk = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local pttl = redis.call('PTTL', KEYS[1])
+local ttl = pttl
+if ttl < 0 then ttl = window end
+local grant = math.min(chunk, limit - current)
+if grant <= 0 then
+    return {0, 0, ttl}
+end
+current = redis.call('INCRBY', KEYS[1], grant)
+if pttl < 0 then
+    redis.call('PEXPIRE', KEYS[1], window)
+end
+return {grant, limit - current, ttl}
+"""
+
+ALGORITHM_SCRIPTS = {
+    "fixed_window": FIXED_WINDOW_SCRIPT,
+    "sliding_log": SLIDING_LOG_SCRIPT,
+    "gcra": GCRA_SCRIPT,
+}
+
+# 速率限制后端：redis（默认）或 shared_memory（单机多 worker 共享内存，无需 Redis）
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'redis').lower()
+
+# 速率限制算法（从环境变量读取）
+RATE_LIMIT_ALGORITHM = os.getenv('RATE_LIMIT_ALGORITHM', 'fixed_window')
+
+# 两级限流：进程内令牌桶 + 从 Redis 按块租借配额
+# 租借始终按固定窗口计算，启用时 RATE_LIMIT_ALGORITHM 不生效（启动时打印警告）
+RATE_LIMIT_LOCAL_LEASE = os.getenv('RATE_LIMIT_LOCAL_LEASE', 'false').lower() == 'true'
+RATE_LIMIT_LOCAL_TOLERANCE = float(os.getenv('RATE_LIMIT_LOCAL_TOLERANCE', '0.1'))  # 每次租借 limit 的 10%
+RATE_LIMIT_LOCAL_MAX_KEYS = int(os.getenv('RATE_LIMIT_LOCAL_MAX_KEYS', '10000'))
+
+# Redis 不可用时的降级策略：memory（进程内限流）或 open（不限流）
+RATE_LIMIT_REDIS_FALLBACK = os.getenv('RATE_LIMIT_REDIS_FALLBACK', 'memory').lower()
+RATE_LIMIT_REDIS_PROBE_INTERVAL = float(os.getenv('RATE_LIMIT_REDIS_PROBE_INTERVAL', '5'))  # 降级期间每5秒探测一次 Redis
+RATE_LIMIT_MEMORY_MAX_KEYS = int(os.getenv('RATE_LIMIT_MEMORY_MAX_KEYS', '10000'))
+
+
+class RateLimitResult(NamedTuple):
+    """一次速率限制检查的结果"""
+    allowed: bool
+    limit: int
+    window: int
+    remaining: int
+    reset: int  # 距离配额完全恢复的秒数（X-RateLimit-Reset）
+    retry_after: int = 0  # 被拒绝时需要等待的秒数（Retry-After）
+
+
+def _ms_to_seconds(ms: int) -> int:
+    return max(0, math.ceil(int(ms) / 1000))
+
+
+class RedisRateLimitBackend:
+    """基于 Redis Lua 脚本的速率限制后端（一次往返完成判定）"""
+
+    def __init__(self, algorithm: str = RATE_LIMIT_ALGORITHM):
+        if algorithm not in ALGORITHM_SCRIPTS:
+            raise ValueError(
+                f"不支持的速率限制算法: {algorithm}，可选: {', '.join(ALGORITHM_SCRIPTS)}"
+            )
+        self.algorithm = algorithm
+        self.script = ALGORITHM_SCRIPTS[algorithm]
+
+    async def hit(self, key: str, limit: int, window: int, cost: int = 1) -> Optional[RateLimitResult]:
+        """消耗 cost 个配额，Redis 不可用时返回 None"""
+        args = [limit, window * 1000, cost]
+        if self.algorithm == "sliding_log":
+            # 有序集合成员需要唯一
+            args.append(os.urandom(8).hex())
+
+        reply = await redis_client.run_script(self.script, keys=[f"{key}:{self.algorithm}"], args=args)
+        if not reply:
+            return None
+
+        allowed, remaining, reset_ms, retry_ms = reply
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limit,
+            window=window,
+            remaining=int(remaining),
+            reset=_ms_to_seconds(reset_ms),
+            retry_after=_ms_to_seconds(retry_ms),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "redis", "algorithm": self.algorithm}
+
+
+class _Lease:
+    """单个限流键在本进程内持有的配额"""
+
+    __slots__ = ("tokens", "expires_at", "global_remaining", "refilling")
+
+    def __init__(self):
+        self.tokens = 0
+        self.expires_at = 0.0  # 对应 Redis 窗口的结束时间（monotonic）
+        self.global_remaining = 0  # 最近一次租借时 Redis 中剩余的配额
+        self.refilling = False
+
+
+class LeasedRateLimitBackend:
+    """两级速率限制后端：进程内令牌桶 + 从 Redis 按块租借配额
+
+    每次向 Redis 租借 ceil(limit * tolerance) 个配额（固定窗口语义），
+    本地令牌消耗过半时在后台预取下一块。Redis 里的计数就是已租出的配额总数，
+    所以全局放行数不会超过 limit；误差只体现在各 worker 手里未用完的配额上，
+    最多可能提前拒绝约 2 × worker 数 × 块大小 个请求。
+    """
+
+    def __init__(self, tolerance: float = RATE_LIMIT_LOCAL_TOLERANCE, max_keys: int = RATE_LIMIT_LOCAL_MAX_KEYS):
+        self.tolerance = tolerance
+        self.max_keys = max_keys
+        self._leases: "OrderedDict[str, _Lease]" = OrderedDict()
+        self._refill_tasks: Set[asyncio.Task] = set()
+        self.local_hits = 0
+        self.redis_leases = 0
+
+    def _chunk_size(self, limit: int, cost: int) -> int:
+        return max(cost, math.ceil(limit * self.tolerance))
+
+    def _get_lease(self, key: str, now: float) -> _Lease:
+        lease = self._leases.get(key)
+        if lease is None or lease.expires_at <= now:
+            # 窗口已结束，剩余的本地配额作废
+            lease = _Lease()
+            self._leases[key] = lease
+            if len(self._leases) > self.max_keys:
+                self._leases.popitem(last=False)
+        self._leases.move_to_end(key)
+        return lease
+
+    async def _acquire(self, key: str, lease: _Lease, limit: int, window: int, chunk: int) -> bool:
+        """从 Redis 租借一块配额，Redis 不可用时返回 False"""
+        reply = await redis_client.run_script(LEASE_SCRIPT, keys=[f"{key}:lease"], args=[limit, window * 1000, chunk])
+        if not reply:
+            return False
+
+        granted, global_remaining, ttl_ms = reply
+        self.redis_leases += 1
+        lease.tokens += int(granted)
+        lease.global_remaining = int(global_remaining)
+        lease.expires_at = time.monotonic() + int(ttl_ms) / 1000
+        return True
+
+    async def _refill(self, key: str, lease: _Lease, limit: int, window: int, chunk: int):
+        try:
+            await self._acquire(key, lease, limit, window, chunk)
+        finally:
+            lease.refilling = False
+
+    def _result(self, allowed: bool, lease: _Lease, limit: int, window: int, now: float) -> RateLimitResult:
+        reset = max(0, math.ceil(lease.expires_at - now))
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            window=window,
+            remaining=min(limit, lease.tokens + lease.global_remaining),
+            reset=reset,
+            retry_after=0 if allowed else reset,
+        )
+
+    async def hit(self, key: str, limit: int, window: int, cost: int = 1) -> Optional[RateLimitResult]:
+        """消耗 cost 个配额，本地令牌足够时不访问 Redis；Redis 不可用时返回 None"""
+        now = time.monotonic()
+        lease = self._get_lease(key, now)
+        chunk = self._chunk_size(limit, cost)
+
+        if lease.tokens < cost:
+            if lease.expires_at > now and lease.global_remaining <= 0:
+                # 本窗口的全局配额已经租完，直接在本地拒绝
+                return self._result(False, lease, limit, window, now)
+            # 本地令牌不足，同步租借
+            if not await self._acquire(key, lease, limit, window, chunk):
+                return None
+            if lease.tokens < cost:
+                return self._result(False, lease, limit, window, now)
+        else:
+            self.local_hits += 1
+
+        lease.tokens -= cost
+
+        # 本地令牌消耗过半时，后台预取下一块
+        if lease.tokens * 2 < chunk and lease.global_remaining > 0 and not lease.refilling:
+            lease.refilling = True
+            task = asyncio.create_task(self._refill(key, lease, limit, window, chunk))
+            self._refill_tasks.add(task)
+            task.add_done_callback(self._refill_tasks.discard)
+
+        return self._result(True, lease, limit, window, now)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "local_lease",
+            "local_keys": len(self._leases),
+            "local_hits": self.local_hits,
+            "redis_leases": self.redis_leases,
+        }
+
+
+class MemoryRateLimitBackend:
+    """进程内固定窗口限流（键数量有上限，超出按 LRU 淘汰）"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        # {键: [已用配额, 窗口结束时间]}
+        self._windows: "OrderedDict[str, list]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: int, cost: int = 1) -> RateLimitResult:
+        now = time.monotonic()
+        entry = self._windows.get(key)
+        if entry is None or entry[1] <= now:
+            entry = [0, now + window]
+            self._windows[key] = entry
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        self._windows.move_to_end(key)
+
+        reset = max(0, math.ceil(entry[1] - now))
+        if entry[0] + cost > limit:
+            return RateLimitResult(False, limit, window, max(0, limit - entry[0]), reset, reset)
+
+        entry[0] += cost
+        return RateLimitResult(True, limit, window, limit - entry[0], reset)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "memory", "keys": len(self._windows), "max_keys": self.max_keys}
+
+
+class FallbackRateLimitBackend:
+    """Redis 不可用时降级到进程内限流，定期探测并在恢复后切回
+
+    降级期间不再逐请求访问 Redis（避免每次都等待超时、打印错误），
+    每 probe_interval 秒只放一个请求去探测。进程内限流按 worker 单独计数，
+    多 worker 部署时整体放行上限约为 worker 数 × limit。
+    """
+
+    def __init__(self, primary, fallback: Optional[MemoryRateLimitBackend] = None,
+                 probe_interval: float = RATE_LIMIT_REDIS_PROBE_INTERVAL):
+        self.primary = primary
+        self.fallback = fallback or MemoryRateLimitBackend()
+        self.probe_interval = probe_interval
+        self.degraded = False
+        self.failovers = 0
+        self.recoveries = 0
+        self._next_probe = 0.0
+
+    async def hit(self, key: str, limit: int, window: int, cost: int = 1) -> Optional[RateLimitResult]:
+        now = time.monotonic()
+        if not self.degraded or now >= self._next_probe:
+            result = await self.primary.hit(key, limit, window, cost)
+            if result is not None:
+                if self.degraded:
+                    self.degraded = False
+                    self.recoveries += 1
+                    print("✅ Redis 已恢复，速率限制切回 Redis")
+                return result
+
+            if not self.degraded:
+                self.degraded = True
+                self.failovers += 1
+                print("⚠️  Redis 不可用，速率限制降级为进程内计数")
+            self._next_probe = now + self.probe_interval
+
+        return await self.fallback.hit(key, limit, window, cost)
+
+    def stats(self) -> Dict[str, Any]:
+        primary = self.primary.stats()
+        return {
+            **primary,
+            "mode": "memory_fallback" if self.degraded else primary["mode"],
+            "failovers": self.failovers,
+            "recoveries": self.recoveries,
+            "fallback": self.fallback.stats(),
+        }
@@ -0,0 +1,119 @@
+"""共享内存速率限制后端（单机多 worker）
+
+同一台机器上的所有 worker 进程 mmap 同一个固定大小的文件（默认在 /dev/shm），
+文件被划分为若干组，每组 GROUP_SIZE 个槽位，每个槽位保存
+（键哈希, 窗口结束时间, 已用配额）。一个键只会落在固定的一组里，
+读改写整组时用 fcntl 字节范围锁锁住该组，不同组之间互不阻塞。
+
+组内没有空位时淘汰窗口最早结束的槽位，所以内存固定，不会随键数量增长。
+只支持固定窗口语义，仅适用于 Linux/macOS。
+"""
+from hashlib import blake2b
+from typing import Any, Dict
+import math
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from .rate_limit import RateLimitResult
+
+# 槽位: 键哈希(uint64, 0 表示空) | 窗口结束时间(int64, 毫秒) | 已用配额(uint32)
+_SLOT = struct.Struct("<QqI4x")
+GROUP_SIZE = 8
+
+_DEFAULT_SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+RATE_LIMIT_SHM_PATH = os.getenv('RATE_LIMIT_SHM_PATH', os.path.join(_DEFAULT_SHM_DIR, "fastapi-web-ratelimit"))
+RATE_LIMIT_SHM_SLOTS = int(os.getenv('RATE_LIMIT_SHM_SLOTS', '65536'))  # 槽位数（每个 24 字节）
+
+
+def _key_hash(key: str) -> int:
+    value = int.from_bytes(blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+class SharedMemoryRateLimitBackend:
+    """基于共享内存哈希表的固定窗口限流，同一主机的 worker 共享计数"""
+
+    def __init__(self, path: str = RATE_LIMIT_SHM_PATH, slots: int = RATE_LIMIT_SHM_SLOTS):
+        try:
+            import fcntl
+        except ImportError:
+            raise RuntimeError("共享内存速率限制需要 fcntl（仅支持 Linux/macOS）")
+        self._fcntl = fcntl
+
+        self.path = path
+        self.groups = max(1, slots // GROUP_SIZE)
+        self.slots = self.groups * GROUP_SIZE
+        size = self.slots * _SLOT.size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            # 多个 worker 同时启动时重复 truncate 到相同大小是安全的
+            os.ftruncate(self._fd, size)
+        self._mm = mmap.mmap(self._fd, size)
+        self.evictions = 0
+
+        print(f"🧮 共享内存速率限制: {path}, 槽位={self.slots}, 大小={size // 1024}KB")
+
+    def _lock(self, group: int, lock_type: int):
+        group_bytes = GROUP_SIZE * _SLOT.size
+        self._fcntl.lockf(self._fd, lock_type, group_bytes, group * group_bytes, os.SEEK_SET)
+
+    async def hit(self, key: str, limit: int, window: int, cost: int = 1) -> RateLimitResult:
+        """消耗 cost 个配额（不涉及 IO 等待，直接在共享内存中完成）"""
+        now_ms = int(time.time() * 1000)
+        key_hash = _key_hash(key)
+        group = key_hash % self.groups
+        base = group * GROUP_SIZE * _SLOT.size
+        mm = self._mm
+
+        self._lock(group, self._fcntl.LOCK_EX)
+        try:
+            target = free = victim = -1
+            victim_end = 0
+            for i in range(GROUP_SIZE):
+                offset = base + i * _SLOT.size
+                slot_hash, window_end, _ = _SLOT.unpack_from(mm, offset)
+                if slot_hash == key_hash:
+                    target = offset
+                    break
+                if slot_hash == 0 or window_end <= now_ms:
+                    if free < 0:
+                        free = offset
+                elif victim < 0 or window_end < victim_end:
+                    victim, victim_end = offset, window_end
+
+            if target >= 0:
+                _, window_end, count = _SLOT.unpack_from(mm, target)
+                if window_end <= now_ms:
+                    window_end, count = now_ms + window * 1000, 0
+            else:
+                if free >= 0:
+                    target = free
+                else:
+                    # 组内已满，淘汰窗口最早结束的键
+                    target = victim
+                    self.evictions += 1
+                window_end, count = now_ms + window * 1000, 0
+
+            reset = max(0, math.ceil((window_end - now_ms) / 1000))
+            if count + cost > limit:
+                _SLOT.pack_into(mm, target, key_hash, window_end, count)
+                return RateLimitResult(False, limit, window, max(0, limit - count), reset, reset)
+
+            count += cost
+            _SLOT.pack_into(mm, target, key_hash, window_end, count)
+            return RateLimitResult(True, limit, window, limit - count, reset)
+        finally:
+            self._lock(group, self._fcntl.LOCK_UN)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "shared_memory",
+            "path": self.path,
+            "slots": self.slots,
+            "memory_bytes": self.slots * _SLOT.size,
+            "evictions": self.evictions,
+        }
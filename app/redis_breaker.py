@@ -0,0 +1,100 @@
+"""Redis 熔断器
+
+closed:    正常访问 Redis，failure_window 秒内连接类错误达到 failure_threshold 次即打开
+open:      所有调用直接返回默认值（不再等待 socket 超时），后台按指数退避等待
+half_open: 退避结束后由后台任务发一次 PING 试探，成功则关闭，失败则重新打开并加大退避
+
+熔断器本身只维护状态和指标，重连由 RedisClient 的后台任务驱动。
+"""
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional
+import random
+import time
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """三态熔断器（单个事件循环内使用，无需加锁）"""
+
+    def __init__(self, failure_threshold: int, failure_window: float, backoff_base: float, backoff_max: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.failure_window = failure_window
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.state = BREAKER_CLOSED
+        self.transitions: Counter = Counter()
+        self.last_error: Optional[str] = None
+        self._failures: Deque[float] = deque()
+        self._attempts = 0  # 本次打开后已失败的试探次数，决定下一次退避
+        self._changed_at = time.monotonic()
+        self._next_attempt_at: Optional[float] = None
+
+    def _transition(self, state: str):
+        if state != self.state:
+            self.transitions[f"{self.state}->{state}"] += 1
+            self.state = state
+            self._changed_at = time.monotonic()
+
+    def record_failure(self, error: BaseException) -> bool:
+        """记录一次连接类错误，返回 True 表示这次错误使熔断器从 closed 打开"""
+        self.last_error = str(error)
+        if self.state != BREAKER_CLOSED:
+            return False
+
+        now = time.monotonic()
+        self._failures.append(now)
+        while self._failures and self._failures[0] <= now - self.failure_window:
+            self._failures.popleft()
+        if len(self._failures) < self.failure_threshold:
+            return False
+
+        self.trip(error)
+        return True
+
+    def trip(self, error: Optional[BaseException] = None):
+        """立即打开（连接失败、试探失败）"""
+        if error is not None:
+            self.last_error = str(error)
+        if self.state == BREAKER_HALF_OPEN:
+            self._attempts += 1
+        elif self.state == BREAKER_CLOSED:
+            self._attempts = 0
+        self._failures.clear()
+        self._transition(BREAKER_OPEN)
+
+    def next_backoff(self) -> float:
+        """下一次试探前的等待时间：base * 2^n，不超过 max，并加随机抖动避免多个 worker 同时重连"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** self._attempts))
+        delay = random.uniform(delay / 2, delay)
+        self._next_attempt_at = time.monotonic() + delay
+        return delay
+
+    def half_open(self):
+        self._next_attempt_at = None
+        self._transition(BREAKER_HALF_OPEN)
+
+    def close(self):
+        self._attempts = 0
+        self._failures.clear()
+        self._next_attempt_at = None
+        self._transition(BREAKER_CLOSED)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "state": self.state,
+            "state_seconds": round(now - self._changed_at, 1),
+            "recent_failures": len(self._failures),
+            "failure_threshold": self.failure_threshold,
+            "failure_window": self.failure_window,
+            "reconnect_attempts": self._attempts,
+            "next_attempt_in": (
+                round(max(0.0, self._next_attempt_at - now), 1) if self._next_attempt_at is not None else None
+            ),
+            "transitions": dict(self.transitions),
+            "last_error": self.last_error,
+        }
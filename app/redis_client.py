@@ -1,69 +1,320 @@
 import redis.asyncio as redis
-from typing import Optional, Any
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from contextlib import asynccontextmanager
+from functools import wraps
+from hashlib import blake2b
+from typing import Optional, Any, AsyncContextManager, AsyncIterator, Callable, Dict, Iterable, List, Set, Tuple, Union
+import asyncio
+import inspect
 import json
+import os
 import pickle
+import time
 from .config import settings
+from .redis_breaker import CircuitBreaker
+from .redis_codec import ValueCodec, create_value_codec
+from .redis_memory import MemoryRedis, MemoryStore
+from .redis_pool import create_connection_pool
+from .redis_shard import ShardedRedis, shard_name
+
+REDIS_BACKENDS = ("redis", "memory")
+
+# 令牌匹配时才删除锁
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _release_lock_in_memory(store: MemoryStore, keys: List[Any], args: List[Any]) -> int:
+    """RELEASE_LOCK_SCRIPT 在 memory 后端的等价实现"""
+    if store.get(keys[0]) == args[0]:
+        return store.delete(keys[0])
+    return 0
+
+# memory 后端无法执行 Lua，这里登记有 Python 实现的脚本
+MEMORY_SCRIPTS = {RELEASE_LOCK_SCRIPT: _release_lock_in_memory}
+
+# 计入熔断器的错误（连接断开、超时），命令本身的错误（如 WRONGTYPE）不计入
+_CONNECTION_ERRORS = (RedisConnectionError, RedisTimeoutError, asyncio.TimeoutError, OSError)
+
+def _key_str(key: Any) -> str:
+    """连接不解码响应（值是二进制），键名按 UTF-8 转为字符串"""
+    return key.decode("utf-8") if isinstance(key, bytes) else key
+
+class RedisPipeline:
+    """命令管道：先排队，退出 pipeline() 上下文时一次往返发送
+    
+    排队方法与 RedisClient 同名、编码规则相同；执行后 results 按排队顺序保存
+    各命令的结果（已解码）。Redis 未连接或执行出错时对应结果为 None。
+    """
+    
+    def __init__(self, pipe: Optional[Any], codec: ValueCodec, on_error: Optional[Callable[[BaseException], None]] = None):
+        self._pipe = pipe
+        self._codec = codec
+        self._on_error = on_error
+        self._decoders: List[Optional[Callable[[Any], Any]]] = []
+        self.results: List[Any] = []
+    
+    def _queue(self, command: str, *args: Any, decoder: Optional[Callable[[Any], Any]] = None, **kwargs: Any) -> "RedisPipeline":
+        if self._pipe is not None:
+            getattr(self._pipe, command)(*args, **kwargs)
+        self._decoders.append(decoder)
+        return self
+    
+    def get(self, key: str) -> "RedisPipeline":
+        return self._queue("get", key, decoder=self._codec.decode)
+    
+    def set(self, key: str, value: Any, expire: Optional[int] = None) -> "RedisPipeline":
+        return self._queue("set", key, self._codec.encode(value), ex=expire, decoder=bool)
+    
+    def delete(self, *keys: str) -> "RedisPipeline":
+        return self._queue("delete", *keys)
+    
+    def exists(self, key: str) -> "RedisPipeline":
+        return self._queue("exists", key, decoder=bool)
+    
+    def expire(self, key: str, seconds: int) -> "RedisPipeline":
+        return self._queue("expire", key, seconds, decoder=bool)
+    
+    def ttl(self, key: str) -> "RedisPipeline":
+        return self._queue("ttl", key)
+    
+    def type(self, key: str) -> "RedisPipeline":
+        return self._queue("type", key, decoder=_key_str)
+    
+    def memory_usage(self, key: str, samples: Optional[int] = None) -> "RedisPipeline":
+        """MEMORY USAGE：键及其值占用的字节数（集合类型按 samples 个元素估算）"""
+        return self._queue("memory_usage", key, samples=samples)
+    
+    def incr(self, key: str, amount: int = 1) -> "RedisPipeline":
+        return self._queue("incrby", key, amount)
+    
+    def lpush(self, key: str, value: Any) -> "RedisPipeline":
+        return self._queue("lpush", key, self._codec.encode(value))
+    
+    def lrange(self, key: str, start: int = 0, end: int = -1) -> "RedisPipeline":
+        return self._queue("lrange", key, start, end, decoder=self._decode_list)
+    
+    def ltrim(self, key: str, start: int, end: int) -> "RedisPipeline":
+        return self._queue("ltrim", key, start, end, decoder=bool)
+    
+    def _decode_list(self, values: List[Any]) -> List[Any]:
+        return [self._codec.decode(value) for value in values]
+    
+    async def execute(self) -> List[Any]:
+        """发送所有排队的命令"""
+        self.results = [None] * len(self._decoders)
+        if self._pipe is None or not self._decoders:
+            return self.results
+        try:
+            raw_results = await self._pipe.execute(raise_on_error=False)
+        except Exception as e:
+            if self._on_error is not None:
+                self._on_error(e)
+            print(f"Redis PIPELINE 错误: {e}")
+            return self.results
+        
+        for i, (raw, decoder) in enumerate(zip(raw_results, self._decoders)):
+            if isinstance(raw, Exception):
+                print(f"Redis PIPELINE 错误: {raw}")
+                continue
+            self.results[i] = decoder(raw) if decoder is not None else raw
+        return self.results
 
 class RedisClient:
     """Redis 客户端封装"""
     
-    def __init__(self):
-        self.redis_client: Optional[redis.Redis] = None
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or settings.redis_backend
+        if self.backend not in REDIS_BACKENDS:
+            raise ValueError(f"不支持的 Redis 后端: {self.backend}，可选: {', '.join(REDIS_BACKENDS)}")
+        # 可用的客户端（redis.asyncio.Redis、多实例分片 ShardedRedis 或 MemoryRedis）；熔断器打开期间为 None，所有方法直接返回默认值
+        self.redis_client: Optional[Union[redis.Redis, ShardedRedis, MemoryRedis]] = None
+        # 已创建的客户端（熔断期间保留，后台重连时复用）
+        self._connection: Optional[Union[redis.Redis, ShardedRedis, MemoryRedis]] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.redis_breaker_failure_threshold,
+            failure_window=settings.redis_breaker_failure_window,
+            backoff_base=settings.redis_reconnect_backoff_base,
+            backoff_max=settings.redis_reconnect_backoff_max,
+        )
+        # 值编解码（JSON/msgpack + 可选压缩，带类型标签）
+        self.codec = create_value_codec()
+        # 已注册的 Lua 脚本（按脚本源码缓存，内部使用 EVALSHA）
+        self._scripts: Dict[str, Any] = {}
     
     async def connect(self):
-        """连接 Redis"""
-        try:
-            self.redis_client = redis.from_url(
-                settings.redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5
+        """连接 Redis（失败时打开熔断器并在后台重连）"""
+        self._scripts = {}
+        if self.backend == "memory":
+            connection = MemoryRedis(
+                max_memory=settings.redis_memory_max_bytes,
+                policy=settings.redis_memory_policy,
+                expire_interval=settings.redis_memory_expire_interval,
+                scripts=MEMORY_SCRIPTS,
             )
-            # 测试连接
-            await self.redis_client.ping()
-            print("✅ Redis 连接成功")
+            connection.start()
+            self._connection = self.redis_client = connection
+            self.breaker.close()
+            print("✅ 使用进程内 Redis 后端（memory）")
+            return
+        
+        try:
+            shard_urls = [url.strip() for url in settings.redis_shard_urls.split(',') if url.strip()]
+            if len(shard_urls) > 1:
+                # 多实例：按一致性哈希分片，每个实例各自一个连接池
+                self._connection = ShardedRedis(
+                    {shard_name(url): self._create_connection(url) for url in shard_urls},
+                    vnodes=settings.redis_shard_vnodes,
+                )
+            else:
+                self._connection = self._create_connection(shard_urls[0] if shard_urls else settings.redis_url)
         except Exception as e:
+            # 配置错误（如 URL 无效），重连也无济于事
             print(f"❌ Redis 连接失败: {e}")
             self.redis_client = None
+            return
+        
+        try:
+            # 测试连接
+            await self._connection.ping()
+            self.redis_client = self._connection
+            self.breaker.close()
+            if isinstance(self._connection, ShardedRedis):
+                print(f"✅ Redis 连接成功（{len(self._connection.shards)} 个分片）")
+            else:
+                print("✅ Redis 连接成功")
+        except Exception as e:
+            print(f"❌ Redis 连接失败: {e}，将在后台重连")
+            self.breaker.trip(e)
+            self._open_circuit()
+    
+    @staticmethod
+    def _create_connection(url: str) -> redis.Redis:
+        pool = create_connection_pool(
+            url,
+            max_connections=settings.redis_max_connections,
+            blocking=settings.redis_pool_blocking,
+            timeout=settings.redis_pool_timeout,
+            health_check_interval=settings.redis_health_check_interval,
+            # 值由 self.codec 编解码（可能是压缩后的二进制），连接层不做解码
+            decode_responses=False,
+            socket_connect_timeout=settings.redis_socket_connect_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+        )
+        return redis.Redis.from_pool(pool)
     
     async def disconnect(self):
         """断开 Redis 连接"""
-        if self.redis_client:
-            await self.redis_client.close()
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        connection = self._connection or self.redis_client
+        self.redis_client = None
+        self._connection = None
+        if connection:
+            await connection.close()
             print("🔌 Redis 连接已关闭")
     
+    def _record_failure(self, error: BaseException):
+        """记录调用错误，连接类错误累计到阈值时打开熔断器"""
+        if not isinstance(error, _CONNECTION_ERRORS):
+            return
+        if self.breaker.record_failure(error):
+            print(f"⚠️  Redis 熔断器打开: {error}，暂停访问 Redis 并在后台重连")
+            self._open_circuit()
+    
+    def _open_circuit(self):
+        if self._connection is None:
+            self._connection = self.redis_client
+        self.redis_client = None
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect_loop())
+    
+    async def _reconnect_loop(self):
+        """按指数退避发送 PING 试探（half-open），成功后关闭熔断器"""
+        while self._connection is not None:
+            await asyncio.sleep(self.breaker.next_backoff())
+            connection = self._connection
+            if connection is None:
+                return
+            self.breaker.half_open()
+            try:
+                await connection.ping()
+            except Exception as e:
+                self.breaker.trip(e)
+                continue
+            self.breaker.close()
+            self.redis_client = connection
+            self._scripts = {}
+            print("✅ Redis 已恢复，熔断器关闭")
+            return
+    
+    def breaker_stats(self) -> Dict[str, Any]:
+        """熔断器状态和状态切换次数"""
+        return self.breaker.stats()
+    
+    def pool_stats(self) -> Optional[Dict[str, Any]]:
+        """连接池统计（使用中/空闲连接数、等待次数、借出耗时），未连接时返回 None"""
+        connection = self.redis_client or self._connection
+        if not connection:
+            return None
+        if isinstance(connection, ShardedRedis):
+            return {"shards": connection.pool_metrics()}
+        pool = getattr(connection, "connection_pool", None)
+        if not hasattr(pool, "metrics"):
+            return None
+        return pool.metrics()
+    
     async def get(self, key: str) -> Optional[Any]:
         """获取值"""
         if not self.redis_client:
             return None
         try:
             value = await self.redis_client.get(key)
-            if value:
-                # 尝试解析 JSON
-                try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    return value
-            return None
+            return self.codec.decode(value)
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis GET 错误: {e}")
             return None
     
-    async def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
-        """设置值"""
+    async def get_with_size(self, key: str) -> Tuple[Optional[Any], int]:
+        """获取值和编码后的字节数（L1 缓存据此估算内存占用，不需要重新编码）"""
+        if not self.redis_client:
+            return None, 0
+        try:
+            raw = await self.redis_client.get(key)
+            return self.codec.decode(raw), len(raw) if raw is not None else 0
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis GET 错误: {e}")
+            return None, 0
+
+    async def set_with_size(self, key: str, value: Any, expire: Optional[int] = None) -> int:
+        """设置值，返回编码后的字节数（Redis 不可用时也会编码并返回）"""
+        raw = self.codec.encode(value)
+        if not self.redis_client:
+            return len(raw)
+        try:
+            await self.redis_client.set(key, raw, ex=expire)
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis SET 错误: {e}")
+        return len(raw)
+
+    async def set(self, key: str, value: Any, expire: Optional[int] = None, nx: bool = False) -> bool:
+        """设置值（nx=True 时仅在键不存在时设置）"""
         if not self.redis_client:
             return False
         try:
-            # 序列化值
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value, ensure_ascii=False)
-            elif not isinstance(value, str):
-                value = str(value)
-            
-            result = await self.redis_client.set(key, value, ex=expire)
+            result = await self.redis_client.set(key, self.codec.encode(value), ex=expire, nx=nx)
             return bool(result)
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis SET 错误: {e}")
             return False
     
@@ -75,6 +326,7 @@ class RedisClient:
             result = await self.redis_client.delete(key)
             return bool(result)
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis DELETE 错误: {e}")
             return False
     
@@ -86,6 +338,7 @@ class RedisClient:
             result = await self.redis_client.exists(key)
             return bool(result)
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis EXISTS 错误: {e}")
             return False
     
@@ -97,6 +350,7 @@ class RedisClient:
             result = await self.redis_client.expire(key, seconds)
             return bool(result)
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis EXPIRE 错误: {e}")
             return False
     
@@ -107,32 +361,66 @@ class RedisClient:
         try:
             return await self.redis_client.ttl(key)
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis TTL 错误: {e}")
             return -1
     
     async def keys(self, pattern: str = "*") -> list:
-        """获取匹配的键列表"""
+        """获取匹配的键列表（KEYS 会阻塞 Redis，只用于键很少的场景，浏览键请使用 scan）"""
         if not self.redis_client:
             return []
         try:
-            return await self.redis_client.keys(pattern)
+            return [_key_str(key) for key in await self.redis_client.keys(pattern)]
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis KEYS 错误: {e}")
             return []
     
+    async def scan(
+        self, cursor: int = 0, match: str = "*", count: int = 100, key_type: Optional[str] = None
+    ) -> Optional[Tuple[int, List[str]]]:
+        """SCAN 一批键，返回 (下一个游标, 键列表)，游标为 0 表示遍历结束；Redis 不可用时返回 None"""
+        if not self.redis_client:
+            return None
+        try:
+            next_cursor, keys = await self.redis_client.scan(cursor=cursor, match=match, count=count, _type=key_type)
+            return int(next_cursor), [_key_str(key) for key in keys]
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis SCAN 错误: {e}")
+            return None
+    
+    async def dbsize(self) -> int:
+        """当前数据库的键数量（O(1)），Redis 不可用时返回 -1"""
+        if not self.redis_client:
+            return -1
+        try:
+            return await self.redis_client.dbsize()
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis DBSIZE 错误: {e}")
+            return -1
+    
+    async def unlink_many(self, keys: List[str]) -> int:
+        """批量删除键（UNLINK，在后台线程释放内存，不阻塞 Redis），返回删除的数量"""
+        if not self.redis_client or not keys:
+            return 0
+        try:
+            return await self.redis_client.unlink(*keys)
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis UNLINK 错误: {e}")
+            return 0
+    
     async def lpush(self, key: str, value: Any) -> int:
         """从左侧推入列表"""
         if not self.redis_client:
             return 0
         try:
-            # 序列化值
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value, ensure_ascii=False)
-            elif not isinstance(value, str):
-                value = str(value)
-            result = await self.redis_client.lpush(key, value)
+            result = await self.redis_client.lpush(key, self.codec.encode(value))
             return result
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis LPUSH 错误: {e}")
             return 0
     
@@ -142,48 +430,362 @@ class RedisClient:
             return []
         try:
             values = await self.redis_client.lrange(key, start, end)
-            # 尝试解析 JSON
-            result = []
-            for v in values:
-                try:
-                    result.append(json.loads(v))
-                except json.JSONDecodeError:
-                    result.append(v)
-            return result
+            return [self.codec.decode(value) for value in values]
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis LRANGE 错误: {e}")
             return []
     
+    def pipeline(self, transaction: bool = False):
+        """命令管道上下文，退出时一次往返执行所有排队的命令
+        
+        transaction=True 时使用 MULTI/EXEC 保证原子性。用法::
+        
+            async with redis_client.pipeline() as pipe:
+                pipe.lpush(key, value).expire(key, 3600)
+            pushed, _ = pipe.results
+        """
+        return self._pipeline(transaction)
+    
+    @asynccontextmanager
+    async def _pipeline(self, transaction: bool) -> AsyncIterator[RedisPipeline]:
+        pipe = RedisPipeline(
+            self.redis_client.pipeline(transaction=transaction) if self.redis_client else None,
+            self.codec,
+            on_error=self._record_failure,
+        )
+        yield pipe
+        await pipe.execute()
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """批量获取值，不存在的键对应 None"""
+        if not self.redis_client or not keys:
+            return [None] * len(keys)
+        try:
+            values = await self.redis_client.mget(keys)
+            return [self.codec.decode(value) for value in values]
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis MGET 错误: {e}")
+            return [None] * len(keys)
+    
+    async def mset(self, mapping: Dict[str, Any], expire: Union[None, int, Dict[str, int]] = None) -> bool:
+        """批量设置值
+        
+        expire 可以是统一的过期秒数，也可以是 {键: 过期秒数} 为每个键单独设置（未列出的键不过期）。
+        不带过期时间时使用一条 MSET，否则在一个管道中逐键 SET EX。
+        """
+        if not self.redis_client:
+            return False
+        if not mapping:
+            return True
+        try:
+            if expire is None:
+                result = await self.redis_client.mset({key: self.codec.encode(value) for key, value in mapping.items()})
+                return bool(result)
+            
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    ttl = expire.get(key) if isinstance(expire, dict) else expire
+                    pipe.set(key, self.codec.encode(value), ex=ttl)
+                results = await pipe.execute()
+            return all(results)
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis MSET 错误: {e}")
+            return False
+    
+    async def delete_many(self, keys: List[str]) -> int:
+        """批量删除键，返回实际删除的数量"""
+        if not self.redis_client or not keys:
+            return 0
+        try:
+            return await self.redis_client.delete(*keys)
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis DELETE 错误: {e}")
+            return 0
+    
+    async def incr_many(self, amounts: Dict[str, int], expire: Optional[int] = None) -> Dict[str, int]:
+        """批量自增计数器，返回各键自增后的值（指定 expire 时每次自增都会刷新过期时间）"""
+        if not self.redis_client or not amounts:
+            return {}
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, amount in amounts.items():
+                    pipe.incrby(key, amount)
+                    if expire is not None:
+                        pipe.expire(key, expire)
+                results = await pipe.execute()
+            step = 1 if expire is None else 2
+            return dict(zip(amounts, results[::step]))
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis INCR 错误: {e}")
+            return {}
+    
+    async def publish(self, channel: str, message: Any) -> int:
+        """发布消息（与值使用相同的编码），返回收到消息的订阅者数量"""
+        if not self.redis_client:
+            return 0
+        try:
+            return await self.redis_client.publish(channel, self.codec.encode(message))
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis PUBLISH 错误: {e}")
+            return 0
+    
+    async def run_script(self, script: str, keys: List[str], args: List[Any]) -> Any:
+        """执行 Lua 脚本（EVALSHA，服务器未缓存脚本时自动重新加载）"""
+        if not self.redis_client:
+            return None
+        try:
+            runner = self._scripts.get(script)
+            if runner is None:
+                runner = self.redis_client.register_script(script)
+                self._scripts[script] = runner
+            return await runner(keys=keys, args=args)
+        except Exception as e:
+            self._record_failure(e)
+            print(f"Redis EVALSHA 错误: {e}")
+            return None
+    
+    async def acquire_lock(self, key: str, ttl: int) -> Optional[str]:
+        """获取简单互斥锁（SET NX EX），成功时返回释放用的令牌"""
+        token = os.urandom(8).hex()
+        if await self.set(key, token, expire=ttl, nx=True):
+            return token
+        return None
+    
+    async def release_lock(self, key: str, token: str) -> bool:
+        """释放锁（只删除自己持有的锁，锁已过期被别人拿到时不删除）"""
+        return bool(await self.run_script(RELEASE_LOCK_SCRIPT, keys=[key], args=[self.codec.encode(token)]))
+    
     async def flushdb(self) -> bool:
-        """清空当前数据库"""
+        """清空当前数据库（FLUSHDB ASYNC，在后台释放内存，不阻塞 Redis）"""
         if not self.redis_client:
             return False
         try:
-            result = await self.redis_client.flushdb()
+            result = await self.redis_client.flushdb(asynchronous=True)
             return bool(result)
         except Exception as e:
+            self._record_failure(e)
             print(f"Redis FLUSHDB 错误: {e}")
             return False
 
 # 全局 Redis 客户端实例
 redis_client = RedisClient()
 
+def _cache_key_digest(arguments: Dict[str, Any]) -> str:
+    """参数（参数名 -> 值）的规范化摘要（与进程无关，所有 worker 得到相同的键）"""
+    canonical = json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+class CacheStats:
+    """单个 cache_result 装饰器的命中统计"""
+    
+    def __init__(self, key_prefix: str):
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.lock_waits = 0
+        self.loads = 0  # 实际调用被装饰函数的次数（单飞合并后）
+    
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "lock_waits": self.lock_waits,
+            "loads": self.loads,
+            "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+        }
+
+# key_prefix -> 统计，供 /redis/cache/stats 查看
+CACHE_STATS: Dict[str, CacheStats] = {}
+
+# 后台刷新任务（保存引用，防止被垃圾回收）
+_background_refreshes: Set[asyncio.Task] = set()
+
+def _report_refresh_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"缓存后台刷新失败: {task.exception()}")
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """所有 cache_result 装饰器的命中统计"""
+    return {prefix: stats.as_dict() for prefix, stats in CACHE_STATS.items()}
+
 # 缓存装饰器
-def cache_result(key_prefix: str, expire: int = 3600):
-    """缓存结果装饰器"""
+def cache_result(
+    key_prefix: str,
+    expire: int = 3600,
+    stale_ttl: int = 0,
+    negative_ttl: int = 0,
+    lock_timeout: int = 10,
+    ignore: Iterable[str] = (),
+    refresh_factory: Optional[Callable[[], AsyncContextManager[Dict[str, Any]]]] = None,
+):
+    """缓存结果装饰器
+    
+    - 缓存键为 key_prefix + 参数规范化后的 blake2 摘要；参数按函数签名绑定（位置参数和关键字参数
+      得到相同的键，包括默认值），ignore 中的参数（如 db 会话）无论以哪种方式传入都不参与计算
+    - 未命中时同一进程内只有一个协程计算，跨进程用 Redis 锁保证只有一个 worker 计算，其余等待结果
+    - stale_ttl > 0 时，过期后的 stale_ttl 秒内先返回旧值，并在后台刷新
+    - negative_ttl > 0 时，函数返回 None 也会缓存 negative_ttl 秒（防止不存在的数据反复穿透）
+    - Redis 不可用时直接调用函数
+    
+    后台刷新在请求结束后执行，不能复用调用方传入的 ignore 参数（db 会话、Request 等依赖
+    此时已经关闭）。因此 stale_ttl > 0 且有 ignore 参数时必须提供 refresh_factory：
+    返回异步上下文管理器，进入时提供新的依赖 {参数名: 值}，刷新结束后退出（关闭会话）。例如::
+    
+        @asynccontextmanager
+        async def fresh_db():
+            with SessionLocal() as db:
+                yield {"db": db}
+    
+        @cache_result("stats", stale_ttl=60, ignore=["db"], refresh_factory=fresh_db)
+        async def load_stats(day: str, db: Session): ...
+    """
+    ignore = frozenset(ignore)
+    if stale_ttl > 0 and ignore and refresh_factory is None:
+        raise ValueError(f"cache_result({key_prefix!r}): stale_ttl 与 ignore 参数同时使用时需要 refresh_factory")
+    stats = CACHE_STATS.setdefault(key_prefix, CacheStats(key_prefix))
+    inflight: Dict[str, asyncio.Future] = {}
+    
     def decorator(func):
+        signature = inspect.signature(func)
+        var_keyword = next(
+            (name for name, param in signature.parameters.items() if param.kind is param.VAR_KEYWORD), None
+        )
+        unknown = ignore - signature.parameters.keys()
+        if unknown and var_keyword is None:
+            raise ValueError(f"cache_result({key_prefix!r}): ignore 中的参数不存在: {', '.join(sorted(unknown))}")
+        
+        def key_arguments(args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+            """参与缓存键计算的参数（按签名绑定，去掉 ignore 中的参数）"""
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {name: value for name, value in bound.arguments.items() if name not in ignore}
+            if var_keyword is not None:
+                arguments[var_keyword] = {
+                    name: value for name, value in arguments[var_keyword].items() if name not in ignore
+                }
+            return arguments
+        
+        async def store(cache_key: str, result: Any):
+            ttl = expire if result is not None else negative_ttl
+            if ttl <= 0:
+                return
+            entry = {"value": result, "fresh_until": time.time() + ttl}
+            await redis_client.set(cache_key, entry, ttl + stale_ttl)
+        
+        async def compute(cache_key: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+            """单飞计算：持有 Redis 锁的 worker 计算，其他 worker 等待缓存出现
+
+            持锁的 worker 可能失败，或者返回 None 且不缓存（negative_ttl=0），此时不会写入缓存；
+            等待方每次轮询都重新尝试加锁，锁一释放就由其中一个接手计算，不必等到 lock_timeout。
+            """
+            lock_key = f"lock:{cache_key}"
+            token = await redis_client.acquire_lock(lock_key, lock_timeout)
+            if token is None and redis_client.redis_client is not None:
+                stats.lock_waits += 1
+                deadline = time.monotonic() + lock_timeout
+                delay = 0.01
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 0.2)
+                    # 先加锁再读缓存：持锁方在释放锁之前写入缓存，拿到锁时缓存已经可见
+                    token = await redis_client.acquire_lock(lock_key, lock_timeout)
+                    entry = await redis_client.get(cache_key)
+                    if isinstance(entry, dict) and "value" in entry:
+                        if token is not None:
+                            await redis_client.release_lock(lock_key, token)
+                        return entry["value"]
+                    if token is not None:
+                        break
+                # 拿到锁，或等待超时（持锁的 worker 可能已经退出），自己计算
+            try:
+                stats.loads += 1
+                result = await func(*args, **kwargs)
+                await store(cache_key, result)
+                return result
+            finally:
+                if token is not None:
+                    await redis_client.release_lock(lock_key, token)
+        
+        async def single_flight(cache_key: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+            """同一进程内相同键只计算一次，其他协程共享结果"""
+            future = inflight.get(cache_key)
+            if future is not None:
+                return await asyncio.shield(future)
+            
+            future = asyncio.get_running_loop().create_future()
+            inflight[cache_key] = future
+            try:
+                result = await compute(cache_key, args, kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                # 没有其他等待者时避免 "exception was never retrieved" 警告
+                future.exception()
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                inflight.pop(cache_key, None)
+        
+        async def refresh(cache_key: str, args: tuple, kwargs: Dict[str, Any]):
+            """后台刷新：ignore 参数换成 refresh_factory 提供的新依赖"""
+            if refresh_factory is None:
+                return await single_flight(cache_key, args, kwargs)
+            async with refresh_factory() as fresh:
+                # 按签名替换，位置传入的依赖同样会被换掉
+                bound = signature.bind(*args, **kwargs)
+                for name, value in fresh.items():
+                    if name in signature.parameters:
+                        bound.arguments[name] = value
+                    else:
+                        bound.arguments.setdefault(var_keyword, {})[name] = value
+                return await single_flight(cache_key, bound.args, bound.kwargs)
+        
+        def refresh_in_background(cache_key: str, args: tuple, kwargs: Dict[str, Any]):
+            if cache_key in inflight:
+                return
+            stats.refreshes += 1
+            task = asyncio.get_running_loop().create_task(refresh(cache_key, args, kwargs))
+            _background_refreshes.add(task)
+            task.add_done_callback(_background_refreshes.discard)
+            task.add_done_callback(_report_refresh_error)
+        
+        @wraps(func)
         async def wrapper(*args, **kwargs):
             # 生成缓存键
-            cache_key = f"{key_prefix}:{hash(str(args) + str(kwargs))}"
+            cache_key = f"{key_prefix}:{_cache_key_digest(key_arguments(args, kwargs))}"
             
             # 尝试从缓存获取
-            cached_result = await redis_client.get(cache_key)
-            if cached_result is not None:
-                return cached_result
+            entry = await redis_client.get(cache_key)
+            if isinstance(entry, dict) and "value" in entry:
+                value = entry["value"]
+                if time.time() < entry.get("fresh_until", 0):
+                    if value is None:
+                        stats.negative_hits += 1
+                    else:
+                        stats.hits += 1
+                    return value
+                # 已过期但仍在 stale 窗口内：先返回旧值，后台刷新
+                stats.stale_hits += 1
+                refresh_in_background(cache_key, args, kwargs)
+                return value
             
-            # 执行函数并缓存结果
-            result = await func(*args, **kwargs)
-            await redis_client.set(cache_key, result, expire)
-            return result
+            stats.misses += 1
+            return await single_flight(cache_key, args, kwargs)
+        
+        wrapper.cache_stats = stats.as_dict
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
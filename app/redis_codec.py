@@ -0,0 +1,172 @@
+"""Redis 值编码
+
+写入 Redis 的值 = 1 字节类型标签 + 载荷：
+
+    0x01  UTF-8 字符串（原样保存，不经过 JSON）
+    0x02  JSON（优先使用 orjson）
+    0x03  msgpack
+    标签 | 0x04  载荷经过 zstd 压缩
+    标签 | 0x10  载荷经过 lz4 压缩
+
+载荷超过 compression_threshold 字节时才压缩。读取时按标签解码，不需要 try/except 猜格式；
+标签都是非空白的控制字符，不会出现在 JSON / 文本开头，所以没有标签的值
+（旧版本写入的纯 JSON / 纯文本）仍能识别出来，按原来的方式兼容读取。
+msgpack、zstandard、lz4 是可选依赖，只在配置使用时才需要安装。
+"""
+from typing import Any, Callable, Optional, Tuple
+import json
+
+from .config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖，缺失时退回标准库
+    orjson = None
+
+TAG_STR = 0x01
+TAG_JSON = 0x02
+TAG_MSGPACK = 0x03
+FLAG_ZSTD = 0x04
+FLAG_LZ4 = 0x10
+_TYPE_MASK = 0x03
+_TAGS = frozenset(
+    value_type | flag for value_type in (TAG_STR, TAG_JSON, TAG_MSGPACK) for flag in (0, FLAG_ZSTD, FLAG_LZ4)
+)
+
+
+def _json_codec() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    if orjson is not None:
+        def dumps(value: Any) -> bytes:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return dumps, orjson.loads
+
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":")).encode("utf-8")
+    return dumps, json.loads
+
+
+def _msgpack_codec() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("REDIS_CODEC=msgpack 需要安装 msgpack: pip install msgpack")
+
+    def dumps(value: Any) -> bytes:
+        return msgpack.packb(value, default=str, use_bin_type=True)
+
+    def loads(payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    return dumps, loads
+
+
+def _zstd_codec() -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("REDIS_COMPRESSION=zstd 需要安装 zstandard: pip install zstandard")
+    compressor = zstandard.ZstdCompressor(level=3)
+    decompressor = zstandard.ZstdDecompressor()
+    return compressor.compress, decompressor.decompress
+
+
+def _lz4_codec() -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    try:
+        import lz4.frame
+    except ImportError:
+        raise RuntimeError("REDIS_COMPRESSION=lz4 需要安装 lz4: pip install lz4")
+    return lz4.frame.compress, lz4.frame.decompress
+
+
+def legacy_decode(value: str) -> Any:
+    """旧格式：尝试解析 JSON，失败时返回原始字符串
+
+    旧版本把字符串原样写入、读取时一律尝试 JSON 解析，所以 /redis/set 写入的 "123"
+    从 /redis/get 读回来是 123；带 TAG_STR 标签的字符串解码后保持为字符串，
+    /redis/get 对字符串再调用一次本函数，保持原来的返回值。
+    """
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+class ValueCodec:
+    """值 <-> 带类型标签的字节串"""
+
+    def __init__(self, codec: str = "json", compression: Optional[str] = None, compression_threshold: int = 1024):
+        codecs = {"json": (TAG_JSON, _json_codec), "msgpack": (TAG_MSGPACK, _msgpack_codec)}
+        if codec not in codecs:
+            raise ValueError(f"不支持的 Redis 值编码: {codec}，可选: json, msgpack")
+        compressions = {"zstd": (FLAG_ZSTD, _zstd_codec), "lz4": (FLAG_LZ4, _lz4_codec)}
+        if compression and compression not in compressions:
+            raise ValueError(f"不支持的 Redis 值压缩算法: {compression}，可选: zstd, lz4")
+
+        self.codec = codec
+        self.compression = compression or None
+        self.compression_threshold = compression_threshold
+
+        self._tag, factory = codecs[codec]
+        self._dumps, _ = factory()
+        self._flag = 0
+        self._compress: Optional[Callable[[bytes], bytes]] = None
+        if self.compression:
+            self._flag, factory = compressions[self.compression]
+            self._compress, _ = factory()
+
+        # 解码按标签选择，读取用其他编码/压缩写入的值（例如切换配置之后）时按需加载
+        self._loads = {TAG_JSON: _json_codec()[1]}
+        self._decompressors = {}
+
+    def encode(self, value: Any) -> bytes:
+        if isinstance(value, str):
+            tag, payload = TAG_STR, value.encode("utf-8")
+        else:
+            tag, payload = self._tag, self._dumps(value)
+
+        if self._compress is not None and len(payload) > self.compression_threshold:
+            tag |= self._flag
+            payload = self._compress(payload)
+        return bytes((tag,)) + payload
+
+    def decode(self, raw: Any) -> Any:
+        if raw is None:
+            return None
+        if isinstance(raw, str):
+            # decode_responses=True 的连接返回的字符串，只可能是旧格式
+            return legacy_decode(raw) if raw else None
+        if not raw:
+            return None
+
+        tag = raw[0]
+        if tag not in _TAGS:
+            # 没有类型标签
+            return legacy_decode(raw.decode("utf-8", errors="replace"))
+
+        payload = raw[1:]
+        if tag & FLAG_ZSTD:
+            payload = self._decompressor(FLAG_ZSTD, _zstd_codec)(payload)
+        elif tag & FLAG_LZ4:
+            payload = self._decompressor(FLAG_LZ4, _lz4_codec)(payload)
+
+        value_type = tag & _TYPE_MASK
+        if value_type == TAG_STR:
+            return payload.decode("utf-8")
+        loads = self._loads.get(value_type)
+        if loads is None:
+            loads = self._loads[value_type] = _msgpack_codec()[1]
+        return loads(payload)
+
+    def _decompressor(self, flag: int, factory) -> Callable[[bytes], bytes]:
+        decompress = self._decompressors.get(flag)
+        if decompress is None:
+            decompress = self._decompressors[flag] = factory()[1]
+        return decompress
+
+
+def create_value_codec() -> ValueCodec:
+    """按 Settings 中的 redis_codec / redis_compression 配置创建"""
+    return ValueCodec(
+        codec=settings.redis_codec,
+        compression=settings.redis_compression if settings.redis_compression != "none" else None,
+        compression_threshold=settings.redis_compression_threshold,
+    )
@@ -0,0 +1,343 @@
+"""Redis 键空间后台任务
+
+用 SCAN 分批遍历匹配的键，每批处理完让出事件循环并暂停一小段时间，
+不会像 KEYS / 一次性 DEL 那样长时间阻塞 Redis 或当前 worker。
+任务在启动它的 worker 中运行；状态（游标、已扫描数量、结果）每批写入 Redis
+（jobs:redis:<id>，保留 REDIS_JOB_TTL 秒），多 worker 部署时任何 worker 都能查询进度。
+取消请求由其他 worker 收到时写入取消标记，运行任务的 worker 在下一批之前检查并停止。
+"""
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import random
+import uuid
+
+from .config import settings
+from .redis_client import redis_client
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+MAX_FINISHED_JOBS = 20  # 当前进程保留的最近任务数量
+MAX_LISTED_JOBS = 50  # Redis 中任务列表保留的最近任务数量
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+JOB_KEY_PREFIX = "jobs:redis:"
+JOB_INDEX_KEY = f"{JOB_KEY_PREFIX}index"  # 最近任务 ID 列表（新任务在前）
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{job_id}"
+
+
+def _cancel_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{job_id}:cancel"
+
+
+class KeyspaceJob(ABC):
+    """SCAN 遍历任务基类，子类实现 process() 处理每一批键"""
+
+    kind = "scan"
+
+    def __init__(self, pattern: str = "*", batch_size: int = 500, key_type: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.pattern = pattern
+        self.batch_size = batch_size
+        self.key_type = key_type
+        self.status = JOB_PENDING
+        self.cursor = 0
+        self.scanned = 0
+        self.batches = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def process(self, keys: List[str]):
+        """处理一批键"""
+
+    def result(self) -> Dict[str, Any]:
+        return {}
+
+    async def save(self) -> bool:
+        """把当前状态写入 Redis，返回是否收到了其他 worker 的取消请求"""
+        async with redis_client.pipeline() as pipe:
+            pipe.set(_job_key(self.id), self.as_dict(), settings.redis_job_ttl).exists(_cancel_key(self.id))
+        return bool(pipe.results[1])
+
+    async def run(self):
+        self.status = JOB_RUNNING
+        self.started_at = datetime.now()
+        try:
+            while True:
+                if await self.save():
+                    self.status = JOB_CANCELLED
+                    break
+                batch = await redis_client.scan(self.cursor, self.pattern, self.batch_size, self.key_type)
+                if batch is None:
+                    raise RuntimeError("Redis 不可用")
+                self.cursor, keys = batch
+                if keys:
+                    await self.process(keys)
+                self.scanned += len(keys)
+                self.batches += 1
+                if self.cursor == 0:
+                    self.status = JOB_COMPLETED
+                    break
+                await asyncio.sleep(settings.redis_job_batch_pause)
+        except asyncio.CancelledError:
+            self.status = JOB_CANCELLED
+            raise
+        except Exception as e:
+            self.status = JOB_FAILED
+            self.error = str(e)
+            print(f"❌ Redis 任务 {self.kind}({self.id}) 失败: {e}")
+        finally:
+            self.finished_at = datetime.now()
+            await self.save()
+
+    def cancel(self) -> bool:
+        if self._task is None or self._task.done():
+            return False
+        self._task.cancel()
+        return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "pattern": self.pattern,
+            "type": self.key_type,
+            "cursor": self.cursor,
+            "scanned": self.scanned,
+            "batches": self.batches,
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": self.result(),
+        }
+
+
+class DeleteByPatternJob(KeyspaceJob):
+    """按模式删除键：SCAN + UNLINK 分批进行"""
+
+    kind = "delete_by_pattern"
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.deleted = 0
+
+    async def process(self, keys: List[str]):
+        self.deleted += await redis_client.unlink_many(keys)
+
+    def result(self) -> Dict[str, Any]:
+        return {"deleted": self.deleted}
+
+
+# TTL 分布的区间：(上限秒数, 名称)，未设置过期时间的键单独计为 "none"
+TTL_BUCKETS = (
+    (60, "<1m"),
+    (3600, "1m-1h"),
+    (86400, "1h-1d"),
+    (7 * 86400, "1d-7d"),
+)
+TTL_BUCKET_LONGEST = ">7d"
+TTL_BUCKET_NONE = "none"
+
+MAX_PROFILE_PREFIXES = 500  # 前缀数量上限，超出的键归入 OTHER_PREFIX
+OTHER_PREFIX = "(other)"
+NO_PREFIX = "(no prefix)"
+
+
+def key_prefix(key: str, depth: int = 2) -> str:
+    """键所属的前缀族：取前 depth 段（至少保留最后一段作为变量部分）
+
+    ratelimit:ip:1.2.3.4 -> ratelimit:ip:*，greeting:World -> greeting:*
+    """
+    parts = key.split(":")
+    if len(parts) == 1:
+        return NO_PREFIX
+    return ":".join(parts[:min(depth, len(parts) - 1)]) + ":*"
+
+
+def ttl_bucket(ttl: int) -> str:
+    if ttl < 0:
+        return TTL_BUCKET_NONE
+    for limit, name in TTL_BUCKETS:
+        if ttl < limit:
+            return name
+    return TTL_BUCKET_LONGEST
+
+
+class _PrefixProfile:
+    __slots__ = ("keys", "bytes", "max_bytes", "largest_key", "types", "ttls")
+
+    def __init__(self):
+        self.keys = 0
+        self.bytes = 0
+        self.max_bytes = 0
+        self.largest_key: Optional[str] = None
+        self.types: Counter = Counter()
+        self.ttls: Counter = Counter()
+
+    def add(self, key: str, key_type: Optional[str], ttl: Optional[int], size: Optional[int]):
+        self.keys += 1
+        self.types[key_type or "unknown"] += 1
+        self.ttls[ttl_bucket(ttl) if ttl is not None else "unknown"] += 1
+        if size:
+            self.bytes += size
+            if size > self.max_bytes:
+                self.max_bytes = size
+                self.largest_key = key
+
+    def as_dict(self, scale: float) -> Dict[str, Any]:
+        return {
+            "sampled_keys": self.keys,
+            "sampled_bytes": self.bytes,
+            "estimated_keys": round(self.keys * scale),
+            "estimated_bytes": round(self.bytes * scale),
+            "avg_bytes": round(self.bytes / self.keys) if self.keys else 0,
+            "max_bytes": self.max_bytes,
+            "largest_key": self.largest_key,
+            "types": dict(self.types),
+            "ttl": dict(self.ttls),
+            "no_ttl_ratio": round(self.ttls[TTL_BUCKET_NONE] / self.keys, 4) if self.keys else 0.0,
+        }
+
+
+class KeyspaceProfileJob(KeyspaceJob):
+    """键空间内存分析：按前缀汇总 MEMORY USAGE、TTL 分布和类型
+
+    sample_rate < 1 时只分析随机抽取的部分键（SCAN 仍遍历全部键），
+    estimated_* 按抽样比例放大，用于估算整体占用。
+    """
+
+    kind = "memory_profile"
+
+    def __init__(
+        self,
+        pattern: str = "*",
+        batch_size: int = 500,
+        key_type: Optional[str] = None,
+        sample_rate: float = 1.0,
+        prefix_depth: int = 2,
+        memory_samples: Optional[int] = None,
+    ):
+        super().__init__(pattern, batch_size, key_type)
+        self.sample_rate = sample_rate
+        self.prefix_depth = prefix_depth
+        self.memory_samples = memory_samples
+        self.sampled = 0
+        self.memory_unavailable = 0
+        self._prefixes: Dict[str, _PrefixProfile] = {}
+
+    async def process(self, keys: List[str]):
+        if self.sample_rate < 1:
+            keys = [key for key in keys if random.random() < self.sample_rate]
+            if not keys:
+                return
+
+        async with redis_client.pipeline() as pipe:
+            for key in keys:
+                pipe.type(key).ttl(key).memory_usage(key, self.memory_samples)
+        results = pipe.results
+
+        for i, key in enumerate(keys):
+            key_type, ttl, size = results[3 * i:3 * i + 3]
+            if key_type == "none":
+                continue  # SCAN 之后已被删除或过期
+            if size is None:
+                self.memory_unavailable += 1
+            self._profile_for(key_prefix(key, self.prefix_depth)).add(key, key_type, ttl, size)
+            self.sampled += 1
+
+    def _profile_for(self, prefix: str) -> _PrefixProfile:
+        profile = self._prefixes.get(prefix)
+        if profile is None:
+            if len(self._prefixes) >= MAX_PROFILE_PREFIXES:
+                prefix = OTHER_PREFIX
+                profile = self._prefixes.get(prefix)
+            if profile is None:
+                profile = self._prefixes[prefix] = _PrefixProfile()
+        return profile
+
+    def result(self) -> Dict[str, Any]:
+        scale = 1 / self.sample_rate
+        prefixes = sorted(self._prefixes.items(), key=lambda item: (item[1].bytes, item[1].keys), reverse=True)
+        totals = _PrefixProfile()
+        for _, profile in prefixes:
+            totals.keys += profile.keys
+            totals.bytes += profile.bytes
+            totals.types.update(profile.types)
+            totals.ttls.update(profile.ttls)
+            if profile.max_bytes > totals.max_bytes:
+                totals.max_bytes = profile.max_bytes
+                totals.largest_key = profile.largest_key
+        return {
+            "sample_rate": self.sample_rate,
+            "prefix_depth": self.prefix_depth,
+            "sampled": self.sampled,
+            "memory_unavailable": self.memory_unavailable,
+            "total": totals.as_dict(scale),
+            "prefixes": {prefix: profile.as_dict(scale) for prefix, profile in prefixes},
+        }
+
+
+# 当前进程中的任务（按创建顺序）
+_jobs: "OrderedDict[str, KeyspaceJob]" = OrderedDict()
+
+
+async def start_job(job: KeyspaceJob) -> KeyspaceJob:
+    """在后台启动任务并登记到 Redis，清理多余的已结束任务记录"""
+    async with redis_client.pipeline() as pipe:
+        pipe.set(_job_key(job.id), job.as_dict(), settings.redis_job_ttl)
+        pipe.lpush(JOB_INDEX_KEY, job.id).ltrim(JOB_INDEX_KEY, 0, MAX_LISTED_JOBS - 1)
+        pipe.expire(JOB_INDEX_KEY, settings.redis_job_ttl)
+    job._task = asyncio.get_running_loop().create_task(job.run())
+    _jobs[job.id] = job
+
+    finished = [job_id for job_id, existing in _jobs.items() if existing.finished_at is not None]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[job_id]
+    return job
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """任务状态：本进程运行的任务直接读取，其他 worker 的任务从 Redis 读取"""
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job.as_dict()
+    state = await redis_client.get(_job_key(job_id))
+    return state if isinstance(state, dict) else None
+
+
+async def cancel_job(job_id: str) -> Optional[bool]:
+    """取消任务：任务不存在返回 None，已结束返回 False"""
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job.cancel()
+    state = await get_job(job_id)
+    if state is None:
+        return None
+    if state["status"] in FINISHED_STATUSES:
+        return False
+    # 运行任务的 worker 在下一批之前检查取消标记
+    return await redis_client.set(_cancel_key(job_id), 1, settings.redis_job_ttl)
+
+
+async def list_jobs() -> List[Dict[str, Any]]:
+    """最近的任务（新任务在前），包括其他 worker 启动的任务"""
+    job_ids = await redis_client.lrange(JOB_INDEX_KEY, 0, MAX_LISTED_JOBS - 1)
+    job_ids = [job_id for job_id in job_ids if isinstance(job_id, str)]
+    states = await redis_client.mget([_job_key(job_id) for job_id in job_ids]) if job_ids else []
+    jobs = {job_id: state for job_id, state in zip(job_ids, states) if isinstance(state, dict)}
+    for job in _jobs.values():
+        jobs[job.id] = job.as_dict()
+    return sorted(jobs.values(), key=lambda state: state["started_at"] or "9999", reverse=True)
@@ -0,0 +1,620 @@
+"""进程内的 Redis 替代后端（REDIS_BACKEND=memory）
+
+实现 RedisClient 及各模块用到的 redis.asyncio.Redis 命令子集（字符串、列表、
+过期时间、SCAN、管道、pub/sub），数据只保存在当前进程中。
+适用于单进程部署、测试和基准：多 worker 之间不共享数据，重启后数据丢失。
+
+- 过期：访问时惰性删除，另有后台任务按过期时间堆定期清理
+- 内存：按键名和值的字节数估算，超过上限时按 LRU 淘汰（allkeys-lru），
+  或拒绝写入（noeviction）
+- SCAN：每个键有递增的编号，游标就是下一个编号，遍历期间一直存在的键保证恰好返回一次
+- Lua 脚本无法执行，只支持通过 scripts 参数注册了 Python 实现的脚本
+"""
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from fnmatch import fnmatchcase
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+import asyncio
+import heapq
+import time
+
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError
+
+EVICTION_POLICIES = ("allkeys-lru", "noeviction")
+ENTRY_OVERHEAD = 64  # 每个键的估算固定开销（字节）
+LIST_ITEM_OVERHEAD = 16
+EXPIRE_BATCH = 1000  # 每次定期清理最多删除的键数
+PUBSUB_BACKLOG = 10000  # 订阅者未读消息上限，超出时断开该订阅（与 Redis 的输出缓冲区限制一致）
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+OOM = "OOM command not allowed when used memory > 'maxmemory'."
+
+ScriptHandler = Callable[["MemoryStore", List[Any], List[Any]], Any]
+
+
+def _bytes(value: Any) -> bytes:
+    """与 redis-py 一致：str 按 UTF-8 编码，数字转为十进制字符串"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value).encode("ascii")
+    raise ResponseError(f"Invalid input of type: '{type(value).__name__}'")
+
+
+def _key(name: Union[str, bytes]) -> str:
+    return name.decode("utf-8") if isinstance(name, bytes) else name
+
+
+def _pattern(pattern: Union[str, bytes]) -> str:
+    # Redis 的 [^abc] 对应 fnmatch 的 [!abc]
+    return _key(pattern).replace("[^", "[!")
+
+
+class _Entry:
+    __slots__ = ("value", "size", "id", "expires_at")
+
+    def __init__(self, value: Union[bytes, deque], size: int, entry_id: int):
+        self.value = value
+        self.size = size
+        self.id = entry_id
+        self.expires_at: Optional[float] = None
+
+
+class MemoryStore:
+    """键空间和命令实现（同步，命令之间不会被其他协程打断，天然原子）"""
+
+    def __init__(self, max_memory: int, policy: str = "allkeys-lru"):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"不支持的淘汰策略: {policy}，可选: {', '.join(EVICTION_POLICIES)}")
+        self.max_memory = max_memory
+        self.policy = policy
+        self.used_memory = 0
+        self.evicted_keys = 0
+        self.expired_keys = 0
+        self._data: "OrderedDict[str, _Entry]" = OrderedDict()  # 按最近使用排序
+        self._next_id = 1
+        self._id_keys: Dict[int, str] = {}  # SCAN 用：编号 -> 键
+        self._order: List[int] = []  # 递增的编号（含已删除的键，定期压缩）
+        self._expiry_heap: List[Tuple[float, int, str]] = []
+
+    # ---- 内部簿记 ----
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            self._remove(key, entry)
+            self.expired_keys += 1
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _lookup_type(self, key: str, kind: type) -> Optional[_Entry]:
+        entry = self._lookup(key)
+        if entry is not None and not isinstance(entry.value, kind):
+            raise ResponseError(WRONGTYPE)
+        return entry
+
+    def _insert(self, key: str, value: Union[bytes, deque], size: int) -> _Entry:
+        self._maybe_compact()
+        entry = _Entry(value, size, self._next_id)
+        self._next_id += 1
+        self._data[key] = entry
+        self._id_keys[entry.id] = key
+        self._order.append(entry.id)
+        self.used_memory += size
+        return entry
+
+    def _resize(self, entry: _Entry, size: int):
+        self.used_memory += size - entry.size
+        entry.size = size
+
+    def _remove(self, key: str, entry: _Entry):
+        del self._data[key]
+        del self._id_keys[entry.id]
+        self.used_memory -= entry.size
+
+    def _set_expiry(self, key: str, entry: _Entry, expires_at: Optional[float]):
+        entry.expires_at = expires_at
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, entry.id, key))
+
+    def _check_oom(self):
+        if self.policy == "noeviction" and self.used_memory > self.max_memory:
+            raise ResponseError(OOM)
+
+    def _evict(self):
+        if self.policy != "allkeys-lru":
+            return
+        while self.used_memory > self.max_memory and self._data:
+            key, entry = next(iter(self._data.items()))
+            self._remove(key, entry)
+            self.evicted_keys += 1
+
+    def _maybe_compact(self):
+        if len(self._order) > 1024 and len(self._order) > 2 * len(self._id_keys):
+            self._order = [entry_id for entry_id in self._order if entry_id in self._id_keys]
+        if len(self._expiry_heap) > 1024 and len(self._expiry_heap) > 2 * len(self._data):
+            self._expiry_heap = [
+                (entry.expires_at, entry.id, key)
+                for key, entry in self._data.items() if entry.expires_at is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+
+    def expire_due(self, limit: int = EXPIRE_BATCH) -> int:
+        """删除已过期的键（定期任务调用），返回删除的数量"""
+        now = time.monotonic()
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now and removed < limit:
+            _, entry_id, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            # 堆里可能是旧记录（键已删除、重建或改过过期时间）
+            if entry is not None and entry.id == entry_id and entry.expires_at is not None and entry.expires_at <= now:
+                self._remove(key, entry)
+                self.expired_keys += 1
+                removed += 1
+        self._maybe_compact()
+        return removed
+
+    @staticmethod
+    def _list_size(key: str, items: Iterable[bytes]) -> int:
+        return ENTRY_OVERHEAD + len(key) + sum(len(item) + LIST_ITEM_OVERHEAD for item in items)
+
+    # ---- 通用命令 ----
+
+    def exists(self, *names: str) -> int:
+        return sum(1 for name in names if self._lookup(_key(name)) is not None)
+
+    def delete(self, *names: str) -> int:
+        removed = 0
+        for name in names:
+            key = _key(name)
+            entry = self._lookup(key)
+            if entry is not None:
+                self._remove(key, entry)
+                removed += 1
+        return removed
+
+    unlink = delete
+
+    def expire(self, name: str, seconds: int) -> bool:
+        key = _key(name)
+        entry = self._lookup(key)
+        if entry is None:
+            return False
+        if seconds <= 0:
+            self._remove(key, entry)
+            return True
+        self._set_expiry(key, entry, time.monotonic() + seconds)
+        return True
+
+    def pttl(self, name: str) -> int:
+        entry = self._lookup(_key(name))
+        if entry is None:
+            return -2
+        if entry.expires_at is None:
+            return -1
+        return max(0, round((entry.expires_at - time.monotonic()) * 1000))
+
+    def ttl(self, name: str) -> int:
+        pttl = self.pttl(name)
+        return pttl if pttl < 0 else (pttl + 500) // 1000
+
+    def type(self, name: str) -> bytes:
+        entry = self._lookup(_key(name))
+        if entry is None:
+            return b"none"
+        return b"string" if isinstance(entry.value, bytes) else b"list"
+
+    def memory_usage(self, key: str, samples: Optional[int] = None) -> Optional[int]:
+        entry = self._lookup(_key(key))
+        return entry.size if entry is not None else None
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        pattern = _pattern(pattern)
+        return [key for key in list(self._data) if fnmatchcase(key, pattern) and self._lookup(key) is not None]
+
+    def scan(self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None,
+             _type: Optional[str] = None) -> Tuple[int, List[str]]:
+        self._maybe_compact()
+        pattern = _pattern(match) if match is not None else None
+        count = count or 10
+        kind = {"string": bytes, "list": deque}.get(_key(_type)) if _type is not None else None
+        now = time.monotonic()
+        order = self._order
+        i = bisect_left(order, int(cursor))
+        examined = 0
+        keys = []
+        while i < len(order) and examined < count:
+            key = self._id_keys.get(order[i])
+            i += 1
+            if key is None:
+                continue
+            examined += 1
+            entry = self._data[key]
+            if entry.expires_at is not None and entry.expires_at <= now:
+                self._remove(key, entry)
+                self.expired_keys += 1
+                continue
+            if pattern is not None and not fnmatchcase(key, pattern):
+                continue
+            if _type is not None and not (kind is not None and isinstance(entry.value, kind)):
+                continue
+            keys.append(key)
+        return (order[i] if i < len(order) else 0), keys
+
+    def dbsize(self) -> int:
+        return len(self._data)
+
+    def flushdb(self, asynchronous: bool = False) -> bool:
+        self._data.clear()
+        self._id_keys.clear()
+        self._order.clear()
+        self._expiry_heap.clear()
+        self.used_memory = 0
+        return True
+
+    # ---- 字符串 ----
+
+    def get(self, name: str) -> Optional[bytes]:
+        entry = self._lookup_type(_key(name), bytes)
+        return entry.value if entry is not None else None
+
+    def mget(self, keys: List[str], *args: str) -> List[Optional[bytes]]:
+        return [self.get(key) for key in [*keys, *args]]
+
+    def set(self, name: str, value: Any, ex: Optional[int] = None, px: Optional[int] = None,
+            nx: bool = False, xx: bool = False) -> Optional[bool]:
+        self._check_oom()
+        key = _key(name)
+        value = _bytes(value)
+        entry = self._lookup(key)
+        if (nx and entry is not None) or (xx and entry is None):
+            return None
+
+        size = ENTRY_OVERHEAD + len(key) + len(value)
+        if entry is None:
+            entry = self._insert(key, value, size)
+        else:
+            entry.value = value
+            self._resize(entry, size)
+        ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+        self._set_expiry(key, entry, time.monotonic() + ttl if ttl is not None else None)
+        self._evict()
+        return True
+
+    def mset(self, mapping: Dict[str, Any]) -> bool:
+        for key, value in mapping.items():
+            self.set(key, value)
+        return True
+
+    def incrby(self, name: str, amount: int = 1) -> int:
+        self._check_oom()
+        key = _key(name)
+        entry = self._lookup_type(key, bytes)
+        try:
+            current = int(entry.value) if entry is not None else 0
+        except ValueError:
+            raise ResponseError("value is not an integer or out of range")
+        value = str(current + amount).encode("ascii")
+        size = ENTRY_OVERHEAD + len(key) + len(value)
+        if entry is None:
+            self._insert(key, value, size)
+        else:
+            entry.value = value
+            self._resize(entry, size)
+        self._evict()
+        return current + amount
+
+    incr = incrby
+
+    # ---- 列表 ----
+
+    def lpush(self, name: str, *values: Any) -> int:
+        self._check_oom()
+        key = _key(name)
+        items = [_bytes(value) for value in values]
+        entry = self._lookup_type(key, deque)
+        if entry is None:
+            entry = self._insert(key, deque(), ENTRY_OVERHEAD + len(key))
+        entry.value.extendleft(items)
+        self._resize(entry, entry.size + sum(len(item) + LIST_ITEM_OVERHEAD for item in items))
+        length = len(entry.value)
+        self._evict()
+        return length
+
+    def lrange(self, name: str, start: int, end: int) -> List[bytes]:
+        entry = self._lookup_type(_key(name), deque)
+        if entry is None:
+            return []
+        length = len(entry.value)
+        start = max(start + length if start < 0 else start, 0)
+        end = min(end + length if end < 0 else end, length - 1)
+        if start > end:
+            return []
+        return list(islice(entry.value, start, end + 1))
+
+    def ltrim(self, name: str, start: int, end: int) -> bool:
+        key = _key(name)
+        entry = self._lookup_type(key, deque)
+        if entry is None:
+            return True
+        items = self.lrange(key, start, end)
+        if not items:
+            self._remove(key, entry)
+            return True
+        entry.value = deque(items)
+        self._resize(entry, self._list_size(key, items))
+        return True
+
+    def llen(self, name: str) -> int:
+        entry = self._lookup_type(_key(name), deque)
+        return len(entry.value) if entry is not None else 0
+
+
+# 管道中可以排队的命令
+PIPELINE_COMMANDS = frozenset({
+    "exists", "delete", "unlink", "expire", "pttl", "ttl", "type", "memory_usage",
+    "get", "mget", "set", "mset", "incrby", "incr", "lpush", "lrange", "ltrim", "llen",
+})
+
+
+class MemoryPipeline:
+    """命令管道：排队后在 execute() 中依次同步执行（中间不会切换协程，相当于 MULTI/EXEC）"""
+
+    def __init__(self, store: MemoryStore):
+        self._store = store
+        self._commands: List[Tuple[Callable[..., Any], tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., "MemoryPipeline"]:
+        if name not in PIPELINE_COMMANDS:
+            raise AttributeError(name)
+        command = getattr(self._store, name)
+
+        def queue(*args: Any, **kwargs: Any) -> "MemoryPipeline":
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self, raise_on_error: bool = True) -> List[Any]:
+        commands, self._commands = self._commands, []
+        results: List[Any] = []
+        for command, args, kwargs in commands:
+            try:
+                results.append(command(*args, **kwargs))
+            except ResponseError as e:
+                results.append(e)
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def reset(self):
+        self._commands = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any):
+        self.reset()
+
+
+class MemoryPubSub:
+    """订阅者：消息放在自己的队列里，由 get_message() 取出"""
+
+    def __init__(self, broker: "MemoryRedis"):
+        self._broker = broker
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.channels: Set[str] = set()
+        self.disconnected = False
+
+    def _deliver(self, message: Dict[str, Any]):
+        if self._queue.qsize() >= PUBSUB_BACKLOG:
+            # 消费太慢：和 Redis 一样断开订阅，由调用方重新订阅
+            self.disconnected = True
+            self._broker._unsubscribe(self, self.channels)
+            return
+        self._queue.put_nowait(message)
+
+    async def subscribe(self, *channels: str):
+        for channel in map(_key, channels):
+            self.channels.add(channel)
+            self._broker._subscribers.setdefault(channel, set()).add(self)
+            self._deliver({"type": "subscribe", "pattern": None, "channel": channel.encode(), "data": len(self.channels)})
+
+    async def unsubscribe(self, *channels: str):
+        channels = set(map(_key, channels)) or set(self.channels)
+        self._broker._unsubscribe(self, channels)
+        for channel in channels:
+            self.channels.discard(channel)
+            self._deliver({"type": "unsubscribe", "pattern": None, "channel": channel.encode(), "data": len(self.channels)})
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: Optional[float] = 0.0) -> Optional[Dict[str, Any]]:
+        if self.disconnected:
+            raise RedisConnectionError("订阅者消息积压过多，已断开")
+        try:
+            if timeout:
+                message = await asyncio.wait_for(self._queue.get(), timeout)
+            else:
+                message = self._queue.get_nowait()
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            return None
+        if ignore_subscribe_messages and message["type"] in ("subscribe", "unsubscribe"):
+            return None
+        return message
+
+    async def aclose(self):
+        self._broker._unsubscribe(self, self.channels)
+        self.channels = set()
+
+    close = aclose
+    reset = aclose
+
+
+class _MemoryScript:
+    def __init__(self, store: MemoryStore, handler: Optional[ScriptHandler]):
+        self._store = store
+        self._handler = handler
+
+    async def __call__(self, keys: List[Any] = (), args: List[Any] = ()) -> Any:
+        if self._handler is None:
+            raise ResponseError("memory 后端不支持执行该 Lua 脚本")
+        return self._handler(self._store, list(keys), list(args))
+
+
+class MemoryRedis:
+    """redis.asyncio.Redis 的进程内替代（只实现项目用到的命令）"""
+
+    def __init__(
+        self,
+        max_memory: int = 256 * 1024 * 1024,
+        policy: str = "allkeys-lru",
+        expire_interval: float = 0.1,
+        scripts: Optional[Dict[str, ScriptHandler]] = None,
+    ):
+        self.store = MemoryStore(max_memory, policy)
+        self.expire_interval = expire_interval
+        self.scripts: Dict[str, ScriptHandler] = dict(scripts or {})
+        self.connection_pool = None
+        self._subscribers: Dict[str, Set[MemoryPubSub]] = {}
+        self._expire_task: Optional[asyncio.Task] = None
+        self._started_at = time.monotonic()
+
+    def start(self):
+        """启动定期过期清理（需要在事件循环中调用）"""
+        if self._expire_task is None or self._expire_task.done():
+            self._expire_task = asyncio.get_running_loop().create_task(self._expire_loop())
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(self.expire_interval)
+            # 一次清理了满批说明积压较多，立即继续（中间让出事件循环）
+            while self.store.expire_due() >= EXPIRE_BATCH:
+                await asyncio.sleep(0)
+
+    async def aclose(self):
+        if self._expire_task is not None:
+            self._expire_task.cancel()
+            self._expire_task = None
+
+    close = aclose
+
+    async def ping(self) -> bool:
+        return True
+
+    async def info(self) -> Dict[str, Any]:
+        store = self.store
+        return {
+            "redis_version": "memory",
+            "uptime_in_seconds": int(time.monotonic() - self._started_at),
+            "connected_clients": 1,
+            "used_memory": store.used_memory,
+            "used_memory_human": f"{store.used_memory / 1024 / 1024:.2f}M",
+            "maxmemory": store.max_memory,
+            "maxmemory_policy": store.policy,
+            "evicted_keys": store.evicted_keys,
+            "expired_keys": store.expired_keys,
+            "pubsub_channels": len(self._subscribers),
+        }
+
+    # ---- 命令（直接委托给 MemoryStore）----
+
+    async def get(self, name: str) -> Optional[bytes]:
+        return self.store.get(name)
+
+    async def set(self, name: str, value: Any, ex: Optional[int] = None, px: Optional[int] = None,
+                  nx: bool = False, xx: bool = False) -> Optional[bool]:
+        return self.store.set(name, value, ex=ex, px=px, nx=nx, xx=xx)
+
+    async def mget(self, keys: List[str], *args: str) -> List[Optional[bytes]]:
+        return self.store.mget(keys, *args)
+
+    async def mset(self, mapping: Dict[str, Any]) -> bool:
+        return self.store.mset(mapping)
+
+    async def incrby(self, name: str, amount: int = 1) -> int:
+        return self.store.incrby(name, amount)
+
+    incr = incrby
+
+    async def delete(self, *names: str) -> int:
+        return self.store.delete(*names)
+
+    async def unlink(self, *names: str) -> int:
+        return self.store.unlink(*names)
+
+    async def exists(self, *names: str) -> int:
+        return self.store.exists(*names)
+
+    async def expire(self, name: str, seconds: int) -> bool:
+        return self.store.expire(name, seconds)
+
+    async def ttl(self, name: str) -> int:
+        return self.store.ttl(name)
+
+    async def pttl(self, name: str) -> int:
+        return self.store.pttl(name)
+
+    async def type(self, name: str) -> bytes:
+        return self.store.type(name)
+
+    async def memory_usage(self, key: str, samples: Optional[int] = None) -> Optional[int]:
+        return self.store.memory_usage(key, samples)
+
+    async def keys(self, pattern: str = "*") -> List[str]:
+        return self.store.keys(pattern)
+
+    async def scan(self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None,
+                   _type: Optional[str] = None) -> Tuple[int, List[str]]:
+        return self.store.scan(cursor, match, count, _type)
+
+    async def dbsize(self) -> int:
+        return self.store.dbsize()
+
+    async def flushdb(self, asynchronous: bool = False) -> bool:
+        return self.store.flushdb(asynchronous)
+
+    async def lpush(self, name: str, *values: Any) -> int:
+        return self.store.lpush(name, *values)
+
+    async def lrange(self, name: str, start: int, end: int) -> List[bytes]:
+        return self.store.lrange(name, start, end)
+
+    async def ltrim(self, name: str, start: int, end: int) -> bool:
+        return self.store.ltrim(name, start, end)
+
+    async def llen(self, name: str) -> int:
+        return self.store.llen(name)
+
+    def pipeline(self, transaction: bool = True) -> MemoryPipeline:
+        return MemoryPipeline(self.store)
+
+    def register_script(self, script: str) -> _MemoryScript:
+        return _MemoryScript(self.store, self.scripts.get(script))
+
+    # ---- pub/sub ----
+
+    def pubsub(self) -> MemoryPubSub:
+        return MemoryPubSub(self)
+
+    async def publish(self, channel: str, message: Any) -> int:
+        channel = _key(channel)
+        subscribers = list(self._subscribers.get(channel, ()))
+        payload = _bytes(message)
+        for subscriber in subscribers:
+            subscriber._deliver({"type": "message", "pattern": None, "channel": channel.encode(), "data": payload})
+        return len(subscribers)
+
+    def _unsubscribe(self, subscriber: MemoryPubSub, channels: Iterable[str]):
+        for channel in list(channels):
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[channel]
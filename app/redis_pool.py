@@ -0,0 +1,143 @@
+"""Redis 连接池（带指标）
+
+在 redis-py 的 ConnectionPool / BlockingConnectionPool 上统计借出连接的次数、
+因连接用尽而等待的次数（只有阻塞池会等待）、连接用尽导致失败的次数和借出耗时，供 /redis/pool 接口查看。
+池大小、阻塞等待超时和健康检查间隔由 Settings 中的 redis_* 配置决定。
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import asyncio
+import time
+
+from redis.asyncio.connection import AbstractConnection, BlockingConnectionPool, ConnectionPool
+from redis.exceptions import ConnectionError
+
+
+# 当前协程本次借连接时是否遇到过“连接已用尽”（阻塞池在锁内反复检查，按协程记录）
+_acquire_waited: ContextVar[Optional[List[bool]]] = ContextVar("redis_pool_acquire_waited", default=None)
+
+
+class _PoolMetricsMixin:
+    """统计 get_connection 的等待和耗时"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.acquisitions = 0
+        self.waits = 0
+        self.exhausted = 0
+        self.acquire_seconds_total = 0.0
+        self.acquire_seconds_max = 0.0
+
+    def can_get_connection(self) -> bool:
+        available = bool(super().can_get_connection())
+        if not available:
+            waited = _acquire_waited.get()
+            if waited is not None:
+                waited[0] = True
+        return available
+
+    async def get_connection(self, command_name, *keys, **options):
+        waited = [False]
+        token = _acquire_waited.set(waited)
+        start = time.perf_counter()
+        try:
+            # 非阻塞池不会自己检查，这里先检查一次；阻塞池在等待期间还会再检查
+            self.can_get_connection()
+            connection = await super().get_connection(command_name, *keys, **options)
+        except ConnectionError:
+            if waited[0]:
+                # 等待超时（阻塞池）或连接数超限（非阻塞池）
+                self.exhausted += 1
+            raise
+        finally:
+            _acquire_waited.reset(token)
+            # 非阻塞池不会等待，连接用尽只计入 exhausted
+            if waited[0] and isinstance(self, BlockingConnectionPool):
+                self.waits += 1
+        elapsed = time.perf_counter() - start
+
+        self.acquisitions += 1
+        self.acquire_seconds_total += elapsed
+        if elapsed > self.acquire_seconds_max:
+            self.acquire_seconds_max = elapsed
+        return connection
+
+    def metrics(self) -> Dict[str, Any]:
+        in_use = len(self._in_use_connections)
+        idle = len(self._available_connections)
+        return {
+            "blocking": isinstance(self, BlockingConnectionPool),
+            "max_connections": self.max_connections,
+            "in_use": in_use,
+            "idle": idle,
+            "created": in_use + idle,
+            "acquisitions": self.acquisitions,
+            "waits": self.waits,
+            "exhausted": self.exhausted,
+            "acquire_avg_ms": round(self.acquire_seconds_total / self.acquisitions * 1000, 3) if self.acquisitions else 0.0,
+            "acquire_max_ms": round(self.acquire_seconds_max * 1000, 3),
+        }
+
+
+class InstrumentedConnectionPool(_PoolMetricsMixin, ConnectionPool):
+    """连接用尽时立即报错的连接池"""
+
+
+class _BlockingConnectionPool(BlockingConnectionPool):
+    """只在锁内取出连接，建立连接放到锁外
+
+    redis-py 5.0.1 在持有条件锁时建立连接，连接失败后 release() 需要再次获取同一把锁，
+    导致死等到 timeout，并且建连期间阻塞了其他协程借连接。
+    """
+
+    async def _checkout(self) -> AbstractConnection:
+        async with self._condition:
+            await self._condition.wait_for(self.can_get_connection)
+            try:
+                connection = self._available_connections.pop()
+            except IndexError:
+                connection = self.make_connection()
+            self._in_use_connections.add(connection)
+            return connection
+
+    async def get_connection(self, command_name, *keys, **options):
+        try:
+            connection = await asyncio.wait_for(self._checkout(), self.timeout)
+        except asyncio.TimeoutError as err:
+            raise ConnectionError("No connection available.") from err
+
+        try:
+            await self.ensure_connection(connection)
+        except BaseException:
+            await self.release(connection)
+            raise
+        return connection
+
+
+class InstrumentedBlockingConnectionPool(_PoolMetricsMixin, _BlockingConnectionPool):
+    """连接用尽时等待（最多 timeout 秒）的连接池"""
+
+
+def create_connection_pool(
+    url: str,
+    max_connections: int,
+    blocking: bool,
+    timeout: float,
+    health_check_interval: int,
+    **connection_kwargs: Any,
+) -> ConnectionPool:
+    """按配置创建连接池"""
+    if blocking:
+        return InstrumentedBlockingConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            timeout=timeout,
+            health_check_interval=health_check_interval,
+            **connection_kwargs,
+        )
+    return InstrumentedConnectionPool.from_url(
+        url,
+        max_connections=max_connections,
+        health_check_interval=health_check_interval,
+        **connection_kwargs,
+    )
@@ -0,0 +1,351 @@
+"""多个 Redis 实例之间按一致性哈希分片（REDIS_SHARD_URLS）
+
+ShardedRedis 实现与 redis.asyncio.Redis 相同的命令子集，RedisClient 无需区分单实例和分片：
+- 单键命令按键路由到一个实例；多键命令（DELETE/EXISTS/MGET/MSET 等）按实例拆分后并发执行再合并
+- 键中含 {标签} 时只对标签部分哈希（与 Redis Cluster 相同），相关的键可以放在同一实例上，
+  例如 doc:{42}:log 和 doc:{42}:meta
+- 管道按实例拆成多个子管道并发执行，结果按原顺序返回；transaction=True 只在单个实例内原子
+- Lua 脚本的所有键必须在同一实例上
+- SCAN 依次遍历各实例，返回的游标同时编码了实例序号和该实例的游标
+- pub/sub 固定使用列表中的第一个实例
+
+每个实例在哈希环上有 vnodes 个虚拟节点，增加或删除一个实例时只有约 1/N 的键需要迁移
+（对缓存来说就是这部分键失效一次）。
+"""
+from bisect import bisect
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import asyncio
+
+from redis.exceptions import ResponseError
+
+DEFAULT_VNODES = 160
+
+# 参数是若干个键、结果需要求和的命令
+SUM_COMMANDS = frozenset({"delete", "unlink", "exists"})
+# 管道中可以排队的命令（第一个参数是键）
+PIPELINE_COMMANDS = frozenset({
+    "get", "set", "incrby", "incr", "expire", "ttl", "pttl", "type", "memory_usage",
+    "lpush", "lrange", "ltrim", "llen",
+}) | SUM_COMMANDS
+
+
+def hash_tag(key: str) -> str:
+    """{...} 中的内容（非空时）参与哈希，否则整个键参与哈希"""
+    start = key.find("{")
+    if start != -1:
+        end = key.find("}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+def ring_hash(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def shard_name(url: str) -> str:
+    """实例在哈希环上的名字：host:port/db（不含密码，调整 URL 顺序不影响分布）"""
+    parsed = urlparse(url)
+    db = parsed.path.lstrip("/") or "0"
+    return f"{parsed.hostname or 'localhost'}:{parsed.port or 6379}/{db}"
+
+
+class HashRing:
+    """一致性哈希环"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = DEFAULT_VNODES):
+        self.vnodes = vnodes
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        self._rebuild()
+
+    def remove(self, node: str):
+        self.nodes.remove(node)
+        self._rebuild()
+
+    def _rebuild(self):
+        ring = sorted((ring_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(self.vnodes))
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise ValueError("哈希环中没有节点")
+        index = bisect(self._points, ring_hash(hash_tag(key)))
+        return self._owners[index % len(self._owners)]
+
+
+def _key(name: Any) -> str:
+    return name.decode("utf-8") if isinstance(name, bytes) else name
+
+
+def _sum(parts: List[Any]) -> Any:
+    for part in parts:
+        if isinstance(part, Exception):
+            return part
+    return sum(parts)
+
+
+class ShardedPipeline:
+    """按实例拆分的管道：execute() 时各实例的子管道并发执行"""
+
+    def __init__(self, sharded: "ShardedRedis", transaction: bool):
+        self._sharded = sharded
+        self._transaction = transaction
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., "ShardedPipeline"]:
+        if name not in PIPELINE_COMMANDS:
+            raise AttributeError(name)
+
+        def queue(*args: Any, **kwargs: Any) -> "ShardedPipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self, raise_on_error: bool = True) -> List[Any]:
+        commands, self._commands = self._commands, []
+        pipes: Dict[str, Any] = {}
+        queued: Dict[str, int] = {}
+        # 每条命令对应的 [(实例, 子管道中的序号)]，多键命令可能分布在多个实例上
+        plan: List[List[Tuple[str, int]]] = []
+
+        def queue(node: str, command: str, args: tuple, kwargs: dict) -> Tuple[str, int]:
+            pipe = pipes.get(node)
+            if pipe is None:
+                pipe = pipes[node] = self._sharded.shards[node].pipeline(transaction=self._transaction)
+                queued[node] = 0
+            getattr(pipe, command)(*args, **kwargs)
+            queued[node] += 1
+            return node, queued[node] - 1
+
+        for command, args, kwargs in commands:
+            if command in SUM_COMMANDS:
+                plan.append([
+                    queue(node, command, tuple(keys), kwargs)
+                    for node, keys in self._sharded.group_keys(args).items()
+                ])
+            else:
+                plan.append([queue(self._sharded.node_for(args[0]), command, args, kwargs)])
+
+        nodes = list(pipes)
+        replies = await asyncio.gather(*(pipes[node].execute(raise_on_error=False) for node in nodes))
+        by_node = dict(zip(nodes, replies))
+
+        results = []
+        for (command, _, _), parts in zip(commands, plan):
+            values = [by_node[node][index] for node, index in parts]
+            results.append(_sum(values) if command in SUM_COMMANDS else values[0])
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def reset(self):
+        self._commands = []
+
+    async def __aenter__(self) -> "ShardedPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any):
+        self.reset()
+
+
+class _ShardedScript:
+    def __init__(self, sharded: "ShardedRedis", script: str):
+        self._sharded = sharded
+        self._script = script
+        self._runners: Dict[str, Any] = {}
+
+    async def __call__(self, keys: List[Any] = (), args: List[Any] = ()) -> Any:
+        nodes = {self._sharded.node_for(key) for key in keys}
+        if len(nodes) != 1:
+            raise ResponseError("CROSSSLOT Lua 脚本的键必须在同一个分片上（使用 {标签}）")
+        node = nodes.pop()
+        runner = self._runners.get(node)
+        if runner is None:
+            runner = self._runners[node] = self._sharded.shards[node].register_script(self._script)
+        return await runner(keys=keys, args=args)
+
+
+class ShardedRedis:
+    """多个 Redis 客户端组成的分片集群（只实现项目用到的命令）"""
+
+    def __init__(self, shards: Dict[str, Any], vnodes: int = DEFAULT_VNODES, pubsub_shard: Optional[str] = None):
+        if not shards:
+            raise ValueError("至少需要一个分片")
+        self.shards = dict(shards)
+        self.names = list(self.shards)  # SCAN 遍历顺序
+        self.ring = HashRing(self.names, vnodes)
+        self.pubsub_shard = pubsub_shard or self.names[0]
+
+    def node_for(self, key: Any) -> str:
+        return self.ring.node_for(_key(key))
+
+    def client_for(self, key: Any) -> Any:
+        return self.shards[self.node_for(key)]
+
+    def group_keys(self, keys: Iterable[Any]) -> Dict[str, List[Any]]:
+        groups: Dict[str, List[Any]] = {}
+        for key in keys:
+            groups.setdefault(self.node_for(key), []).append(key)
+        return groups
+
+    async def _each(self, call: Callable[[Any], Any]) -> List[Any]:
+        return await asyncio.gather(*(call(client) for client in self.shards.values()))
+
+    async def ping(self) -> bool:
+        return all(await self._each(lambda client: client.ping()))
+
+    async def info(self) -> Dict[str, Any]:
+        infos = await self._each(lambda client: client.info())
+        used_memory = sum(info.get("used_memory", 0) for info in infos)
+        return {
+            **infos[0],
+            "used_memory": used_memory,
+            "used_memory_human": f"{used_memory / 1024 / 1024:.2f}M",
+            "uptime_in_seconds": min(info.get("uptime_in_seconds", 0) for info in infos),
+            "connected_clients": sum(info.get("connected_clients", 0) for info in infos),
+            "shards": len(infos),
+        }
+
+    async def close(self):
+        await self._each(lambda client: client.close())
+
+    aclose = close
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        return {
+            name: client.connection_pool.metrics()
+            for name, client in self.shards.items()
+            if hasattr(getattr(client, "connection_pool", None), "metrics")
+        }
+
+    # ---- 单键命令 ----
+
+    async def get(self, name: Any) -> Optional[bytes]:
+        return await self.client_for(name).get(name)
+
+    async def set(self, name: Any, value: Any, **kwargs: Any) -> Optional[bool]:
+        return await self.client_for(name).set(name, value, **kwargs)
+
+    async def incrby(self, name: Any, amount: int = 1) -> int:
+        return await self.client_for(name).incrby(name, amount)
+
+    incr = incrby
+
+    async def expire(self, name: Any, seconds: int) -> bool:
+        return await self.client_for(name).expire(name, seconds)
+
+    async def ttl(self, name: Any) -> int:
+        return await self.client_for(name).ttl(name)
+
+    async def pttl(self, name: Any) -> int:
+        return await self.client_for(name).pttl(name)
+
+    async def type(self, name: Any) -> bytes:
+        return await self.client_for(name).type(name)
+
+    async def memory_usage(self, key: Any, samples: Optional[int] = None) -> Optional[int]:
+        return await self.client_for(key).memory_usage(key, samples=samples)
+
+    async def lpush(self, name: Any, *values: Any) -> int:
+        return await self.client_for(name).lpush(name, *values)
+
+    async def lrange(self, name: Any, start: int, end: int) -> List[bytes]:
+        return await self.client_for(name).lrange(name, start, end)
+
+    async def ltrim(self, name: Any, start: int, end: int) -> bool:
+        return await self.client_for(name).ltrim(name, start, end)
+
+    async def llen(self, name: Any) -> int:
+        return await self.client_for(name).llen(name)
+
+    # ---- 多键命令：按实例拆分，并发执行 ----
+
+    async def _sum_by_shard(self, command: str, names: tuple) -> int:
+        groups = self.group_keys(names)
+        counts = await asyncio.gather(*(
+            getattr(self.shards[node], command)(*keys) for node, keys in groups.items()
+        ))
+        return sum(counts)
+
+    async def delete(self, *names: Any) -> int:
+        return await self._sum_by_shard("delete", names)
+
+    async def unlink(self, *names: Any) -> int:
+        return await self._sum_by_shard("unlink", names)
+
+    async def exists(self, *names: Any) -> int:
+        return await self._sum_by_shard("exists", names)
+
+    async def mget(self, keys: List[Any], *args: Any) -> List[Optional[bytes]]:
+        keys = [*keys, *args]
+        positions: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            positions.setdefault(self.node_for(key), []).append(i)
+        replies = await asyncio.gather(*(
+            self.shards[node].mget([keys[i] for i in indexes]) for node, indexes in positions.items()
+        ))
+        values: List[Optional[bytes]] = [None] * len(keys)
+        for indexes, reply in zip(positions.values(), replies):
+            for i, value in zip(indexes, reply):
+                values[i] = value
+        return values
+
+    async def mset(self, mapping: Dict[Any, Any]) -> bool:
+        groups: Dict[str, Dict[Any, Any]] = {}
+        for key, value in mapping.items():
+            groups.setdefault(self.node_for(key), {})[key] = value
+        replies = await asyncio.gather(*(self.shards[node].mset(part) for node, part in groups.items()))
+        return all(replies)
+
+    # ---- 键空间 ----
+
+    async def keys(self, pattern: str = "*") -> List[Any]:
+        return [key for keys in await self._each(lambda client: client.keys(pattern)) for key in keys]
+
+    async def scan(self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None,
+                   _type: Optional[str] = None) -> Tuple[int, List[Any]]:
+        """游标 = 实例游标 × 实例数 + 实例序号；一个实例遍历完后从下一个实例的 0 开始"""
+        shard_count = len(self.names)
+        index, shard_cursor = int(cursor) % shard_count, int(cursor) // shard_count
+        client = self.shards[self.names[index]]
+        shard_cursor, keys = await client.scan(cursor=shard_cursor, match=match, count=count, _type=_type)
+        shard_cursor = int(shard_cursor)
+        if shard_cursor == 0:
+            index += 1
+            if index == shard_count:
+                return 0, keys
+        return shard_cursor * shard_count + index, keys
+
+    async def dbsize(self) -> int:
+        return sum(await self._each(lambda client: client.dbsize()))
+
+    async def flushdb(self, asynchronous: bool = False) -> bool:
+        return all(await self._each(lambda client: client.flushdb(asynchronous=asynchronous)))
+
+    # ---- 管道、脚本、pub/sub ----
+
+    def pipeline(self, transaction: bool = True) -> ShardedPipeline:
+        return ShardedPipeline(self, transaction)
+
+    def register_script(self, script: str) -> _ShardedScript:
+        return _ShardedScript(self, script)
+
+    def pubsub(self) -> Any:
+        return self.shards[self.pubsub_shard].pubsub()
+
+    async def publish(self, channel: str, message: Any) -> int:
+        return await self.shards[self.pubsub_shard].publish(channel, message)
@@ -0,0 +1,77 @@
+"""路由模板匹配
+
+把应用的路由路径模板（如 /items/{item_id}）编译成按路径段查找的前缀树，
+请求路径只需逐段做字典查找就能得到对应的模板，不需要逐个路由跑正则。
+在 Starlette 路由之前（中间件中）使用。
+"""
+from typing import Dict, Iterable, List, Optional
+
+
+class _Node:
+    __slots__ = ("children", "param", "catch_all", "template")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None  # {name} 参数段
+        self.catch_all: Optional[str] = None  # {name:path} 匹配剩余所有段
+        self.template: Optional[str] = None
+
+
+def _is_param(segment: str) -> bool:
+    return segment.startswith("{") and segment.endswith("}")
+
+
+class RouteTemplateMatcher:
+    """路径 -> 路由模板"""
+
+    def __init__(self, templates: Iterable[str] = ()):
+        # 不带参数的模板直接一次字典查找
+        self._static: Dict[str, str] = {}
+        self._root = _Node()
+        for template in templates:
+            self.add(template)
+
+    def add(self, template: str):
+        segments = template.split("/")
+        if not any(_is_param(segment) for segment in segments):
+            self._static.setdefault(template, template)
+            return
+
+        node = self._root
+        for segment in segments:
+            if _is_param(segment):
+                if segment.endswith(":path}"):
+                    if node.catch_all is None:
+                        node.catch_all = template
+                    return
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                node = node.children.setdefault(segment, _Node())
+        if node.template is None:
+            node.template = template
+
+    def match(self, path: str) -> Optional[str]:
+        """返回匹配的路由模板，没有匹配时返回 None（字面段优先于参数段）"""
+        template = self._static.get(path)
+        if template is not None:
+            return template
+        return self._match(self._root, path.split("/"), 0)
+
+    def _match(self, node: _Node, segments: List[str], index: int) -> Optional[str]:
+        if index == len(segments):
+            return node.template
+
+        child = node.children.get(segments[index])
+        if child is not None:
+            template = self._match(child, segments, index + 1)
+            if template is not None:
+                return template
+
+        if node.param is not None and segments[index]:
+            template = self._match(node.param, segments, index + 1)
+            if template is not None:
+                return template
+
+        return node.catch_all
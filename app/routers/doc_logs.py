@@ -1,14 +1,13 @@
 """文档操作日志路由"""
 from fastapi import APIRouter, Depends, HTTPException, Request, status, Body
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import List, Optional
 from pydantic import BaseModel
 import logging
 
-from .. import models
-from ..database import get_db
+from .. import crud
+from ..crud_async import run_crud
+from ..database import DbSession, get_session
 from ..redis_client import redis_client
 from ..config import settings
 from ..security import get_admin_user
@@ -63,7 +62,7 @@ def verify_api_key(request: Request):
 async def log_doc_action(
     log_data: DocLogRequest = Body(...),
     request: Request = None,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -76,8 +75,10 @@ async def log_doc_action(
         api_key: API Key（如果配置）
     """
     try:
-        # 1. 记录到数据库
-        log_entry = models.DocLog(
+        # 1. 记录到数据库（异步引擎或线程池，不阻塞事件循环）
+        await run_crud(
+            crud.create_doc_log,
+            db,
             action=log_data.action,
             doc_slug=log_data.doc_slug,
             user_id=log_data.user_id,
@@ -86,22 +87,21 @@ async def log_doc_action(
             auth_method=log_data.auth_method,
             details=log_data.details
         )
-        db.add(log_entry)
-        db.commit()
 
         # 2. 记录到 Redis（快速查询）
         log_key = f"doc:log:{datetime.now().strftime('%Y%m%d')}"
-        await redis_client.lpush(log_key, {
-            'action': log_data.action,
-            'doc_slug': log_data.doc_slug,
-            'user_email': log_data.user_email,
-            'user_name': log_data.user_name,
-            'auth_method': log_data.auth_method,
-            'timestamp': datetime.now().isoformat(),
-            'details': log_data.details
-        })
-        # 设置过期时间：7天
-        await redis_client.expire(log_key, 7 * 24 * 60 * 60)
+        # 推入日志并设置过期时间（7天），一次往返
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.lpush(log_key, {
+                'action': log_data.action,
+                'doc_slug': log_data.doc_slug,
+                'user_email': log_data.user_email,
+                'user_name': log_data.user_name,
+                'auth_method': log_data.auth_method,
+                'timestamp': datetime.now().isoformat(),
+                'details': log_data.details
+            })
+            pipe.expire(log_key, 7 * 24 * 60 * 60)
 
         # 审计日志（脱敏）
         if settings.debug:
@@ -110,7 +110,7 @@ async def log_doc_action(
         return {"success": True, "message": "日志记录成功"}
 
     except Exception as e:
-        db.rollback()
+        # 未提交的事务在会话关闭时回滚
         logger.error(f"Failed to create doc log: {str(e)}")
         # 生产环境不暴露错误详情
         if settings.app_env == "production":
@@ -127,7 +127,7 @@ async def get_doc_logs(
     limit: int = 100,
     doc_slug: Optional[str] = None,
     action: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     current_user: dict = Depends(get_admin_user)
 ):
     """
@@ -142,16 +142,8 @@ async def get_doc_logs(
         current_user: 当前用户（必须是管理员）
     """
     try:
-        query = db.query(models.DocLog)
-
-        # 应用过滤条件
-        if doc_slug:
-            query = query.filter(models.DocLog.doc_slug == doc_slug)
-        if action:
-            query = query.filter(models.DocLog.action == action)
-
-        # 按时间倒序排序
-        logs = query.order_by(desc(models.DocLog.timestamp)).limit(limit).all()
+        # 按文档、操作类型过滤，按时间倒序排序
+        logs = await run_crud(crud.get_doc_logs, db, limit=limit, doc_slug=doc_slug, action=action)
 
         # 审计日志（脱敏）
         if settings.debug:
@@ -185,7 +177,7 @@ async def get_doc_logs(
 @router.get("/stats")
 async def get_doc_stats(
     request: Request,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     current_user: dict = Depends(get_admin_user)
 ):
     """
@@ -201,9 +193,7 @@ async def get_doc_stats(
     try:
         # 获取最近7天的统计
         week_ago = datetime.now() - timedelta(days=7)
-        recent_logs = db.query(models.DocLog).filter(
-            models.DocLog.timestamp >= week_ago
-        ).all()
+        recent_logs = await run_crud(crud.get_doc_logs_since, db, since=week_ago)
 
         # 统计各类型操作
         stats = {
@@ -1,9 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from .. import crud, schemas
-from ..database import get_db
+from typing import Any, Dict, List, Optional, Union
+from .. import crud, models, schemas
+from ..config import settings
+from ..crud_async import run_crud
+from ..database import DbSession, get_session
+from ..item_index import ITEM_DETAIL_KEY_PREFIX, item_index
+from ..item_suggest import item_suggester
+from ..pagination import Cursor, InvalidCursor, decode_cursor
+from ..redis_client import redis_client
 from ..security import get_current_user, get_admin_user
+from ..tiered_cache import tiered_cache
 
 router = APIRouter(
     prefix="/items",
@@ -11,71 +17,156 @@ router = APIRouter(
     responses={404: {"description": "商品未找到"}}
 )
 
-@router.get("/", response_model=List[schemas.Item])
-def read_items(
+# 热点读取缓存（进程内 L1 + Redis）：商品详情和列表首页，写操作后失效
+# 首页缓存键带列表版本号，写操作只需递增版本号，旧版本的键等待过期
+ITEM_LIST_MAX_LIMIT = 100
+ITEM_LIST_VERSION_KEY = "items:list:version"
+
+def _item_key(item_id: int) -> str:
+    return f"{ITEM_DETAIL_KEY_PREFIX}{item_id}"
+
+def _first_page_key(version: int, limit: int) -> str:
+    return f"items:list:v{version}:0:{limit}"
+
+def _item_dict(db_item: models.Item) -> Dict[str, Any]:
+    return schemas.Item.model_validate(db_item).model_dump(mode="json")
+
+async def _invalidate_item(item_id: int):
+    """商品变更后删除详情缓存，并递增列表版本号（所有 limit 的首页缓存随之失效）"""
+    await tiered_cache.invalidate([_item_key(item_id)], versions=[ITEM_LIST_VERSION_KEY])
+
+# 传入 cursor 参数（第一页传空字符串）时使用游标分页，返回 {items, next_cursor}，忽略 skip
+CURSOR_DESCRIPTION = "分页游标：第一页传空字符串，之后传上一页返回的 next_cursor（此时忽略 skip）"
+
+def _decode_cursor(cursor: str) -> Optional[Cursor]:
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", response_model=Union[List[schemas.Item], schemas.ItemPage])
+async def read_items(
     skip: int = Query(0, ge=0, description="跳过的记录数"),
-    limit: int = Query(10, ge=1, le=100, description="返回的记录数"),
-    db: Session = Depends(get_db),
+    limit: int = Query(10, ge=1, le=ITEM_LIST_MAX_LIMIT, description="返回的记录数"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: DbSession = Depends(get_session),
     current_user: Optional[dict] = Depends(lambda: None)  # 公开访问，无需认证
 ):
-    """获取商品列表（公开访问）"""
-    items = crud.get_items(db, skip=skip, limit=limit)
+    """获取商品列表（公开访问，首页走缓存）"""
+    if cursor is not None:
+        items, next_cursor = await run_crud(crud.get_items_page, db, cursor=_decode_cursor(cursor), limit=limit)
+        return {"items": items, "next_cursor": next_cursor}
+
+    if skip != 0:
+        return await run_crud(crud.get_items, db, skip=skip, limit=limit)
+
+    version = await tiered_cache.get(ITEM_LIST_VERSION_KEY)
+    if version is None:
+        # 版本号不存在时创建（INCRBY 0）；Redis 不可用时无法让其他 worker 失效，不缓存首页
+        version = (await redis_client.incr_many({ITEM_LIST_VERSION_KEY: 0})).get(ITEM_LIST_VERSION_KEY)
+        if version is None:
+            return await run_crud(crud.get_items, db, skip=0, limit=limit)
+    cache_key = _first_page_key(version, limit)
+    items = await tiered_cache.get(cache_key)
+    if items is None:
+        db_items = await run_crud(crud.get_items, db, skip=0, limit=limit)
+        items = [_item_dict(db_item) for db_item in db_items]
+        await tiered_cache.set(cache_key, items, settings.item_cache_expire)
     return items
 
-@router.get("/search", response_model=List[schemas.Item])
-def search_items(
+@router.get("/search", response_model=Union[List[schemas.Item], schemas.ItemPage])
+async def search_items(
     keyword: str = Query(..., min_length=1, description="搜索关键词"),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: DbSession = Depends(get_session),
     current_user: Optional[dict] = Depends(lambda: None)  # 公开访问，无需认证
 ):
     """搜索商品（公开访问）"""
-    items = crud.search_items(db, keyword=keyword, skip=skip, limit=limit)
+    if cursor is not None:
+        items, next_cursor = await run_crud(
+            crud.search_items_page, db, keyword=keyword, cursor=_decode_cursor(cursor), limit=limit
+        )
+        return {"items": items, "next_cursor": next_cursor}
+
+    # 启用了进程内 trigram 索引时不访问数据库（短关键词和过于常见的关键词除外）
+    if item_index.ready:
+        items = await item_index.lookup(keyword, skip, limit)
+        if items is not None:
+            return items
+
+    items = await run_crud(crud.search_items, db, keyword=keyword, skip=skip, limit=limit)
     return items
 
+@router.get("/suggest", response_model=List[str])
+async def suggest_items(
+    prefix: str = Query(..., min_length=1, max_length=100, description="名称前缀"),
+    limit: int = Query(10, ge=1, le=20, description="返回的名称数"),
+    db: DbSession = Depends(get_session),
+    current_user: Optional[dict] = Depends(lambda: None)  # 公开访问，无需认证
+):
+    """商品名称补全（公开访问，按字典序返回以 prefix 开头的名称）"""
+    if item_suggester.ready:
+        return item_suggester.suggest(prefix, limit)
+    return await run_crud(crud.suggest_item_names, db, prefix=prefix, limit=limit)
+
+@router.get("/search/index")
+async def search_index_stats(admin_user: dict = Depends(get_admin_user)):
+    """进程内商品搜索索引的统计信息（需要管理员权限）"""
+    return item_index.stats()
+
 @router.get("/{item_id}", response_model=schemas.Item)
-def read_item(
+async def read_item(
     item_id: int,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     current_user: Optional[dict] = Depends(lambda: None)  # 公开访问，无需认证
 ):
-    """获取单个商品（公开访问）"""
-    db_item = crud.get_item(db, item_id=item_id)
-    if db_item is None:
-        raise HTTPException(status_code=404, detail="商品未找到")
-    return db_item
+    """获取单个商品（公开访问，走缓存）"""
+    cache_key = _item_key(item_id)
+    item = await tiered_cache.get(cache_key)
+    if item is None:
+        db_item = await run_crud(crud.get_item, db, item_id=item_id)
+        if db_item is None:
+            raise HTTPException(status_code=404, detail="商品未找到")
+        item = _item_dict(db_item)
+        await tiered_cache.set(cache_key, item, settings.item_cache_expire)
+    return item
 
 @router.post("/", response_model=schemas.Item, status_code=201)
-def create_item(
+async def create_item(
     item: schemas.ItemCreate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     admin_user: dict = Depends(get_admin_user)  # 需要管理员权限
 ):
     """创建新商品"""
-    return crud.create_item(db=db, item=item)
+    db_item = await run_crud(crud.create_item, db, item=item)
+    await _invalidate_item(db_item.id)
+    return db_item
 
 @router.put("/{item_id}", response_model=schemas.Item)
-def update_item(
+async def update_item(
     item_id: int, 
     item: schemas.ItemUpdate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     admin_user: dict = Depends(get_admin_user)  # 需要管理员权限
 ):
     """更新商品信息"""
-    db_item = crud.update_item(db=db, item_id=item_id, item=item)
+    db_item = await run_crud(crud.update_item, db, item_id=item_id, item=item)
     if db_item is None:
         raise HTTPException(status_code=404, detail="商品未找到")
+    await _invalidate_item(item_id)
     return db_item
 
 @router.delete("/{item_id}")
-def delete_item(
+async def delete_item(
     item_id: int, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     admin_user: dict = Depends(get_admin_user)  # 需要管理员权限
 ):
     """删除商品"""
-    success = crud.delete_item(db=db, item_id=item_id)
+    success = await run_crud(crud.delete_item, db, item_id=item_id)
     if not success:
         raise HTTPException(status_code=404, detail="商品未找到")
+    await _invalidate_item(item_id)
     return {"message": "商品删除成功"}
\ No newline at end of file
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import Dict, Any, List
-from ..redis_client import redis_client
+from typing import Dict, Any, List, Optional
+from ..redis_client import get_cache_stats, redis_client
+from ..redis_codec import legacy_decode
+from ..redis_jobs import DeleteByPatternJob, KeyspaceProfileJob, cancel_job as cancel_keyspace_job, get_job, list_jobs, start_job
+from ..tiered_cache import tiered_cache
 from ..security import get_current_user, get_admin_user
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import json
 
 router = APIRouter(
@@ -21,6 +24,26 @@ class RedisResponse(BaseModel):
     message: str
     data: Any = None
 
+class RedisKeysPage(BaseModel):
+    cursor: int
+    keys: List[str]
+    done: bool
+
+class RedisDeletePatternRequest(BaseModel):
+    pattern: str
+    type: Optional[str] = None
+    batch_size: int = Field(500, ge=1, le=5000, description="每次 SCAN 的 COUNT，也是每次 UNLINK 的最大键数")
+
+class RedisMemoryProfileRequest(BaseModel):
+    pattern: str = "*"
+    type: Optional[str] = None
+    batch_size: int = Field(500, ge=1, le=5000, description="每次 SCAN 的 COUNT")
+    sample_rate: float = Field(1.0, gt=0, le=1, description="分析的键所占比例，其余键只计入扫描数")
+    prefix_depth: int = Field(2, ge=1, le=5, description="按键名前几段（以 : 分隔）归类")
+    memory_samples: Optional[int] = Field(None, ge=0, description="MEMORY USAGE 的 SAMPLES 参数，0 表示统计集合类型的全部元素")
+
+KEY_TYPES = ("string", "list", "set", "zset", "hash", "stream")
+
 @router.get("/ping")
 async def ping_redis():
     """测试 Redis 连接"""
@@ -33,14 +56,25 @@ async def ping_redis():
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Redis 连接失败: {str(e)}")
 
-@router.get("/keys", response_model=List[str])
+@router.get("/keys", response_model=RedisKeysPage)
 async def get_keys(
     pattern: str = Query("*", description="键匹配模式"),
+    cursor: int = Query(0, ge=0, description="上一页返回的游标，0 表示从头开始"),
+    count: int = Query(100, ge=1, le=1000, description="每次 SCAN 检查的键数量（提示值，返回数量可能不同）"),
+    type: Optional[str] = Query(None, description="只返回该类型的键：string/list/set/zset/hash/stream"),
     current_user: dict = Depends(get_current_user)
 ):
-    """获取所有匹配的键"""
-    keys = await redis_client.keys(pattern)
-    return keys
+    """分页浏览匹配的键（基于 SCAN，不会阻塞 Redis）
+
+    用返回的 cursor 请求下一页，done 为 true 表示遍历结束；某一页可能为空但遍历尚未结束。
+    """
+    if type is not None and type not in KEY_TYPES:
+        raise HTTPException(status_code=400, detail=f"不支持的键类型: {type}")
+    page = await redis_client.scan(cursor, pattern, count, type)
+    if page is None:
+        raise HTTPException(status_code=503, detail="Redis 不可用")
+    next_cursor, keys = page
+    return RedisKeysPage(cursor=next_cursor, keys=keys, done=next_cursor == 0)
 
 @router.get("/get/{key}")
 async def get_value(
@@ -48,14 +82,19 @@ async def get_value(
     current_user: dict = Depends(get_current_user)
 ):
     """获取指定键的值"""
-    value = await redis_client.get(key)
+    async with redis_client.pipeline() as pipe:
+        pipe.get(key).ttl(key)
+    value, ttl = pipe.results
     if value is None:
         raise HTTPException(status_code=404, detail="键不存在")
+    if isinstance(value, str):
+        # 与旧版本一致：字符串值按 JSON 解析（"123" 返回 123）
+        value = legacy_decode(value)
     
     return {
         "key": key,
         "value": value,
-        "ttl": await redis_client.ttl(key)
+        "ttl": ttl
     }
 
 @router.post("/set", response_model=RedisResponse)
@@ -135,7 +174,7 @@ async def get_ttl(
 async def flush_database(
     admin_user: dict = Depends(get_admin_user)
 ):
-    """清空当前数据库（危险操作）"""
+    """清空当前数据库（危险操作，FLUSHDB ASYNC 在后台释放内存）"""
     success = await redis_client.flushdb()
     
     if success:
@@ -157,7 +196,7 @@ async def get_redis_stats(
     
     try:
         info = await redis_client.redis_client.info()
-        keys_count = len(await redis_client.keys("*"))
+        keys_count = await redis_client.dbsize()
         
         return {
             "connected": True,
@@ -170,6 +209,107 @@ async def get_redis_stats(
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"获取统计信息失败: {str(e)}")
 
+@router.post("/delete-pattern", status_code=202)
+async def delete_by_pattern(
+    request: RedisDeletePatternRequest,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """在后台按模式批量删除键（SCAN + UNLINK，需要管理员权限），返回任务信息"""
+    if request.pattern in ("", "*"):
+        raise HTTPException(status_code=400, detail="清空整个数据库请使用 /redis/flushdb")
+    if request.type is not None and request.type not in KEY_TYPES:
+        raise HTTPException(status_code=400, detail=f"不支持的键类型: {request.type}")
+    if not redis_client.redis_client:
+        raise HTTPException(status_code=503, detail="Redis 未连接")
+
+    job = await start_job(DeleteByPatternJob(request.pattern, request.batch_size, request.type))
+    return job.as_dict()
+
+@router.post("/memory-profile", status_code=202)
+async def start_memory_profile(
+    request: RedisMemoryProfileRequest,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """在后台分析键空间内存占用（需要管理员权限）
+
+    SCAN 遍历键，按前缀汇总 MEMORY USAGE、TTL 分布和类型；
+    通过 /redis/jobs/{job_id} 查看进度（cursor、scanned）和当前已汇总的结果。
+    """
+    if request.type is not None and request.type not in KEY_TYPES:
+        raise HTTPException(status_code=400, detail=f"不支持的键类型: {request.type}")
+    if not redis_client.redis_client:
+        raise HTTPException(status_code=503, detail="Redis 未连接")
+
+    job = await start_job(KeyspaceProfileJob(
+        request.pattern,
+        request.batch_size,
+        request.type,
+        sample_rate=request.sample_rate,
+        prefix_depth=request.prefix_depth,
+        memory_samples=request.memory_samples,
+    ))
+    return job.as_dict()
+
+@router.get("/jobs")
+async def get_jobs(
+    admin_user: dict = Depends(get_admin_user)
+):
+    """列出最近的后台键空间任务，包括其他 worker 启动的任务（需要管理员权限）"""
+    return await list_jobs()
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """查询后台任务进度（需要管理员权限）"""
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(
+    job_id: str,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """取消正在运行的后台任务（需要管理员权限）"""
+    cancelled = await cancel_keyspace_job(job_id)
+    if cancelled is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if not cancelled:
+        raise HTTPException(status_code=409, detail="任务已结束")
+    return {"id": job_id, "status": "cancelling"}
+
+@router.get("/pool")
+async def get_redis_pool_stats(
+    admin_user: dict = Depends(get_admin_user)
+):
+    """获取 Redis 连接池统计（需要管理员权限）"""
+    if redis_client.backend == "memory":
+        raise HTTPException(status_code=404, detail="memory 后端没有连接池")
+    stats = redis_client.pool_stats()
+    if stats is None:
+        raise HTTPException(status_code=503, detail="Redis 未连接")
+    return stats
+
+@router.get("/breaker")
+async def get_redis_breaker_stats(
+    admin_user: dict = Depends(get_admin_user)
+):
+    """获取 Redis 熔断器状态和状态切换次数（需要管理员权限）"""
+    return redis_client.breaker_stats()
+
+@router.get("/cache/stats")
+async def get_cache_stats_view(
+    admin_user: dict = Depends(get_admin_user)
+):
+    """获取缓存命中统计：各 cache_result 装饰器，以及进程内 L1 / Redis 两级缓存（需要管理员权限）"""
+    return {
+        "cache_result": get_cache_stats(),
+        "tiered": tiered_cache.stats(),
+    }
+
 # 缓存示例接口
 @router.get("/cache/example")
 async def cache_example(
@@ -179,13 +319,15 @@ async def cache_example(
     """缓存示例 - 演示如何使用 Redis 缓存"""
     cache_key = f"greeting:{name}"
     
-    # 尝试从缓存获取
-    cached_result = await redis_client.get(cache_key)
+    # 尝试从缓存获取（值和剩余时间一次取回）
+    async with redis_client.pipeline() as pipe:
+        pipe.get(cache_key).ttl(cache_key)
+    cached_result, ttl = pipe.results
     if cached_result:
         return {
             "message": cached_result,
             "from_cache": True,
-            "ttl": await redis_client.ttl(cache_key)
+            "ttl": ttl
         }
     
     # 生成新结果并缓存
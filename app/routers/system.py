@@ -1,5 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.responses import PlainTextResponse
+from ..security import get_admin_user
+from ..security_pipeline import get_security_stats
 
 router = APIRouter(
     tags=["系统管理"]
@@ -21,6 +23,11 @@ def health_check():
     """健康检查"""
     return {"status": "healthy", "database": "connected"}
 
+@router.get("/security/stats")
+async def security_stats(admin_user: dict = Depends(get_admin_user)):
+    """安全管道运行统计（IP 跟踪数量、内存占用等，需要管理员权限）"""
+    return get_security_stats()
+
 @router.get("/robots.txt", response_class=PlainTextResponse, include_in_schema=False)
 def robots():
     """robots.txt - 限制爬虫访问敏感路径"""
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Union, Optional
+from typing import List, Union, Optional
 from datetime import datetime
 
 class ItemBase(BaseModel):
@@ -24,3 +24,7 @@ class Item(ItemBase):
 
     class Config:
         from_attributes = True  # Pydantic v2 语法
+
+class ItemPage(BaseModel):
+    items: List[Item]
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为 null")
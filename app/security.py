@@ -52,6 +52,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
+def get_token_subject(token: str) -> Optional[str]:
+    """校验令牌签名并返回 sub，令牌无效或过期时返回 None"""
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    return subject if isinstance(subject, str) else None
+
 def authenticate_user(username: str, password: str):
     """验证用户"""
     user = fake_users_db.get(username)
@@ -1,87 +1,129 @@
-from fastapi import FastAPI
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
 from .config import settings
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """安全响应头中间件"""
-
-    async def dispatch(self, request, call_next):
-        response: Response = await call_next(request)
-
-        # 防止点击劫持
-        response.headers["X-Frame-Options"] = "DENY"
-
-        # 防止 MIME 类型嗅探
-        response.headers["X-Content-Type-Options"] = "nosniff"
-
-        # XSS 防护
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-
-        # Referrer Policy
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
-        # 权限策略
-        response.headers["Permissions-Policy"] = (
-            "camera=(), microphone=(), geolocation=(), "
-            "payment=(), usb=(), magnetometer=(), gyroscope=(), "
-            "accelerometer=(), ambient-light-sensor=(), "
-            "autoplay=(self), encrypted-media=(self), fullscreen=(self)"
-        )
-
-        # Content Security Policy
-        csp_directives = [
-            "default-src 'self'",
-            "frame-src 'none'",
-            "object-src 'none'",
-            "base-uri 'self'",
-            "form-action 'self'",
-            "frame-ancestors 'none'",
+from .route_matcher import RouteTemplateMatcher
+
+# 需要从响应中移除的头（可能泄露服务器信息）
+STRIPPED_HEADERS = frozenset([b"x-powered-by", b"server"])
+
+
+def _build_csp() -> str:
+    """构建 Content Security Policy"""
+    csp_directives = [
+        "default-src 'self'",
+        "frame-src 'none'",
+        "object-src 'none'",
+        "base-uri 'self'",
+        "form-action 'self'",
+        "frame-ancestors 'none'",
+    ]
+
+    # 根据环境设置不同的 CSP 策略
+    if settings.debug:
+        # 开发环境：放宽限制，支持 Swagger UI、ReDoc CDN 和热重载
+        csp_directives.extend([
+            "script-src 'self' 'unsafe-inline' 'unsafe-eval' blob: data: https://cdn.jsdelivr.net https://unpkg.com http://localhost:* http://127.0.0.1:*",
+            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com http://localhost:* http://127.0.0.1:*",
+            "img-src 'self' data: https: https://cdn.jsdelivr.net https://fonts.gstatic.com http://localhost:* http://127.0.0.1:*",
+            "font-src 'self' data: https://cdn.jsdelivr.net https://fonts.gstatic.com https://fonts.googleapis.com http://localhost:* http://127.0.0.1:*",
+            "connect-src 'self' ws: wss: blob: data: https://cdn.jsdelivr.net https://unpkg.com http://localhost:* http://127.0.0.1:*",
+            "worker-src 'self' blob: data: https://cdn.jsdelivr.net https://unpkg.com http://localhost:* http://127.0.0.1:*",
+        ])
+    else:
+        # 生产环境：更严格的限制，但允许 API 文档 CDN
+        csp_directives.extend([
+            "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net https://unpkg.com",
+            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com",
+            "img-src 'self' data: https: https://cdn.jsdelivr.net https://fonts.gstatic.com",
+            "font-src 'self' data: https://cdn.jsdelivr.net https://fonts.gstatic.com https://fonts.googleapis.com",
+            "connect-src 'self' ws: wss: https://cdn.jsdelivr.net https://unpkg.com",
+            "worker-src 'self' blob:",
+        ])
+
+    return "; ".join(csp_directives)
+
+
+# 响应头策略名称
+HEADER_POLICY_API = "api"
+HEADER_POLICY_DOCS = "docs"
+
+# 按路由模板覆盖响应头策略（与 @app.get 中的路径一致），未列出的路由使用 api 策略
+SECURITY_HEADER_ROUTES: Dict[str, str] = {
+    # Swagger UI / ReDoc 是 HTML 页面，需要允许 CDN 脚本和样式
+    "/docs": HEADER_POLICY_DOCS,
+    "/redoc": HEADER_POLICY_DOCS,
+}
+
+
+def _policy_headers(policy: str) -> List[Tuple[str, str]]:
+    """各策略的响应头（名称, 值）"""
+    if policy == HEADER_POLICY_API:
+        # JSON 接口不会被浏览器当作页面渲染，只保留必要的几项
+        headers = [
+            ("X-Content-Type-Options", "nosniff"),
+            ("X-Frame-Options", "DENY"),
+            ("Referrer-Policy", "no-referrer"),
+            ("Content-Security-Policy", "default-src 'none'; frame-ancestors 'none'"),
         ]
-
-        # 根据环境设置不同的 CSP 策略
-        if settings.debug:
-            # 开发环境：放宽限制，支持 Swagger UI、ReDoc CDN 和热重载
-            csp_directives.extend([
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' blob: data: https://cdn.jsdelivr.net https://unpkg.com http://localhost:* http://127.0.0.1:*",
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com http://localhost:* http://127.0.0.1:*",
-                "img-src 'self' data: https: https://cdn.jsdelivr.net https://fonts.gstatic.com http://localhost:* http://127.0.0.1:*",
-                "font-src 'self' data: https://cdn.jsdelivr.net https://fonts.gstatic.com https://fonts.googleapis.com http://localhost:* http://127.0.0.1:*",
-                "connect-src 'self' ws: wss: blob: data: https://cdn.jsdelivr.net https://unpkg.com http://localhost:* http://127.0.0.1:*",
-                "worker-src 'self' blob: data: https://cdn.jsdelivr.net https://unpkg.com http://localhost:* http://127.0.0.1:*",
-            ])
-        else:
-            # 生产环境：更严格的限制，但允许 API 文档 CDN
-            csp_directives.extend([
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net https://unpkg.com",
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com",
-                "img-src 'self' data: https: https://cdn.jsdelivr.net https://fonts.gstatic.com",
-                "font-src 'self' data: https://cdn.jsdelivr.net https://fonts.gstatic.com https://fonts.googleapis.com",
-                "connect-src 'self' ws: wss: https://cdn.jsdelivr.net https://unpkg.com",
-                "worker-src 'self' blob:",
-            ])
-
-        response.headers["Content-Security-Policy"] = "; ".join(csp_directives)
-
-        # HSTS (仅生产环境)
-        if settings.app_env == "production":
-            hsts_value = "max-age=31536000; includeSubDomains; preload"
-            response.headers["Strict-Transport-Security"] = hsts_value
-
-        # 移除可能泄露信息的头
-        try:
-            del response.headers["X-Powered-By"]
-        except KeyError:
-            pass
-        try:
-            del response.headers["Server"]
-        except KeyError:
-            pass
-
-        return response
-
-
-def setup_security_headers(app: FastAPI):
-    """设置安全响应头中间件"""
-    app.add_middleware(SecurityHeadersMiddleware)
+    elif policy == HEADER_POLICY_DOCS:
+        headers = [
+            # 防止点击劫持
+            ("X-Frame-Options", "DENY"),
+            # 防止 MIME 类型嗅探
+            ("X-Content-Type-Options", "nosniff"),
+            # XSS 防护
+            ("X-XSS-Protection", "1; mode=block"),
+            # Referrer Policy
+            ("Referrer-Policy", "strict-origin-when-cross-origin"),
+            # 权限策略
+            ("Permissions-Policy", (
+                "camera=(), microphone=(), geolocation=(), "
+                "payment=(), usb=(), magnetometer=(), gyroscope=(), "
+                "accelerometer=(), ambient-light-sensor=(), "
+                "autoplay=(self), encrypted-media=(self), fullscreen=(self)"
+            )),
+            # Content Security Policy
+            ("Content-Security-Policy", _build_csp()),
+        ]
+    else:
+        raise ValueError(f"不存在的响应头策略: {policy}")
+
+    # HSTS (仅生产环境)
+    if settings.app_env == "production":
+        headers.append(("Strict-Transport-Security", "max-age=31536000; includeSubDomains; preload"))
+    return headers
+
+
+class HeaderPolicy(NamedTuple):
+    """编译后的响应头策略"""
+    raw_headers: List[Tuple[bytes, bytes]]
+    # 注入前需要先移除的头：会被覆盖的安全头 + 泄露信息的头 + 调用方追加的头
+    replaced_names: FrozenSet[bytes]
+
+
+class SecurityHeaders:
+    """安全响应头（启动时按策略预编译为原始字节头，由安全管道注入）"""
+
+    def __init__(self, extra_replaced_names: Iterable[bytes] = ()):
+        extra_replaced_names = frozenset(extra_replaced_names)
+        self.policies: Dict[str, HeaderPolicy] = {}
+        for policy in (HEADER_POLICY_API, HEADER_POLICY_DOCS):
+            raw_headers = [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in _policy_headers(policy)
+            ]
+            self.policies[policy] = HeaderPolicy(
+                raw_headers=raw_headers,
+                replaced_names=frozenset(name for name, _ in raw_headers) | STRIPPED_HEADERS | extra_replaced_names,
+            )
+
+        self.default_policy = self.policies[HEADER_POLICY_API]
+        self.matcher = RouteTemplateMatcher(SECURITY_HEADER_ROUTES)
+        self.route_policies = {
+            template: self.policies[policy] for template, policy in SECURITY_HEADER_ROUTES.items()
+        }
+
+    def for_path(self, path: str) -> HeaderPolicy:
+        """根据请求路径选择响应头策略"""
+        template = self.matcher.match(path)
+        if template is None:
+            return self.default_policy
+        return self.route_policies[template]
@@ -0,0 +1,214 @@
+"""融合安全管道
+
+把 IP 过滤、敏感路径保护、速率限制和安全响应头合并为一个纯 ASGI 中间件，
+每个请求只经过一层：拒绝响应（403/404/429）预先序列化，直接写回，不进入应用；
+放行的请求在 http.response.start 时一次性追加响应头。
+"""
+from fastapi import FastAPI
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+
+from .ip_filter import IP_FILTER_EXEMPT_PATHS, create_ip_filter
+from .path_protection import PATH_SENSITIVE, PATH_SUSPICIOUS, create_path_protection
+from .middleware import RATE_LIMIT_EXEMPT_PATHS, RateLimiter
+from .security_headers import HeaderPolicy, SecurityHeaders
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+# 当前生效的安全管道实例（中间件栈构建时创建，供统计接口读取）
+_active_pipeline: Optional["SecurityPipelineMiddleware"] = None
+
+# 管道自己注入的头（注入前先移除应用设置的同名头）
+PIPELINE_HEADER_NAMES = frozenset([
+    b"x-client-ip",
+    b"x-ratelimit-limit",
+    b"x-ratelimit-remaining",
+    b"x-ratelimit-reset",
+])
+
+
+def _json_body(content: dict) -> bytes:
+    """与 JSONResponse 相同的序列化方式"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _body_headers(body: bytes) -> RawHeaders:
+    """JSON 响应体的基础头"""
+    return [
+        (b"content-length", str(len(body)).encode("latin-1")),
+        (b"content-type", b"application/json"),
+    ]
+
+
+_CLIENT_HEADERS = frozenset((b"x-forwarded-for", b"x-real-ip", b"user-agent"))
+
+
+def _get_client_ip(scope: Scope) -> Tuple[str, str]:
+    """从 ASGI scope 中一次性取出客户端真实 IP 和 User-Agent"""
+    # 同名请求头出现多次时取第一个（与 request.headers.get 一致）
+    headers: Dict[bytes, bytes] = {}
+    for name, value in scope["headers"]:
+        if name in _CLIENT_HEADERS:
+            headers.setdefault(name, value)
+
+    client_ip = (
+        headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",")[0].strip() or
+        headers.get(b"x-real-ip", b"").decode("latin-1") or
+        (scope["client"][0] if scope.get("client") else "unknown")
+    )
+    return client_ip, headers.get(b"user-agent", b"unknown").decode("latin-1")
+
+
+class SecurityPipelineMiddleware:
+    """融合安全管道中间件（纯 ASGI）"""
+
+    def __init__(self, app: ASGIApp, routes: Sequence[BaseRoute] = ()):
+        self.app = app
+        self.ip_filter = create_ip_filter()
+        self.path_protection = create_path_protection()
+        # 中间件栈在应用启动时才构建，此时所有路由都已注册
+        self.rate_limiter = RateLimiter(
+            route.path for route in routes if isinstance(getattr(route, "path", None), str)
+        )
+        self.security_headers = SecurityHeaders(extra_replaced_names=PIPELINE_HEADER_NAMES)
+
+        # 预先序列化的拒绝响应
+        self._ip_blocked = _json_body({
+            "error": True,
+            "message": "访问被拒绝",
+            "code": "IP_BLOCKED"
+        })
+        self._path_blocked = _json_body({
+            "error": True,
+            "message": "Not Found",
+            "code": "PATH_BLOCKED"
+        })
+        self._suspicious_blocked = _json_body({
+            "error": True,
+            "message": "Not Found",
+            "code": "SUSPICIOUS_PATH"
+        })
+        # 429 响应体按 (limit, window) 缓存
+        self._rate_limited: Dict[Tuple[int, int], bytes] = {}
+
+        global _active_pipeline
+        _active_pipeline = self
+
+    def stats(self) -> Dict[str, Any]:
+        """安全管道各组件的运行统计"""
+        return {
+            "ip_filter": self.ip_filter.stats() if self.ip_filter is not None else None,
+            "path_protection": self.path_protection.stats(),
+            "rate_limiter": self.rate_limiter.stats(),
+        }
+
+    def _rate_limited_body(self, limit: int, window: int) -> bytes:
+        body = self._rate_limited.get((limit, window))
+        if body is None:
+            body = _json_body({
+                "error": True,
+                "message": "请求过于频繁，请稍后再试",
+                "limit": limit,
+                "window": window
+            })
+            self._rate_limited[(limit, window)] = body
+        return body
+
+    @staticmethod
+    def _inject_headers(headers: RawHeaders, policy: HeaderPolicy, extra_headers: RawHeaders) -> RawHeaders:
+        """移除会被覆盖/泄露信息的头，再一次性追加安全头和管道头"""
+        replaced = policy.replaced_names
+        result = [(name, value) for name, value in headers if name.lower() not in replaced]
+        result.extend(policy.raw_headers)
+        result.extend(extra_headers)
+        return result
+
+    async def _reject(self, send: Send, status_code: int, body: bytes, extra_headers: RawHeaders):
+        """直接写回拒绝响应（JSON），不进入应用"""
+        headers = _body_headers(body)
+        headers.extend(self.security_headers.default_policy.raw_headers)
+        headers.extend(extra_headers)
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        client_ip, user_agent = _get_client_ip(scope)
+        extra_headers: RawHeaders = []
+
+        # 1. IP 黑名单/白名单过滤
+        if self.ip_filter is not None and path not in IP_FILTER_EXEMPT_PATHS:
+            if not self.ip_filter.is_allowed(client_ip):
+                print(f"🚫 拒绝访问: IP={client_ip}, Path={path}")
+                await self._reject(send, 403, self._ip_blocked, [])
+                return
+
+            # 跟踪 IP（用于异常检测）
+            self.ip_filter.track(client_ip)
+            extra_headers.append((b"x-client-ip", client_ip.encode("latin-1")))
+
+        # 2. 敏感路径保护
+        verdict = self.path_protection.check(path)
+        if verdict == PATH_SENSITIVE:
+            print(f"🚫 阻止敏感路径访问: IP={client_ip}, Path={path}, UA={user_agent[:100]}")
+            await self._reject(send, 404, self._path_blocked, extra_headers)
+            return
+        if verdict == PATH_SUSPICIOUS:
+            self.path_protection.log_suspicious_access(path, client_ip, user_agent)
+
+            # 严格模式下，可疑路径也会被阻止
+            if self.path_protection.strict_mode:
+                print(f"🚫 严格模式阻止可疑路径: IP={client_ip}, Path={path}")
+                await self._reject(send, 404, self._suspicious_blocked, extra_headers)
+                return
+
+        # 3. 速率限制
+        if path not in RATE_LIMIT_EXEMPT_PATHS:
+            result = await self.rate_limiter.hit(scope, client_ip)
+            if result is not None:
+                # 添加速率限制响应头
+                extra_headers.extend([
+                    (b"x-ratelimit-limit", str(result.limit).encode("latin-1")),
+                    (b"x-ratelimit-remaining", str(result.remaining).encode("latin-1")),
+                    (b"x-ratelimit-reset", str(result.reset).encode("latin-1")),
+                ])
+                if not result.allowed:
+                    extra_headers.append((b"retry-after", str(result.retry_after).encode("latin-1")))
+                    await self._reject(
+                        send, 429, self._rate_limited_body(result.limit, result.window), extra_headers
+                    )
+                    return
+
+        # 4. 进入应用，在响应开始时按路由策略一次性注入响应头
+        policy = self.security_headers.for_path(path)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = self._inject_headers(message.get("headers", []), policy, extra_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def get_security_stats() -> Dict[str, Any]:
+    """获取安全管道统计（应用尚未处理请求时为空）"""
+    if _active_pipeline is None:
+        return {}
+    return _active_pipeline.stats()
+
+
+def setup_security_pipeline(app: FastAPI):
+    """设置融合安全管道（IP 过滤、路径保护、速率限制、安全响应头）"""
+    app.add_middleware(SecurityPipelineMiddleware, routes=app.router.routes)
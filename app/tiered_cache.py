@@ -0,0 +1,143 @@
+"""两级缓存：进程内 L1（LocalCache）+ Redis L2
+
+读取先查 L1，未命中再查 Redis 并回填 L1；写入同时写两级。
+失效时删除 Redis 中的键，并通过 pub/sub 广播给所有 worker，各自删除 L1 中的条目。
+订阅断开（Redis 故障、熔断）期间可能漏掉失效消息，所以每次（重新）订阅时清空 L1，
+L1 的 TTL 也远短于 Redis，作为兜底。
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import asyncio
+
+from .config import settings
+from .local_cache import LocalCache
+from .redis_client import redis_client
+
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class TieredCache:
+    """L1 + Redis 缓存，跨 worker 失效"""
+
+    def __init__(self, local: LocalCache, channel: str = CACHE_INVALIDATION_CHANNEL):
+        self.local = local
+        self.channel = channel
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+        self._listener: Optional[asyncio.Task] = None
+        self._callbacks: List[Callable[[List[str]], None]] = []
+        self._subscribe_callbacks: List[Callable[[], None]] = []
+
+    def on_invalidate(self, callback: Callable[[List[str]], None]):
+        """注册失效回调：收到其他 worker（以及本 worker）的失效消息时调用"""
+        self._callbacks.append(callback)
+
+    def on_subscribe(self, callback: Callable[[], None]):
+        """注册订阅回调：每次（重新）订阅成功时调用，此前的失效消息可能已经漏掉"""
+        self._subscribe_callbacks.append(callback)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        value, size = await redis_client.get_with_size(key)
+        if value is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        self.local.set(key, value, size)
+        return value
+
+    async def set(self, key: str, value: Any, expire: int):
+        # L1 条目大小取 Redis 中编码后的字节数（压缩后），只编码一次
+        size = await redis_client.set_with_size(key, value, expire)
+        self.local.set(key, value, size, ttl=expire)
+
+    async def invalidate(self, keys: List[str], versions: Sequence[str] = ()):
+        """删除两级缓存中的键、递增版本号键（versions），并通知其他 worker
+
+        版本号是 Redis 中的计数器，不会被删除；各 worker L1 中缓存的版本号随失效消息删除。
+        """
+        await redis_client.delete_many(keys)
+        if versions:
+            await redis_client.incr_many({key: 1 for key in versions})
+        keys = keys + list(versions)
+        self.local.delete(keys)
+        if await redis_client.publish(self.channel, {"keys": keys}):
+            self.invalidations_sent += 1
+
+    def start(self):
+        """启动失效消息订阅（应用启动时调用）"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        delay = 1.0
+        while True:
+            client = redis_client.redis_client
+            if client is None:
+                # 未连接或熔断中，等待恢复
+                await asyncio.sleep(1)
+                continue
+
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self.local.clear()
+                for callback in self._subscribe_callbacks:
+                    callback()
+                delay = 1.0
+                # 熔断器打开后 redis_client 会变成 None，此时退出重新订阅
+                while redis_client.redis_client is client:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._apply(redis_client.codec.decode(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  缓存失效订阅中断: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                self.local.clear()
+                await pubsub.aclose()
+
+    def _apply(self, message: Any):
+        if isinstance(message, dict) and isinstance(message.get("keys"), list):
+            self.invalidations_received += 1
+            self.local.delete(message["keys"])
+            for callback in self._callbacks:
+                callback(message["keys"])
+
+    def stats(self) -> Dict[str, Any]:
+        redis_lookups = self.redis_hits + self.redis_misses
+        return {
+            "l1": self.local.stats(),
+            "l2": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "hit_rate": round(self.redis_hits / redis_lookups, 4) if redis_lookups else 0.0,
+            },
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+            "subscribed": self._listener is not None and not self._listener.done(),
+        }
+
+
+# 全局两级缓存实例
+tiered_cache = TieredCache(LocalCache(
+    max_entries=settings.local_cache_max_entries,
+    max_bytes=settings.local_cache_max_bytes,
+    ttl=settings.local_cache_ttl,
+))
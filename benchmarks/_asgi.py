@@ -0,0 +1,69 @@
+"""基准脚本共用的 ASGI 调用工具（不经过网络，直接调用应用）"""
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def make_scope(path: str, method: str = "GET", headers: Optional[List[Tuple[bytes, bytes]]] = None) -> dict:
+    """构造最小 HTTP scope"""
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers or [(b"host", b"bench"), (b"user-agent", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def call(app, scope: dict) -> int:
+    """调用一次 ASGI 应用，返回状态码"""
+    status = 0
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # 之后的 receive 等同于连接一直保持，直到被取消
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, scope_factory: Callable[[int], dict], requests: int, warmup: int = 200) -> Dict[str, float]:
+    """顺序发送请求，返回延迟分位数（微秒）"""
+    for i in range(warmup):
+        await call(app, scope_factory(i))
+
+    samples = []
+    for i in range(requests):
+        scope = scope_factory(i)
+        start = time.perf_counter()
+        await call(app, scope)
+        samples.append((time.perf_counter() - start) * 1e6)
+
+    samples.sort()
+    return {
+        "p50": samples[len(samples) // 2],
+        "p99": samples[int(len(samples) * 0.99)],
+        "mean": statistics.fmean(samples),
+    }
+
+
+def print_row(name: str, stats: Dict[str, float]):
+    print(f"  {name:<32} p50={stats['p50']:8.1f}µs  p99={stats['p99']:8.1f}µs  mean={stats['mean']:8.1f}µs")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+数据库访问方式并发基准
+
+同样的查询（按主键取商品 + 取一页列表）在不同并发度下的吞吐量和事件循环延迟：
+- 同步 Session 直接在协程中调用（优化前 doc_logs 路由的写法，查询期间阻塞事件循环）
+- 同步 Session 放到线程池（优化前 items 路由的写法，每个请求占用一个线程池槽位）
+- AsyncSession（异步驱动，DATABASE_URL 使用 aiosqlite / aiomysql / asyncmy 时的路径）
+
+事件循环延迟：另一个协程每 1ms 醒来一次，记录实际唤醒比预期晚了多少（最大值），
+反映同一 worker 上其他请求被阻塞的时间。
+默认使用临时 SQLite 文件（需要 pip install aiosqlite）；设置 BENCH_DATABASE_URL
+为异步驱动的 URL（如 mysql+aiomysql://...）可以在 MySQL 上测试，基准会写入 items 表。
+
+用法:
+    python -m benchmarks.bench_db_async [商品数量] [每种方式的请求数]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, crud_async, models
+from app.database import Base, create_async_db_engine, create_db_engine, sync_database_url
+
+CONCURRENCY = (1, 16, 64)
+
+
+def seed(url: str, count: int):
+    engine = create_db_engine(sync_database_url(url))
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        existing = db.query(models.Item).count()
+        if existing < count:
+            db.add_all(
+                models.Item(name=f"商品 {i}", price=i % 1000 + 0.5, is_offer=i % 3 == 0, description="描述" * 20)
+                for i in range(existing, count)
+            )
+            db.commit()
+    engine.dispose()
+
+
+async def measure(handler, requests: int, concurrency: int):
+    """返回 (请求/秒, 事件循环最大延迟 ms)"""
+    lag = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal lag
+        while running:
+            expected = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - expected)
+
+    queue = list(range(requests))
+
+    async def worker():
+        while queue:
+            queue.pop()
+            await handler()
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    running = False
+    await tick
+    return requests / elapsed, lag * 1000
+
+
+async def main(count: int, requests: int):
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='db-bench-')}/bench.db"
+    seed(url, count)
+
+    sync_engine = create_db_engine(sync_database_url(url))
+    SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+    async_engine = create_async_db_engine(url)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def sync_query():
+        with SyncSession() as db:
+            crud.get_item(db, random.randint(1, count))
+            crud.get_items(db, skip=0, limit=10)
+
+    async def sync_on_loop():
+        sync_query()
+
+    async def sync_in_threadpool():
+        await run_in_threadpool(sync_query)
+
+    async def async_session():
+        async with AsyncSession() as db:
+            await crud_async.get_item(db, random.randint(1, count))
+            await crud_async.get_items(db, skip=0, limit=10)
+
+    handlers = {
+        "同步 Session（事件循环中）": sync_on_loop,
+        "同步 Session（线程池）": sync_in_threadpool,
+        "AsyncSession": async_session,
+    }
+
+    print(f"\n{url.split('://')[0]}，{count} 个商品，每种方式 {requests} 个请求（请求/秒，事件循环最大延迟）")
+    for concurrency in CONCURRENCY:
+        print(f"  并发 {concurrency}")
+        for name, handler in handlers.items():
+            await handler()  # 预热连接池
+            throughput, lag = await measure(handler, requests, concurrency)
+            print(f"    {name:<22}{throughput:10.0f} req/s{lag:10.1f} ms")
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+    ))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+CIDR 名单查找基准：逐条 ip_network() 线性匹配 vs IPNetworkIndex
+
+随机生成 10 ~ 100k 条 IPv4 CIDR（前缀长度 8~32），分别测量单次查找的平均耗时。
+线性匹配只在 10k 条以内测量（更大规模下单次查找已达数十毫秒）。
+
+用法:
+    python -m benchmarks.bench_ip_index [查找次数]
+"""
+import ipaddress
+import random
+import sys
+import time
+
+from app.ip_index import IPNetworkIndex
+
+SIZES = [10, 100, 1_000, 10_000, 100_000]
+LINEAR_MAX_SIZE = 10_000
+
+
+def random_cidrs(count: int, rng: random.Random):
+    cidrs = set()
+    while len(cidrs) < count:
+        prefixlen = rng.randint(8, 32)
+        address = ipaddress.IPv4Address(rng.getrandbits(32))
+        cidrs.add(str(ipaddress.ip_network(f"{address}/{prefixlen}", strict=False)))
+    return list(cidrs)
+
+
+def legacy_lookup(ip: str, networks) -> bool:
+    """原 IPFilterMiddleware._ip_in_networks 的实现"""
+    try:
+        ip_obj = ipaddress.ip_address(ip)
+        for network in networks:
+            network_obj = ipaddress.ip_network(network, strict=False)
+            if ip_obj in network_obj:
+                return True
+    except ValueError:
+        pass
+    return False
+
+
+def time_lookups(lookup, ips) -> float:
+    """返回单次查找的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for ip in ips:
+        lookup(ip)
+    return (time.perf_counter() - start) / len(ips) * 1e6
+
+
+def main(lookups: int):
+    rng = random.Random(42)
+    ips = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(lookups)]
+
+    print(f"\nIPv4 CIDR 查找耗时（{lookups} 次随机查找，单位 µs/次）")
+    print(f"  {'entries':<10}{'build(ms)':>12}{'index':>12}{'linear':>12}")
+    for size in SIZES:
+        cidrs = random_cidrs(size, rng)
+
+        start = time.perf_counter()
+        index = IPNetworkIndex(cidrs)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        indexed = time_lookups(index.__contains__, ips)
+
+        if size <= LINEAR_MAX_SIZE:
+            # 线性查找太慢，按规模缩减样本数
+            sample = ips[:max(10, lookups * 10 // size)]
+            linear = f"{time_lookups(lambda ip: legacy_lookup(ip, cidrs), sample):12.1f}"
+        else:
+            linear = f"{'-':>12}"
+
+        print(f"  {size:<10}{build_ms:12.1f}{indexed:12.2f}{linear}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+商品子串搜索基准：SQL LIKE vs SQLite FTS5 vs 进程内 trigram 倒排索引
+
+对每个目录规模（默认 1 万 / 10 万 / 100 万个商品）：
+- 生成随机商品（中英文混合的名称和描述）写入临时 SQLite 文件
+- 建立 FTS5 索引和进程内 trigram 索引，记录建索引耗时和倒排表占用
+- 用一组关键词（常见词、少见词、不存在的词、两个字符的短词）比较单次搜索耗时：
+  crud.search_items 的 LIKE 路径、FTS5 路径，以及 item_index.search
+
+用法:
+    python -m benchmarks.bench_item_index [商品数量,逗号分隔] [每个关键词的搜索次数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import Base, create_db_engine
+from app.item_index import ItemSearchIndex
+from app.item_search import LikeSearch, SQLiteFTS5Search, item_search
+
+WORDS = (
+    "无线 蓝牙 耳机 降噪 机械 键盘 鼠标 游戏 显示器 高清 便携 充电宝 快充 数据线 智能 手表 运动 "
+    "固态 硬盘 内存 电竞 椅 人体工学 摄像头 音箱 路由器 平板 手机壳 钢化膜 支架 "
+    "wireless bluetooth gaming keyboard mouse monitor portable charger usb-c smart watch ssd pro max mini"
+).split()
+KEYWORDS = ("无线", "蓝牙耳机", "机械 键盘", "gaming", "Pro Max", "不存在的商品", "xyzzy")
+
+
+def fake_items(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "name": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+            "price": rng.randint(10, 5000) + 0.99,
+            "is_offer": rng.random() < 0.2,
+            "description": " ".join(rng.sample(WORDS, 6)),
+        }
+
+
+def seed(engine, count: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        batch = []
+        for row in fake_items(count):
+            batch.append(row)
+            if len(batch) == 10000:
+                connection.execute(insert(models.Item), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(models.Item), batch)
+
+
+def timed(fn, repeat: int) -> float:
+    """返回单次调用的平均耗时（ms）"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(count: int, repeat: int):
+    path = os.path.join(tempfile.mkdtemp(prefix="index-bench-"), "bench.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+
+    start = time.perf_counter()
+    seed(engine, count)
+    seed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        SQLiteFTS5Search().setup(connection)
+    fts_seconds = time.perf_counter() - start
+
+    index = ItemSearchIndex()
+    with sessionmaker(bind=engine)() as db:
+        index.build(db)
+    stats = index.stats()
+
+    print(f"\n{count} 个商品（写入 {seed_seconds:.1f}s，FTS5 建索引 {fts_seconds:.1f}s，"
+          f"trigram 索引 {stats['build_seconds']:.1f}s / {stats['trigrams']} 个 trigram / "
+          f"倒排表 {stats['posting_bytes'] / 1024 / 1024:.1f} MB）")
+    print(f"  {'关键词':<14}{'命中':>8}{'SQL LIKE':>12}{'FTS5':>12}{'trigram':>12}")
+
+    like, fts5 = LikeSearch(), SQLiteFTS5Search()
+    with sessionmaker(bind=engine)() as db:
+        for keyword in KEYWORDS:
+            hits = len(index.search(keyword, 0, count))
+            item_search.backend = like
+            like_ms = timed(lambda: crud.search_items(db, keyword, 0, 10), repeat)
+            item_search.backend = fts5
+            fts_ms = timed(lambda: crud.search_items(db, keyword, 0, 10), repeat)
+            index_ms = timed(lambda: index.search(keyword, 0, 10), repeat)
+            print(f"  {keyword:<14}{hits:>8}{like_ms:10.2f} ms{fts_ms:10.2f} ms{index_ms:10.3f} ms")
+    item_search.backend = like
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    sizes = sys.argv[1] if len(sys.argv) > 1 else "10000,100000,1000000"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    for size in sizes.split(","):
+        run(int(size), repeat)
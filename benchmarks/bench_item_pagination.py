@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+商品列表分页基准：OFFSET vs 游标（keyset）
+
+依次读取第 1、10、100、1000、5000 页（每页 limit 条），比较两种分页方式单页查询耗时：
+- OFFSET：crud.get_items(skip=(page-1)*limit)，需要扫描并丢弃前面的行，越往后越慢
+- 游标：crud.get_items_page(cursor=...)，从 ix_items_created_at_id 索引上定位，每页耗时基本不变
+
+游标分页的第 N 页游标预先翻页得到（不计入耗时）。
+默认使用临时 SQLite 文件；设置 BENCH_DATABASE_URL（同步驱动，如 mysql+pymysql://...）可以在 MySQL 上测试，
+基准会写入 items 表。
+
+用法:
+    python -m benchmarks.bench_item_pagination [商品数量] [每页条数]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import Base, create_db_engine
+from app.pagination import decode_cursor
+
+PAGES = (1, 10, 100, 1000, 5000)
+REPEAT = 20
+
+
+def seed(db, count: int):
+    # 按间隔一分钟的创建时间写入（模拟陆续上架的商品，批量插入时 server_default 会让大量商品时间相同）
+    existing = db.query(models.Item).count()
+    base = datetime(2024, 1, 1)
+    batch = 10000
+    for start in range(existing, count, batch):
+        db.add_all(
+            models.Item(name=f"商品 {i}", price=i % 1000 + 0.5, is_offer=i % 3 == 0,
+                        created_at=base + timedelta(minutes=i))
+            for i in range(start, min(start + batch, count))
+        )
+        db.commit()
+
+
+def timed(fn) -> float:
+    """返回单次调用的平均耗时（ms）"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main(count: int, limit: int):
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp(prefix='page-bench-')}/bench.db"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as db:
+        seed(db, count)
+
+        # 预先翻页得到每个目标页的游标
+        cursors = {}
+        cursor, page = None, 1
+        while page <= max(PAGES):
+            if page in PAGES:
+                cursors[page] = cursor
+            _, next_cursor = crud.get_items_page(db, cursor=cursor, limit=limit)
+            if next_cursor is None:
+                break
+            cursor, page = decode_cursor(next_cursor), page + 1
+
+        print(f"\n{url.split('://')[0]}，{count} 个商品，每页 {limit} 条（单页查询耗时）")
+        print(f"  {'页码':<8}{'OFFSET':>12}{'游标':>12}")
+        for page in PAGES:
+            if page not in cursors:
+                break
+            offset_ms = timed(lambda: crud.get_items(db, skip=(page - 1) * limit, limit=limit))
+            keyset_ms = timed(lambda: crud.get_items_page(db, cursor=cursors[page], limit=limit))
+            print(f"  {page:<10}{offset_ms:10.2f} ms{keyset_ms:10.2f} ms")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    )
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+商品名称补全基准：数据库前缀查询 vs 进程内有序数组
+
+对每个目录规模（默认 10 万 / 100 万个商品），用一组前缀（中文、英文、全角、无匹配）比较：
+- crud.search_items：搜索框原来每次按键调用的 LIKE '%kw%' 查询
+- crud.suggest_item_names：name LIKE 'prefix%'（ITEM_SUGGEST_INDEX=false 时的路径）
+- item_suggester.suggest：二分查找有序名称数组
+
+默认使用临时 SQLite 文件（SQLite 的 LIKE 默认不区分大小写，不能使用 name 索引；
+MySQL 的前缀 LIKE 可以走索引范围扫描）。
+
+用法:
+    python -m benchmarks.bench_item_suggest [商品数量,逗号分隔] [每个前缀的查询次数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import create_db_engine
+from app.item_suggest import NameSuggester
+from benchmarks.bench_item_index import seed
+
+PREFIXES = ("无", "蓝牙", "机械 键", "gaming m", "ｐｒｏ", "不存在")
+LIMIT = 10
+
+
+def timed(fn, repeat: int) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(count: int, repeat: int):
+    path = os.path.join(tempfile.mkdtemp(prefix="suggest-bench-"), "bench.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    seed(engine, count)
+
+    suggester = NameSuggester()
+    with sessionmaker(bind=engine)() as db:
+        suggester.build(db)
+        print(f"\n{count} 个商品（有序数组 {len(suggester)} 个名称，加载 {suggester.build_seconds:.2f}s）")
+        print(f"  {'前缀':<12}{'LIKE %kw%':>14}{'LIKE prefix%':>16}{'有序数组':>12}")
+        for prefix in PREFIXES:
+            search_us = timed(lambda: crud.search_items(db, prefix, 0, LIMIT), repeat)
+            like_us = timed(lambda: crud.suggest_item_names(db, prefix, LIMIT), repeat)
+            array_us = timed(lambda: suggester.suggest(prefix, LIMIT), repeat * 100)
+            print(f"  {prefix:<12}{search_us:12.0f} us{like_us:14.0f} us{array_us:10.1f} us")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    sizes = sys.argv[1] if len(sys.argv) > 1 else "100000,1000000"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    for size in sizes.split(","):
+        run(int(size), repeat)
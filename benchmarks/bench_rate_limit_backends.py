@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+速率限制后端单次判定开销基准
+
+对比进程内计数、共享内存哈希表、Redis Lua 脚本和两级租借模式的每次 hit 耗时，
+并用多个进程并发访问同一个键，验证共享内存后端的计数在进程间是一致的。
+Redis 相关的行需要 REDIS_URL 指向可用的 Redis，否则跳过。
+
+用法:
+    python -m benchmarks.bench_rate_limit_backends [每个后端的请求数]
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from app.redis_client import redis_client
+from app.rate_limit import LeasedRateLimitBackend, MemoryRateLimitBackend, RedisRateLimitBackend
+from app.rate_limit_shm import SharedMemoryRateLimitBackend
+
+KEYS = 1000  # 轮流访问的限流键数量
+LIMIT = 10 ** 9  # 足够大，基准过程中不会触发拒绝
+
+
+async def time_backend(backend, requests: int) -> float:
+    """返回每次 hit 的平均耗时（微秒）"""
+    keys = [f"ratelimit:bench:10.0.{i // 256}.{i % 256}" for i in range(KEYS)]
+    for key in keys:
+        await backend.hit(key, LIMIT, 60)
+
+    start = time.perf_counter()
+    for i in range(requests):
+        await backend.hit(keys[i % KEYS], LIMIT, 60)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def _shm_worker(path: str, hits: int, limit: int, queue):
+    backend = SharedMemoryRateLimitBackend(path=path, slots=1024)
+
+    async def run():
+        allowed = 0
+        for _ in range(hits):
+            result = await backend.hit("ratelimit:bench:shared", limit, 60)
+            allowed += result.allowed
+        return allowed
+
+    queue.put(asyncio.run(run()))
+
+
+def check_shared_memory_consistency(path: str, processes: int = 4, hits: int = 2000, limit: int = 5000):
+    """多个进程并发消耗同一个键，放行总数应恰好等于 limit"""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    workers = [ctx.Process(target=_shm_worker, args=(path, hits, limit, queue)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    allowed = sum(queue.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    status = "✓" if allowed == limit else "✗"
+    print(f"  {status} {processes} 个进程各请求 {hits} 次，limit={limit}，实际放行 {allowed}")
+
+
+async def main(requests: int):
+    shm_dir = tempfile.mkdtemp(prefix="ratelimit-bench-")
+
+    results = {
+        "memory (per process)": await time_backend(MemoryRateLimitBackend(max_keys=KEYS * 2), requests),
+        "shared_memory": await time_backend(
+            SharedMemoryRateLimitBackend(path=os.path.join(shm_dir, "bench"), slots=KEYS * 8), requests
+        ),
+    }
+
+    await redis_client.connect()
+    if redis_client.backend == "redis" and redis_client.redis_client is not None:
+        for algorithm in ("fixed_window", "sliding_log", "gcra"):
+            results[f"redis lua ({algorithm})"] = await time_backend(RedisRateLimitBackend(algorithm), requests)
+        results["redis lease (two-tier)"] = await time_backend(LeasedRateLimitBackend(), requests)
+        cursor = 0
+        while True:
+            batch = await redis_client.scan(cursor, "ratelimit:bench:*", 500)
+            if batch is None:
+                break
+            cursor, keys = batch
+            await redis_client.unlink_many(keys)
+            if cursor == 0:
+                break
+        await redis_client.disconnect()
+    else:
+        await redis_client.disconnect()
+        print("ℹ️  Redis 不可用（或 REDIS_BACKEND=memory），跳过 Redis 后端")
+
+    print(f"\n速率限制判定开销（{requests} 次 hit，{KEYS} 个键轮流）")
+    for name, micros in results.items():
+        print(f"  {name:<28}{micros:10.2f} µs/次")
+
+    check_shared_memory_consistency(os.path.join(shm_dir, "consistency"))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
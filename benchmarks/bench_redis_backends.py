@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+RedisClient 后端基准
+
+对比进程内 memory 后端和真实 Redis 执行应用常用操作（带过期的 SET、GET、
+管道 GET+TTL、20 个键的 MGET、计数器批量自增、LPUSH）的单次耗时。
+两者走同一个 RedisClient（相同的编码和错误处理），差别只在后端。
+Redis 相关的行需要 REDIS_URL 指向可用的 Redis，否则跳过。
+
+用法:
+    python -m benchmarks.bench_redis_backends [每种操作的次数]
+"""
+import asyncio
+import sys
+import time
+
+from app.redis_client import RedisClient
+
+KEYS = 1000
+VALUE = {"id": 1, "name": "无线 蓝牙 耳机", "price": 199.0, "is_offer": False, "description": "x" * 200}
+
+
+async def time_op(op, operations: int) -> float:
+    """返回每次操作的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for i in range(operations):
+        await op(i)
+    return (time.perf_counter() - start) / operations * 1e6
+
+
+async def run_backend(client: RedisClient, operations: int):
+    keys = [f"bench:backend:{i}" for i in range(KEYS)]
+
+    async def pipeline_get_ttl(i):
+        async with client.pipeline() as pipe:
+            pipe.get(keys[i % KEYS]).ttl(keys[i % KEYS])
+
+    ops = {
+        "SET EX": lambda i: client.set(keys[i % KEYS], VALUE, 60),
+        "GET": lambda i: client.get(keys[i % KEYS]),
+        "pipeline GET+TTL": pipeline_get_ttl,
+        "MGET x20": lambda i: client.mget(keys[i % (KEYS - 20):i % (KEYS - 20) + 20]),
+        "INCR x5 + EXPIRE": lambda i: client.incr_many({f"bench:backend:n{i % 50 + j}": 1 for j in range(5)}, 60),
+        "LPUSH": lambda i: client.lpush("bench:backend:list", VALUE),
+    }
+    results = {name: await time_op(op, operations) for name, op in ops.items()}
+
+    cursor = 0
+    while True:
+        batch = await client.scan(cursor, "bench:backend:*", 500)
+        if batch is None:
+            break
+        cursor, found = batch
+        await client.unlink_many(found)
+        if cursor == 0:
+            break
+    return results
+
+
+async def main(operations: int):
+    columns = {}
+
+    memory = RedisClient(backend="memory")
+    await memory.connect()
+    columns["memory"] = await run_backend(memory, operations)
+    await memory.disconnect()
+
+    redis = RedisClient(backend="redis")
+    await redis.connect()
+    if redis.redis_client is not None:
+        columns["redis"] = await run_backend(redis, operations)
+    else:
+        print("ℹ️  Redis 不可用，跳过 Redis 后端")
+    await redis.disconnect()
+
+    print(f"\nRedisClient 单次操作耗时（{operations} 次，µs/次）")
+    print(f"  {'操作':<20}" + "".join(f"{name:>12}" for name in columns))
+    for op in next(iter(columns.values())):
+        print(f"  {op:<20}" + "".join(f"{results[op]:12.2f}" for results in columns.values()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
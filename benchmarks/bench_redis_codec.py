@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Redis 值编码基准
+
+用典型的商品列表（与 /items/ 返回的结构相同）对比旧实现（标准库 json 字符串）
+和各种编码/压缩组合的编码、解码耗时以及写入 Redis 的字节数。
+未安装的可选依赖（msgpack、zstandard、lz4）对应的行会跳过。
+
+用法:
+    python -m benchmarks.bench_redis_codec [每种组合的重复次数]
+"""
+import json
+import random
+import sys
+import time
+
+from app.redis_codec import ValueCodec
+
+SIZES = (10, 100, 1000)  # 列表中的商品数
+CONFIGS = [
+    ("json", None),
+    ("json", "zstd"),
+    ("json", "lz4"),
+    ("msgpack", None),
+    ("msgpack", "zstd"),
+    ("msgpack", "lz4"),
+]
+
+
+def make_items(count: int):
+    rng = random.Random(count)
+    words = ["无线", "蓝牙", "耳机", "机械", "键盘", "显示器", "充电器", "数据线", "Pro", "Max", "2024款"]
+    return [
+        {
+            "id": i,
+            "name": " ".join(rng.choice(words) for _ in range(3)),
+            "description": "".join(rng.choice(words) for _ in range(12)),
+            "price": round(rng.uniform(9.9, 9999), 2),
+            "is_offer": rng.random() < 0.3,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+class LegacyCodec:
+    """优化前：json.dumps 成字符串，读取时 try json.loads"""
+
+    def encode(self, value):
+        return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    def decode(self, raw):
+        value = raw.decode("utf-8")
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return value
+
+
+def time_codec(codec, value, repeat: int):
+    """返回 (编码 µs/次, 解码 µs/次, 字节数)"""
+    raw = codec.encode(value)
+    assert codec.decode(raw) == value
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        codec.encode(value)
+    encode_us = (time.perf_counter() - start) / repeat * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        codec.decode(raw)
+    decode_us = (time.perf_counter() - start) / repeat * 1e6
+    return encode_us, decode_us, len(raw)
+
+
+def main(repeat: int):
+    codecs = {"legacy (stdlib json)": LegacyCodec()}
+    for codec, compression in CONFIGS:
+        name = f"{codec} + {compression}" if compression else codec
+        try:
+            codecs[name] = ValueCodec(codec=codec, compression=compression, compression_threshold=1024)
+        except RuntimeError as e:
+            print(f"ℹ️  跳过 {name}: {e}")
+
+    for size in SIZES:
+        items = make_items(size)
+        rounds = max(10, repeat // size)
+        print(f"\n商品列表 {size} 条（重复 {rounds} 次）")
+        print(f"  {'codec':<24}{'encode µs':>12}{'decode µs':>12}{'bytes':>10}")
+        for name, codec in codecs.items():
+            encode_us, decode_us, nbytes = time_codec(codec, items, rounds)
+            print(f"  {name:<24}{encode_us:12.1f}{decode_us:12.1f}{nbytes:10d}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Redis 一致性哈希分片基准
+
+1. 哈希环：各分片分到的键数是否均衡，增加/删除一个分片时需要迁移的键比例
+   （对比按 hash % N 取模分片），不需要 Redis
+2. 设置了 REDIS_SHARD_URLS（至少两个实例）时，对比单个实例和分片集群执行
+   大管道（SET EX + GET）的耗时。可以在本机启动几个 redis-server 测试：
+
+    for port in 7001 7002 7003; do redis-server --port $port --save '' --daemonize yes; done
+    REDIS_SHARD_URLS=redis://localhost:7001/0,redis://localhost:7002/0,redis://localhost:7003/0 \\
+        python -m benchmarks.bench_redis_sharding
+
+用法:
+    python -m benchmarks.bench_redis_sharding [键数量]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+
+from app.config import settings
+from app.redis_client import RedisClient
+from app.redis_shard import HashRing, ShardedRedis, hash_tag, ring_hash, shard_name
+
+PIPELINE_SIZE = 1000
+ROUNDS = 20
+
+
+def ring_report(keys):
+    print(f"\n哈希环分布（{len(keys)} 个键，vnodes={settings.redis_shard_vnodes}）")
+    for count in (2, 3, 4, 8):
+        nodes = [f"10.0.0.{i}:6379/0" for i in range(1, count + 1)]
+        ring = HashRing(nodes, settings.redis_shard_vnodes)
+        owners = [ring.node_for(key) for key in keys]
+        sizes = Counter(owners).values()
+        spread = statistics.pstdev(sizes) / (len(keys) / count)
+
+        grown = HashRing(nodes + [f"10.0.0.{count + 1}:6379/0"], settings.redis_shard_vnodes)
+        moved_add = sum(owner != grown.node_for(key) for key, owner in zip(keys, owners)) / len(keys)
+        shrunk = HashRing(nodes[:-1], settings.redis_shard_vnodes)
+        moved_remove = sum(owner != shrunk.node_for(key) for key, owner in zip(keys, owners)) / len(keys)
+
+        hashes = [ring_hash(hash_tag(key)) for key in keys]
+        modulo_moved = sum(h % count != h % (count + 1) for h in hashes) / len(keys)
+        print(
+            f"  {count} 个分片: 偏差 {spread:6.2%}  "
+            f"加一个分片迁移 {moved_add:6.2%}（理想 {1 / (count + 1):6.2%}，取模 {modulo_moved:6.2%}）  "
+            f"减一个分片迁移 {moved_remove:6.2%}"
+        )
+
+
+async def time_pipeline(client: RedisClient, keys) -> float:
+    """返回每条命令的平均耗时（微秒），管道中 SET EX 和 GET 各半"""
+    start = time.perf_counter()
+    for round_index in range(ROUNDS):
+        batch = keys[(round_index * PIPELINE_SIZE) % len(keys):][:PIPELINE_SIZE]
+        async with client.pipeline() as pipe:
+            for key in batch:
+                pipe.set(key, {"id": key, "payload": "x" * 100}, 60).get(key)
+    return (time.perf_counter() - start) / (ROUNDS * PIPELINE_SIZE * 2) * 1e6
+
+
+async def cluster_report(urls, keys):
+    single = RedisClient(backend="redis")
+    single._connection = single.redis_client = RedisClient._create_connection(urls[0])
+    sharded = RedisClient(backend="redis")
+    sharded._connection = sharded.redis_client = ShardedRedis(
+        {shard_name(url): RedisClient._create_connection(url) for url in urls},
+        vnodes=settings.redis_shard_vnodes,
+    )
+    try:
+        await sharded.redis_client.ping()
+    except Exception as e:
+        print(f"ℹ️  分片实例不可用（{e}），跳过管道基准")
+        return
+
+    results = {
+        "单实例": await time_pipeline(single, keys),
+        f"{len(urls)} 个分片": await time_pipeline(sharded, keys),
+    }
+    print(f"\n管道耗时（每批 {PIPELINE_SIZE} 个键的 SET EX + GET，{ROUNDS} 批）")
+    for name, micros in results.items():
+        print(f"  {name:<12}{micros:10.2f} µs/命令")
+
+    await sharded.delete_many(keys)
+    await single.delete_many(keys)
+    await single.disconnect()
+    await sharded.disconnect()
+
+
+def main(count: int):
+    keys = [f"bench:shard:{i}" for i in range(count)]
+    ring_report(keys)
+
+    urls = [url.strip() for url in settings.redis_shard_urls.split(',') if url.strip()]
+    if len(urls) > 1:
+        asyncio.run(cluster_report(urls, keys[:PIPELINE_SIZE * ROUNDS]))
+    else:
+        print("\nℹ️  未设置 REDIS_SHARD_URLS（至少两个实例），跳过管道基准")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+安全中间件延迟基准：四层 BaseHTTPMiddleware vs 融合纯 ASGI 管道
+
+“之前”一栏用 BaseHTTPMiddleware 按原来的顺序逐层包装同样的检查逻辑
+（速率限制 → 路径保护 → IP 过滤 → 安全响应头），“之后”一栏是
+SecurityPipelineMiddleware。两者共用同一个小负载 /items 接口，
+直接调用 ASGI 应用，不经过网络；Redis 未连接时速率限制走 fail-open 快速路径。
+
+用法:
+    python -m benchmarks.bench_security_pipeline [请求数]
+"""
+import asyncio
+import os
+import sys
+
+# 启用 IP 过滤，覆盖完整的检查链
+os.environ.setdefault("IP_BLACKLIST", "203.0.113.0/24")
+# 基准请求都来自同一个 IP，避免触发自动黑名单
+os.environ.setdefault("AUTO_BLACKLIST_THRESHOLD", str(10 ** 9))
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from app.ip_filter import IPFilter
+from app.path_protection import PATH_SENSITIVE, PathProtection
+from app.middleware import RateLimiter
+from app.security_headers import HEADER_POLICY_DOCS, SecurityHeaders
+from app.security_pipeline import SecurityPipelineMiddleware
+
+from benchmarks._asgi import make_scope, measure, print_row
+
+ITEMS = [{"id": i, "name": f"商品{i}", "price": 9.9 * i, "is_offer": False} for i in range(1, 4)]
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/")
+    async def read_items():
+        return ITEMS
+
+    return app
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.headers = [(k.decode(), v.decode()) for k, v in SecurityHeaders().policies[HEADER_POLICY_DOCS].raw_headers]
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in self.headers:
+            response.headers[name] = value
+        for name in ("X-Powered-By", "Server"):
+            try:
+                del response.headers[name]
+            except KeyError:
+                pass
+        return response
+
+
+class LegacyIPFilter(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.ip_filter = IPFilter()
+
+    async def dispatch(self, request, call_next):
+        client_ip = request.client.host
+        if not self.ip_filter.is_allowed(client_ip):
+            return JSONResponse(status_code=403, content={"error": True, "code": "IP_BLOCKED"})
+        self.ip_filter.track(client_ip)
+        response = await call_next(request)
+        response.headers["X-Client-IP"] = client_ip
+        return response
+
+
+class LegacyPathProtection(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.path_protection = PathProtection()
+
+    async def dispatch(self, request, call_next):
+        if self.path_protection.check(request.url.path) == PATH_SENSITIVE:
+            return JSONResponse(status_code=404, content={"error": True, "code": "PATH_BLOCKED"})
+        response = await call_next(request)
+        try:
+            del response.headers["X-Powered-By"]
+        except KeyError:
+            pass
+        return response
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.rate_limiter = RateLimiter()
+
+    async def dispatch(self, request, call_next):
+        result = await self.rate_limiter.hit(request.scope, request.client.host)
+        if result is not None and not result.allowed:
+            return JSONResponse(status_code=429, content={"error": True, "limit": result.limit})
+        response = await call_next(request)
+        if result is not None:
+            response.headers["X-RateLimit-Limit"] = str(result.limit)
+            response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+        return response
+
+
+def build_legacy_stack() -> FastAPI:
+    app = build_app()
+    # 与原 factory.py 的添加顺序一致
+    app.add_middleware(LegacySecurityHeaders)
+    app.add_middleware(LegacyIPFilter)
+    app.add_middleware(LegacyPathProtection)
+    app.add_middleware(LegacyRateLimit)
+    return app
+
+
+def build_fused_stack() -> FastAPI:
+    app = build_app()
+    app.add_middleware(SecurityPipelineMiddleware)
+    return app
+
+
+async def main(requests: int):
+    scope_factory = lambda i: make_scope("/items/")
+
+    results = {}
+    for name, builder in [
+        ("baseline (no middleware)", build_app),
+        ("before: 4x BaseHTTPMiddleware", build_legacy_stack),
+        ("after: fused ASGI pipeline", build_fused_stack),
+    ]:
+        app = builder()
+        results[name] = await measure(app, scope_factory, requests)
+
+    print(f"\nGET /items/ 延迟（{requests} 次请求）")
+    for name, stats in results.items():
+        print_row(name, stats)
+
+    before = results["before: 4x BaseHTTPMiddleware"]["p50"]
+    after = results["after: fused ASGI pipeline"]["p50"]
+    print(f"\n  p50 降低 {(1 - after / before) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
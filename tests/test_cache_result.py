@@ -0,0 +1,87 @@
+"""cache_result 单飞锁：持锁方没有写入缓存时，等待方应尽快接手计算
+
+同一个 key_prefix 装饰两个函数，模拟两个 worker（进程内单飞按装饰器隔离，只有 Redis 锁是共享的）：
+持锁方计算失败，或返回 None 且 negative_ttl=0（不写缓存），等待方不应一直等到 lock_timeout。
+"""
+import asyncio
+import os
+import time
+
+os.environ.setdefault("REDIS_BACKEND", "memory")
+
+from app.redis_client import cache_result, redis_client  # noqa: E402
+
+LOCK_TIMEOUT = 5
+HOLD_SECONDS = 0.2
+
+
+def _run(prefix: str, holder_result):
+    @cache_result(prefix, expire=60, lock_timeout=LOCK_TIMEOUT)
+    async def holder(item_id: int):
+        await asyncio.sleep(HOLD_SECONDS)
+        if isinstance(holder_result, Exception):
+            raise holder_result
+        return holder_result
+
+    @cache_result(prefix, expire=60, lock_timeout=LOCK_TIMEOUT)
+    async def waiter(item_id: int):
+        return {"id": item_id}
+
+    async def main():
+        await redis_client.connect()
+        try:
+            holding = asyncio.create_task(holder(1))
+            await asyncio.sleep(0.01)  # 让持锁方先拿到锁
+            start = time.monotonic()
+            value = await waiter(1)
+            elapsed = time.monotonic() - start
+            outcome = await asyncio.gather(holding, return_exceptions=True)
+            return value, elapsed, outcome[0]
+        finally:
+            await redis_client.flushdb()
+            await redis_client.disconnect()
+
+    return asyncio.run(main())
+
+
+def test_waiter_takes_over_when_holder_raises():
+    value, elapsed, outcome = _run("test:cache_result:raises", RuntimeError("boom"))
+    assert isinstance(outcome, RuntimeError)
+    assert value == {"id": 1}
+    assert elapsed < HOLD_SECONDS + 1
+
+
+def test_waiter_takes_over_when_holder_returns_none():
+    value, elapsed, outcome = _run("test:cache_result:none", None)
+    assert outcome is None
+    assert value == {"id": 1}
+    assert elapsed < HOLD_SECONDS + 1
+
+
+def test_waiter_reads_value_written_by_holder():
+    value, elapsed, outcome = _run("test:cache_result:value", {"id": 1})
+    assert outcome == value == {"id": 1}
+    assert elapsed < HOLD_SECONDS + 1
+
+
+def test_ignored_argument_passed_positionally_shares_key():
+    # db 会话无论按位置还是关键字传入都不参与缓存键，每次调用得到同一个键
+    calls = []
+
+    @cache_result("test:cache_result:positional", expire=60, ignore=["db"])
+    async def load(item_id: int, db=None):
+        calls.append(db)
+        return {"id": item_id}
+
+    async def main():
+        await redis_client.connect()
+        try:
+            await load(1, object())
+            await load(1, db=object())
+            await load(item_id=1, db=object())
+        finally:
+            await redis_client.flushdb()
+            await redis_client.disconnect()
+
+    asyncio.run(main())
+    assert len(calls) == 1